@@ -0,0 +1,153 @@
+# Gravação de avaliações: direta (um commit por avaliação) x em lote (AVALIACOES_EM_LOTE, um commit por lote).
+# Para cada modo sobe a API num processo próprio, com um banco novo, e aplica carga fechada de POSTs de
+# avaliações com concorrência crescente. Relata rps e latências por nível e, para cada orçamento de latência
+# (p95), a maior vazão obtida dentro dele. Carga e API dividem a máquina: em poucos núcleos a vazão dos dois modos
+# para de crescer cedo. No SQLite os INSERTs com RETURNING das avaliações saem um por linha (o SQLAlchemy não
+# garante a ordem do RETURNING em lote lá); o ganho medido vem do commit (e do UPSERT de agregados) por lote.
+# Uso (a partir de backend/):
+#   python -m benchmarks.avaliacoes_lote --concorrencias 1,4,8,16,32 --orcamentos-ms 50,100,250 --saida lote.json
+#   python -m benchmarks.avaliacoes_lote --comparar lote.json --tolerancia 20   # sai com 1 se regredir
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.comum import configurar_ambiente, resumir, salvar_e_comparar
+
+
+def popular(database_url: str, filmes: int, usuarios: int) -> None:
+    # Processo separado: as engines de database.py são criadas com a URL de cada modo
+    codigo = f"""
+from database import engine
+from migracoes import migrar
+from models import models
+migrar(engine)
+with engine.begin() as conexao:
+    conexao.execute(models.Movie.__table__.insert(), [{{"id": i, "title": f"Filme {{i}}"}} for i in range(1, {filmes} + 1)])
+    conexao.execute(models.Person.__table__.insert(), [{{"id": p, "name": f"Pessoa {{p}}"}} for p in range(1, 51)])
+    conexao.execute(models.User.__table__.insert(), [
+        {{"id": u, "name": f"u{{u}}", "email": f"u{{u}}@lote", "password_hash": "x"}} for u in range(1, {usuarios} + 1)
+    ])
+"""
+    subprocess.run([sys.executable, "-c", codigo], check=True, env={**os.environ, "DATABASE_URL": database_url})
+
+
+async def carga(url: str, tokens: list, filmes: int, concorrencia: int, duracao: float) -> dict:
+    import httpx
+
+    latencias = []
+    erros = 0
+    aleatorio = random.Random(concorrencia)
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, timeout=30, limits=limites) as cliente:
+        fim = time.perf_counter() + duracao
+
+        async def trabalhador():
+            nonlocal erros
+            while time.perf_counter() < fim:
+                corpo = {
+                    "rating": aleatorio.randint(1, 10), "comment": "Avaliação da carga",
+                    "performances": [{"person_id": aleatorio.randint(1, 50), "performance_rating": 8}],
+                }
+                comeco = time.perf_counter()
+                try:
+                    resposta = await cliente.post(
+                        f"/filmes/{aleatorio.randint(1, filmes)}/avaliacoes", json=corpo, headers=aleatorio.choice(tokens)
+                    )
+                    ok = resposta.status_code == 201
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencias.append((time.perf_counter() - comeco) * 1000)
+                else:
+                    erros += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        return resumir(latencias, time.perf_counter() - inicio, erros)
+
+
+def medir_modo(modo: str, args) -> dict:
+    import httpx
+
+    diretorio = tempfile.mkdtemp()
+    database_url = args.database_url or f"sqlite:///{diretorio}/{modo}.sqlite"
+    popular(database_url, args.filmes, args.usuarios)
+    ambiente = {
+        **os.environ, "DATABASE_URL": database_url, "AVALIACOES_EM_LOTE": str(modo == "lote").lower(),
+        "RECOMENDACOES_HABILITADA": "false",
+    }
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.porta), "--log-level", "warning"], env=ambiente,
+    )
+    url = f"http://127.0.0.1:{args.porta}"
+    try:
+        for _ in range(600):
+            try:
+                if httpx.get(f"{url}/pronto").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            time.sleep(0.1)
+        else:
+            raise RuntimeError(f"A API ({modo}) não ficou pronta")
+
+        from core.security import create_access_token
+
+        tokens = [{"Authorization": f"Bearer {create_access_token({'sub': str(u)})}"} for u in range(1, args.usuarios + 1)]
+        niveis = {}
+        for concorrencia in args.concorrencias:
+            niveis[concorrencia] = asyncio.run(carga(url, tokens, args.filmes, concorrencia, args.duracao))
+            print(f"{modo} c={concorrencia}: {niveis[concorrencia]}", flush=True)
+        return niveis
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concorrencias", default="1,4,8,16,32")
+    parser.add_argument("--orcamentos-ms", default="50,100,250", help="limites de p95 para a vazão comparada")
+    parser.add_argument("--duracao", type=float, default=5.0, help="segundos de carga por nível")
+    parser.add_argument("--filmes", type=int, default=1000)
+    parser.add_argument("--usuarios", type=int, default=200)
+    parser.add_argument("--porta", type=int, default=8767)
+    parser.add_argument("--database-url", default=None, help="banco vazio para os dois modos (padrão: SQLite novo por modo)")
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--comparar", help="relatório JSON anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=20.0, help="piora máxima aceita (%%)")
+    args = parser.parse_args()
+    args.concorrencias = [int(valor) for valor in args.concorrencias.split(",")]
+    orcamentos = [float(valor) for valor in args.orcamentos_ms.split(",")]
+
+    configurar_ambiente(args.database_url, nome="avaliacoes_lote")
+    modos = {modo: medir_modo(modo, args) for modo in ("direto", "lote")}
+
+    # Vazão máxima entre os níveis de concorrência cujo p95 coube no orçamento (sem erros)
+    vazao = {}
+    for modo, niveis in modos.items():
+        for orcamento in orcamentos:
+            dentro = [
+                resultado["rps"] for resultado in niveis.values()
+                if resultado.get("p95_ms") is not None and resultado["p95_ms"] <= orcamento and not resultado["erros"]
+            ]
+            vazao[f"{modo}_p95_ate_{orcamento:g}ms"] = {"rps": max(dentro) if dentro else 0}
+
+    relatorio = {
+        "config": {"concorrencias": args.concorrencias, "duracao": args.duracao, "banco": args.database_url or "sqlite"},
+        "niveis": {modo: {str(c): r for c, r in niveis.items()} for modo, niveis in modos.items()},
+        "vazao_no_orcamento": vazao,
+    }
+    raise SystemExit(salvar_e_comparar(
+        relatorio, "vazao_no_orcamento", args.saida, args.comparar, args.tolerancia,
+        metricas_menor=(), metricas_maior=("rps",),
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Compara a latência da busca por título antiga (ilike '%q%') com a busca ranqueada de crud/search.py.
+# Uso (a partir de backend/): python -m benchmarks.bench_busca --filmes 200000
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+PALAVRAS = [
+    "amor", "guerra", "noite", "cidade", "sombra", "ação", "coração", "vingança", "estrela", "mar",
+    "último", "perdido", "segredo", "fogo", "gelo", "rei", "rainha", "missão", "impossível", "tempo",
+    "sertão", "lenda", "dragão", "céu", "inferno", "verão", "inverno", "caminho", "casa", "sonho",
+]
+
+
+def medir(funcao, consultas, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        for consulta in consultas:
+            inicio = time.perf_counter()
+            funcao(consulta)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        "p50_ms": round(statistics.median(tempos), 3),
+        "p95_ms": round(tempos[int(len(tempos) * 0.95) - 1], 3),
+        "media_ms": round(statistics.fmean(tempos), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filmes", type=int, default=200_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench_busca.sqlite"
+
+    from sqlalchemy import insert
+    from database import AsyncSessionLocal, SessionLocal, async_engine, engine
+    from models import models
+    from crud.search import search_movies
+    from migracoes import migrar
+
+    migrar(engine)
+
+    aleatorio = random.Random(42)
+    silabas = ["ba", "ca", "da", "fe", "ga", "li", "mo", "nu", "pa", "ra", "si", "to", "vi", "xe", "zu", "ção", "lhe"]
+    vocabulario = PALAVRAS + [
+        "".join(aleatorio.choices(silabas, k=aleatorio.randint(2, 4))) for _ in range(5000)
+    ]
+    db = SessionLocal()
+    if db.query(models.Movie).count() < args.filmes:
+        linhas = [
+            {"id": i, "title": " ".join(aleatorio.sample(vocabulario, aleatorio.randint(1, 4))).capitalize()}
+            for i in range(1, args.filmes + 1)
+        ]
+        for inicio in range(0, len(linhas), 5000):
+            db.execute(insert(models.Movie), linhas[inicio:inicio + 5000])
+        db.commit()
+
+    consultas = ["guerra", "coracao", "ultimo rei", "missao impossivel", "dragao do ceu", "sombr"]
+
+    def antiga(consulta):
+        return db.query(models.Movie).filter(models.Movie.title.ilike(f"%{consulta}%")).all()
+
+    # A busca nova é assíncrona (AsyncSession); cada chamada roda no mesmo event loop
+    loop = asyncio.new_event_loop()
+    db_async = AsyncSessionLocal()
+
+    def nova(consulta):
+        return loop.run_until_complete(search_movies(db_async, consulta, limit=20))
+
+    nova(consultas[0])  # aquece o índice em memória (SQLite) ou o cache de páginas (PostgreSQL)
+    resultado = {
+        "dialeto": engine.dialect.name,
+        "filmes": args.filmes,
+        "ilike": medir(antiga, consultas, args.repeticoes),
+        "ranqueada": medir(nova, consultas, args.repeticoes),
+    }
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    loop.run_until_complete(db_async.close())
+    loop.run_until_complete(async_engine.dispose())
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# Teste de carga da API completa contra o TMDB falso (benchmarks/tmdb_falso.py).
+# Roda uma mistura roteirizada e determinística (--semente) de buscas, detalhes, escrita de avaliações
+# e rotas autenticadas, e gera um JSON com p50/p95/p99, vazão, consultas SQL por rota (lidas de /metrics),
+# bytes recebidos e CPU do processo. --accept-encoding e --revalidar (If-None-Match com o último ETag de cada
+# caminho) medem o efeito da compressão e das respostas 304.
+# Uso (a partir de backend/):
+#   python -m benchmarks.carga --requisicoes 2000 --saida base.json
+#   python -m benchmarks.carga --requisicoes 2000 --comparar base.json --tolerancia 15   # sai com 1 se regredir
+#   python -m benchmarks.carga --accept-encoding identity   x   --accept-encoding "br, gzip" --revalidar
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+from benchmarks.comum import (
+    ServidorEmThread, configurar_ambiente, contadores, histograma_por_rota, resumir, salvar_e_comparar,
+)
+from benchmarks.tmdb_falso import PALAVRAS, criar_app
+
+MISTURA_PADRAO = "busca=25,detalhe=30,avaliacao=10,listar_avaliacoes=10,me=10,catalogo=10,em_cartaz=5"
+
+
+def ler_mistura(texto: str) -> dict:
+    mistura = {}
+    for item in texto.split(","):
+        nome, peso = item.split("=")
+        mistura[nome.strip()] = float(peso)
+    return mistura
+
+
+# Sequência fixa de operações: (cenário, método, caminho, corpo, índice do usuário)
+def roteiro(mistura: dict, requisicoes: int, filmes: int, usuarios: int, semente: int) -> list:
+    rng = random.Random(semente)
+    nomes, pesos = zip(*mistura.items())
+    operacoes = []
+    for _ in range(requisicoes):
+        cenario = rng.choices(nomes, pesos)[0]
+        # Popularidade concentrada em poucos filmes, como em tráfego real
+        filme = min(int(rng.paretovariate(1.2)), filmes)
+        usuario = rng.randrange(usuarios)
+        if cenario == "busca":
+            termo = " ".join(rng.sample(PALAVRAS, rng.choice((1, 1, 2))))
+            operacoes.append((cenario, "GET", f"/filmes/search?query={termo}", None, None))
+        elif cenario == "detalhe":
+            operacoes.append((cenario, "GET", f"/filmes/{filme}", None, None))
+        elif cenario == "avaliacao":
+            corpo = {"rating": rng.randint(1, 10), "comment": "benchmark"}
+            operacoes.append((cenario, "POST", f"/filmes/{filme}/avaliacoes", corpo, usuario))
+        elif cenario == "listar_avaliacoes":
+            operacoes.append((cenario, "GET", f"/filmes/{filme}/avaliacoes?limit=20", None, None))
+        elif cenario == "me":
+            operacoes.append((cenario, "GET", "/usuarios/me", None, usuario))
+        elif cenario == "catalogo":
+            operacoes.append((cenario, "GET", "/filmes?limit=50", None, None))
+        elif cenario == "em_cartaz":
+            operacoes.append((cenario, "GET", "/em_cartaz", None, None))
+        elif cenario == "em_cartaz_completo":
+            operacoes.append((cenario, "GET", "/em_cartaz/completo?regioes=BR,PT", None, None))
+        elif cenario == "watchlist":
+            assistidos = rng.choice(("", "&watched=false", "&watched=true"))
+            operacoes.append((cenario, "GET", f"/usuarios/me/watchlist?limit=20{assistidos}", None, usuario))
+        elif cenario == "watchlist_lote":
+            lote = rng.sample(range(1, filmes + 1), min(20, filmes))
+            operacao = rng.choice(("adicionar", "adicionar", "marcar", "remover"))
+            if operacao == "adicionar":
+                corpo = {"items": [{"movie_id": id, "watched": rng.random() < 0.2} for id in lote]}
+                operacoes.append((cenario, "POST", "/usuarios/me/watchlist", corpo, usuario))
+            elif operacao == "marcar":
+                operacoes.append((cenario, "PATCH", "/usuarios/me/watchlist", {"movie_ids": lote[:10]}, usuario))
+            else:
+                ids = ",".join(map(str, lote[:5]))
+                operacoes.append((cenario, "DELETE", f"/usuarios/me/watchlist?movie_ids={ids}", None, usuario))
+        else:
+            raise SystemExit(f"Cenário desconhecido: {cenario}")
+    return operacoes
+
+
+async def preparar(cliente, usuarios: int, filmes: int) -> list:
+    tokens = []
+    for i in range(usuarios):
+        dados = {"name": f"bench{i}", "email": f"bench{i}@cinebase", "password": "bench"}
+        await cliente.post("/usuarios/", json=dados)
+        resposta = await cliente.post("/login/", json={"email": dados["email"], "password": "bench"})
+        resposta.raise_for_status()
+        tokens.append({"Authorization": f"Bearer {resposta.json()['access_token']}"})
+    # Os filmes avaliados precisam existir no banco local
+    for filme in range(1, filmes + 1):
+        await cliente.get(f"/filmes/{filme}")
+    return tokens
+
+
+async def executar(url_base: str, args) -> dict:
+    import httpx
+
+    limites = httpx.Limits(max_connections=args.concorrencia)
+    cabecalhos = {"Accept-Encoding": args.accept_encoding}
+    async with httpx.AsyncClient(base_url=url_base, limits=limites, timeout=60, headers=cabecalhos) as cliente:
+        tokens = await preparar(cliente, args.usuarios, args.filmes)
+        metricas_antes = (await cliente.get("/metrics")).text
+
+        fila = asyncio.Queue()
+        for operacao in roteiro(ler_mistura(args.mistura), args.requisicoes, args.filmes, args.usuarios, args.semente):
+            fila.put_nowait(operacao)
+        latencias = defaultdict(list)
+        erros = defaultdict(int)
+        recebidos = defaultdict(int)
+        nao_modificados = defaultdict(int)
+        etags = {}
+
+        async def trabalhador():
+            while not fila.empty():
+                cenario, metodo, caminho, corpo, usuario = fila.get_nowait()
+                headers = dict(tokens[usuario]) if usuario is not None else {}
+                if args.revalidar and metodo == "GET" and caminho in etags:
+                    headers["If-None-Match"] = etags[caminho]
+                inicio = time.perf_counter()
+                try:
+                    resposta = await cliente.request(metodo, caminho, json=corpo, headers=headers)
+                except httpx.TransportError:  # ex.: exceção na API derrubou a conexão
+                    erros[cenario] += 1
+                    continue
+                latencias[cenario].append((time.perf_counter() - inicio) * 1000)
+                recebidos[cenario] += resposta.num_bytes_downloaded
+                if resposta.status_code == 304:
+                    nao_modificados[cenario] += 1
+                elif resposta.status_code >= 400:
+                    erros[cenario] += 1
+                elif "etag" in resposta.headers:
+                    etags[caminho] = resposta.headers["etag"]
+
+        inicio, cpu_inicio = time.perf_counter(), time.process_time()
+        await asyncio.gather(*[trabalhador() for _ in range(args.concorrencia)])
+        duracao, cpu = time.perf_counter() - inicio, time.process_time() - cpu_inicio
+        metricas_depois = (await cliente.get("/metrics")).text
+
+    antes = histograma_por_rota(metricas_antes, "cinebase_requisicao_db_consultas")
+    depois = histograma_por_rota(metricas_depois, "cinebase_requisicao_db_consultas")
+    consultas = {}
+    for rota, (soma, contagem) in sorted(depois.items()):
+        soma_antes, contagem_antes = antes.get(rota, (0.0, 0.0))
+        if rota != "/metrics" and contagem > contagem_antes:
+            consultas[rota] = round((soma - soma_antes) / (contagem - contagem_antes), 2)
+
+    compressao_antes = contadores(metricas_antes, "cinebase_compressao_bytes", "etapa")
+    compressao_depois = contadores(metricas_depois, "cinebase_compressao_bytes", "etapa")
+
+    def resumo(cenario, valores):
+        return {
+            **resumir(valores, duracao, erros[cenario]),
+            "kb_recebidos": round(recebidos[cenario] / 1024, 1),
+            "respostas_304": nao_modificados[cenario],
+        }
+
+    todas = [latencia for valores in latencias.values() for latencia in valores]
+    return {
+        "total": {
+            **resumir(todas, duracao, sum(erros.values())),
+            "kb_recebidos": round(sum(recebidos.values()) / 1024, 1),
+            "respostas_304": sum(nao_modificados.values()),
+            # API e cliente de carga rodam no mesmo processo: serve para comparar execuções, não como custo absoluto
+            "cpu_processo_s": round(cpu, 2),
+        },
+        "endpoints": {cenario: resumo(cenario, valores) for cenario, valores in sorted(latencias.items())},
+        "consultas_db_por_rota": consultas,
+        "compressao_kb": {
+            etapa: round((valor - compressao_antes.get(etapa, 0.0)) / 1024, 1) for etapa, valor in compressao_depois.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--filmes", type=int, default=200, help="filmes pré-importados e alvo das avaliações")
+    parser.add_argument("--mistura", default=MISTURA_PADRAO, help="pesos por cenário, ex.: busca=50,detalhe=50")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--tmdb-latencia-ms", type=float, default=50.0)
+    parser.add_argument("--tmdb-taxa-erro", type=float, default=0.0)
+    parser.add_argument("--tmdb-taxa-429", type=float, default=0.0)
+    parser.add_argument("--accept-encoding", default="br, gzip", help='"identity" desliga a compressão')
+    parser.add_argument("--revalidar", action="store_true", help="reenvia o ETag recebido em If-None-Match")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--porta-tmdb", type=int, default=8901)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--comparar", help="relatório JSON anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=10.0, help="piora máxima aceita (%%) em p95 e rps")
+    args = parser.parse_args()
+
+    tmdb = ServidorEmThread(
+        criar_app(args.tmdb_latencia_ms, taxa_erro=args.tmdb_taxa_erro, semente=args.semente, taxa_429=args.tmdb_taxa_429), args.porta_tmdb
+    )
+    configurar_ambiente(args.database_url, tmdb.url, nome="carga")
+
+    from database import engine
+    from migracoes import migrar
+    from main import app
+
+    migrar(engine)
+
+    with tmdb, ServidorEmThread(app, args.porta) as api:
+        resultado = asyncio.run(executar(api.url, args))
+
+    relatorio = {
+        "config": {
+            chave: getattr(args, chave)
+            for chave in ("requisicoes", "concorrencia", "usuarios", "filmes", "mistura", "semente",
+                          "tmdb_latencia_ms", "tmdb_taxa_erro", "tmdb_taxa_429", "accept_encoding", "revalidar")
+        },
+        **resultado,
+    }
+    raise SystemExit(salvar_e_comparar(relatorio, "endpoints", args.saida, args.comparar, args.tolerancia))
+
+
+if __name__ == "__main__":
+    main()
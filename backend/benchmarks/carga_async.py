@@ -0,0 +1,140 @@
+# Teste de carga do caminho assíncrono com um único worker uvicorn (event loop único).
+# Compara a mesma consulta lenta executada do jeito antigo (Session síncrona dentro de rota async,
+# bloqueando o loop) e pelo AsyncSession, e mede também rotas reais da API.
+# A consulta lenta espera `--latencia-ms` no banco (pg_sleep, ou uma função sleep_ms registrada no SQLite),
+# simulando o tempo de ida e volta de um banco remoto.
+# Uso (a partir de backend/): python -m benchmarks.carga_async --concorrencia 32 --requisicoes 400
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.comum import ServidorEmThread, configurar_ambiente, resumir
+
+
+def registrar_sleep_sqlite():
+    from sqlalchemy import event
+    from database import async_engine, engine
+
+    def sleep_ms(ms):
+        time.sleep(ms / 1000)
+        return ms
+
+    for alvo in (engine, async_engine.sync_engine):
+        if alvo.dialect.name == "sqlite":
+            event.listen(alvo, "connect", lambda conexao, _: conexao.create_function("sleep_ms", 1, sleep_ms))
+
+
+def consulta_lenta(dialeto: str) -> str:
+    if dialeto == "postgresql":
+        return "SELECT pg_sleep(:ms / 1000.0)"
+    return "SELECT sleep_ms(:ms)"
+
+
+def popular(filmes: int, avaliacoes_por_filme: int):
+    from sqlalchemy import insert
+    from database import SessionLocal, engine
+    from migracoes import migrar
+    from models import models
+
+    migrar(engine)
+    db = SessionLocal()
+    if db.query(models.Movie).count():
+        db.close()
+        return
+    db.add(models.User(id=1, name="carga", email="carga@cinebase", password_hash="x"))
+    db.execute(insert(models.Movie), [{"id": i, "title": f"Filme {i}"} for i in range(1, filmes + 1)])
+    db.execute(insert(models.Review), [
+        {"user_id": 1, "movie_id": filme, "rating": (filme + i) % 11, "comment": "ok"}
+        for filme in range(1, filmes + 1)
+        for i in range(avaliacoes_por_filme)
+    ])
+    db.commit()
+    db.close()
+
+
+def registrar_rotas_de_comparacao(app, latencia_ms: int):
+    from sqlalchemy import text
+    from database import AsyncSessionLocal, SessionLocal, engine
+
+    consulta = text(consulta_lenta(engine.dialect.name))
+
+    @app.get("/_carga/bloqueante")
+    async def bloqueante():
+        # Padrão antigo: consulta síncrona dentro de `async def`, travando o event loop
+        db = SessionLocal()
+        try:
+            db.execute(consulta, {"ms": latencia_ms})
+            return {"ok": True}
+        finally:
+            db.close()
+
+    @app.get("/_carga/assincrona")
+    async def assincrona():
+        async with AsyncSessionLocal() as db:
+            await db.execute(consulta, {"ms": latencia_ms})
+            return {"ok": True}
+
+
+async def disparar(url_base: str, caminhos, requisicoes: int, concorrencia: int) -> dict:
+    import httpx
+
+    latencias = []
+    erros = 0
+    fila = asyncio.Queue()
+    for i in range(requisicoes):
+        fila.put_nowait(caminhos[i % len(caminhos)])
+
+    async def trabalhador(cliente):
+        nonlocal erros
+        while not fila.empty():
+            caminho = fila.get_nowait()
+            inicio = time.perf_counter()
+            resposta = await cliente.get(caminho)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code >= 400:
+                erros += 1
+
+    limites = httpx.Limits(max_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url_base, limits=limites, timeout=60) as cliente:
+        inicio = time.perf_counter()
+        await asyncio.gather(*[trabalhador(cliente) for _ in range(concorrencia)])
+        duracao = time.perf_counter() - inicio
+
+    return resumir(latencias, duracao, erros)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--requisicoes", type=int, default=400)
+    parser.add_argument("--latencia-ms", type=int, default=20, help="espera da consulta lenta no banco")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    configurar_ambiente(args.database_url, nome="carga_async")
+    registrar_sleep_sqlite()  # antes de qualquer conexão ser aberta
+    popular(filmes=200, avaliacoes_por_filme=50)
+
+    from main import app
+
+    registrar_rotas_de_comparacao(app, args.latencia_ms)
+    cenarios = {
+        "consulta_lenta_bloqueante": ["/_carga/bloqueante"],
+        "consulta_lenta_assincrona": ["/_carga/assincrona"],
+        "avaliacoes": [f"/filmes/{i}/avaliacoes?limit=20" for i in range(1, 201)],
+        "catalogo": ["/filmes?limit=50"],
+    }
+    resultado = {"concorrencia": args.concorrencia, "workers": 1, "latencia_ms": args.latencia_ms, "cenarios": {}}
+    with ServidorEmThread(app, args.porta) as servidor:
+        for nome, caminhos in cenarios.items():
+            resultado["cenarios"][nome] = asyncio.run(
+                disparar(servidor.url, caminhos, args.requisicoes, args.concorrencia)
+            )
+
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# Utilitários compartilhados pelos scripts de benchmark
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+
+# Variáveis mínimas para importar a aplicação sem depender do .env nem do TMDB real.
+# Tem de rodar antes de qualquer import de core.config / database / main.
+def configurar_ambiente(database_url: str | None = None, tmdb_url: str | None = None, nome: str = "bench"):
+    os.environ["DATABASE_URL"] = database_url or f"sqlite:///{tempfile.mkdtemp()}/{nome}.sqlite"
+    if tmdb_url:
+        os.environ["TMDB_URL"] = tmdb_url
+        os.environ["USE_BEARER"] = ""  # o servidor falso aceita qualquer api_key
+    padroes = {
+        "SECRET_KEY": "benchmark",
+        "ALGORITHM": "HS256",
+        "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+        "TMDB_API_KEY_V3": "benchmark",
+        "TMDB_URL": "http://127.0.0.1:9",
+        "USE_BEARER": "",
+        "BEARER_TOKEN": "",
+        "POSTGRES_USER": "",
+        "POSTGRES_PASSWORD": "",
+        "POSTGRES_DB": "",
+    }
+    for chave, valor in padroes.items():
+        os.environ.setdefault(chave, valor)
+
+
+def resumir(latencias_ms: list, duracao: float, erros: int = 0) -> dict:
+    if not latencias_ms:
+        return {"requisicoes": 0, "erros": erros}
+    latencias_ms = sorted(latencias_ms)
+
+    def percentil(p):
+        return round(latencias_ms[max(int(len(latencias_ms) * p) - 1, 0)], 2)
+
+    return {
+        "requisicoes": len(latencias_ms),
+        "erros": erros,
+        "rps": round(len(latencias_ms) / duracao, 1) if duracao else None,
+        "p50_ms": round(statistics.median(latencias_ms), 2),
+        "p95_ms": percentil(0.95),
+        "p99_ms": percentil(0.99),
+    }
+
+
+# Sobe um app ASGI com uvicorn (um worker) numa thread; usado para a API e para o TMDB falso
+class ServidorEmThread:
+    def __init__(self, app, porta: int):
+        import uvicorn
+
+        self.porta = porta
+        self.servidor = uvicorn.Server(uvicorn.Config(app, port=porta, workers=1, log_level="warning"))
+        self.thread = threading.Thread(target=self.servidor.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.porta}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.servidor.started:
+            if not self.thread.is_alive():
+                raise RuntimeError(f"Servidor não subiu na porta {self.porta}")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.should_exit = True
+        self.thread.join()
+
+
+# Soma/contagem de um histograma de /metrics por rota (para diferenças antes/depois da carga)
+def histograma_por_rota(texto_metricas: str, nome: str) -> dict:
+    from prometheus_client.parser import text_string_to_metric_families
+
+    resultado = {}
+    for familia in text_string_to_metric_families(texto_metricas):
+        if familia.name != nome:
+            continue
+        for amostra in familia.samples:
+            rota = amostra.labels.get("rota")
+            soma, contagem = resultado.get(rota, (0.0, 0.0))
+            if amostra.name == f"{nome}_sum":
+                resultado[rota] = (soma + amostra.value, contagem)
+            elif amostra.name == f"{nome}_count":
+                resultado[rota] = (soma, contagem + amostra.value)
+    return resultado
+
+
+# Total de um contador de /metrics agrupado por um rótulo (somando os demais)
+def contadores(texto_metricas: str, nome: str, rotulo: str) -> dict:
+    from prometheus_client.parser import text_string_to_metric_families
+
+    resultado = {}
+    for familia in text_string_to_metric_families(texto_metricas):
+        if familia.name != nome:
+            continue
+        for amostra in familia.samples:
+            if amostra.name == f"{nome}_total":
+                chave = amostra.labels.get(rotulo)
+                resultado[chave] = resultado.get(chave, 0.0) + amostra.value
+    return resultado
+
+
+# Compara dois relatórios ({"nome": {"p95_ms": ..., "rps": ...}}); retorna as regressões acima da tolerância (%)
+def comparar(atual: dict, anterior: dict, tolerancia: float, metricas_menor=("p95_ms",), metricas_maior=("rps",)) -> list:
+    regressoes = []
+    for nome, valores in atual.items():
+        base = anterior.get(nome)
+        if not base:
+            continue
+        for metrica in metricas_menor + metricas_maior:
+            novo, velho = valores.get(metrica), base.get(metrica)
+            if not novo or not velho:
+                continue
+            variacao = (novo - velho) / velho * 100
+            pior = variacao > tolerancia if metrica in metricas_menor else variacao < -tolerancia
+            if pior:
+                regressoes.append({"nome": nome, "metrica": metrica, "anterior": velho, "atual": novo, "variacao_pct": round(variacao, 1)})
+    return regressoes
+
+
+def salvar_e_comparar(relatorio: dict, chave: str, saida: str | None, comparar_com: str | None, tolerancia: float, **kwargs) -> int:
+    if comparar_com:
+        with open(comparar_com, encoding="utf-8") as arquivo:
+            anterior = json.load(arquivo)
+        relatorio["regressoes"] = comparar(relatorio[chave], anterior.get(chave, {}), tolerancia, **kwargs)
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if saida:
+        with open(saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto)
+    print(texto)
+    return 1 if relatorio.get("regressoes") else 0
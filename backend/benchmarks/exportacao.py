@@ -0,0 +1,128 @@
+# Exportação em massa (services/exportacao.py) com memória constante: gera N avaliações sintéticas num
+# SQLite temporário e exporta em cada formato, cada um num processo novo, medindo o pico de memória (RSS)
+# acima do processo já com tudo importado. Sai com 1 se algum formato passar do teto.
+# Uso (a partir de backend/):
+#   python -m benchmarks.exportacao --linhas 1000000 --teto-mb 64
+#   python -m benchmarks.exportacao --formatos ndjson csv --gzip
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.comum import configurar_ambiente
+
+
+# Pico de RSS do processo (VmHWM, Linux). O ru_maxrss não serve aqui: sobrevive ao exec e traria o pico do pai.
+def _pico_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as status:
+            for linha in status:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def popular(linhas: int, lote: int = 50_000) -> None:
+    from database import engine
+    from migracoes import migrar
+    from models import models
+
+    migrar(engine)
+    inicio = datetime(2020, 1, 1)
+    with engine.begin() as conexao:
+        for primeiro in range(0, linhas, lote):
+            conexao.execute(models.Review.__table__.insert(), [
+                {
+                    "id": i + 1, "user_id": i % 1_000 + 1, "movie_id": i % 5_000 + 1, "rating": i % 10 + 1,
+                    "comment": f"Avaliação sintética número {i}, com um comentário de tamanho parecido com o real.",
+                    "created_at": inicio + timedelta(seconds=i),
+                }
+                for i in range(primeiro, min(primeiro + lote, linhas))
+            ])
+
+
+class _Contador:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, dados: bytes):
+        self.bytes += len(dados)
+
+
+def _exportar(database_url: str, formato: str, compactar: bool, fila) -> None:
+    configurar_ambiente(database_url)
+    from database import engine
+    from services import exportacao
+
+    if formato == "parquet":
+        import pyarrow  # noqa: F401  (importado antes da medição, como os demais módulos)
+    base = _pico_rss_mb()
+    saida = _Contador()
+    inicio = time.perf_counter()
+    linhas = exportacao.exportar(engine, saida, "reviews", formato, compactar=compactar)
+    duracao = time.perf_counter() - inicio
+    fila.put({
+        "linhas": linhas,
+        "mb_gerados": round(saida.bytes / 2**20, 1),
+        "segundos": round(duracao, 2),
+        "linhas_por_s": round(linhas / duracao),
+        "rss_base_mb": round(base, 1),
+        "pico_acima_da_base_mb": round(_pico_rss_mb() - base, 1),
+    })
+
+
+def medir(database_url: str, formato: str, compactar: bool) -> dict:
+    contexto = multiprocessing.get_context("spawn")  # processo limpo: o pico de RSS é só desta exportação
+    fila = contexto.Queue()
+    processo = contexto.Process(target=_exportar, args=(database_url, formato, compactar, fila))
+    processo.start()
+    resultado = fila.get()
+    processo.join()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, default=1_000_000, help="avaliações sintéticas geradas")
+    parser.add_argument("--formatos", nargs="+", default=["ndjson", "csv", "parquet"])
+    parser.add_argument("--gzip", action="store_true", help="exporta compactando com gzip")
+    parser.add_argument("--teto-mb", type=float, default=64.0, help="pico de memória máximo aceito por exportação")
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo")
+    args = parser.parse_args()
+
+    configurar_ambiente(nome="exportacao")
+    import os
+    database_url = os.environ["DATABASE_URL"]
+
+    inicio = time.perf_counter()
+    popular(args.linhas)
+    print(f"{args.linhas} avaliações geradas em {time.perf_counter() - inicio:.1f}s")
+
+    from services.exportacao import verificar_formato
+
+    relatorio = {"config": {"linhas": args.linhas, "gzip": args.gzip, "teto_mb": args.teto_mb}, "formatos": {}}
+    falhou = False
+    for formato in args.formatos:
+        try:
+            verificar_formato(formato)
+        except ValueError as e:
+            print(f"{formato}: ignorado ({e})")
+            continue
+        resultado = medir(database_url, formato, args.gzip)
+        resultado["dentro_do_teto"] = resultado["pico_acima_da_base_mb"] <= args.teto_mb
+        falhou |= not resultado["dentro_do_teto"]
+        relatorio["formatos"][formato] = resultado
+        print(f"{formato}: {json.dumps(resultado, ensure_ascii=False)}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    raise SystemExit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Subida a frio: processo novo do uvicorn até a primeira requisição, sobre um banco já migrado com N filmes.
+# Mede, desde o spawn: a primeira resposta de / (processo importado e escutando), o primeiro 200 de /pronto
+# (pool aberto e índice da busca montado) e a primeira busca por título, além da importação do main isolada.
+# Uso (a partir de backend/):
+#   python -m benchmarks.inicializacao --filmes 100000 --saida subida.json
+#   python -m benchmarks.inicializacao --comparar subida.json --tolerancia 20   # sai com 1 se regredir
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.comum import configurar_ambiente, salvar_e_comparar
+
+PALAVRAS = ["amor", "guerra", "noite", "cidade", "aventura", "sombra", "mar", "fogo", "estrela", "segredo"]
+
+
+def popular(filmes: int, lote: int = 50_000) -> None:
+    from sqlalchemy import func, select
+    from database import engine
+    from migracoes import migrar
+    from models import models
+
+    migrar(engine)
+    aleatorio = random.Random(42)
+    with engine.begin() as conexao:
+        if conexao.scalar(select(func.count()).select_from(models.Movie)):
+            return
+        for inicio in range(0, filmes, lote):
+            conexao.execute(models.Movie.__table__.insert(), [
+                {"id": i + 1, "title": f"{aleatorio.choice(PALAVRAS).title()} {aleatorio.choice(PALAVRAS)} {i}"}
+                for i in range(inicio, min(inicio + lote, filmes))
+            ])
+
+
+def importacao_ms() -> float:
+    codigo = "import time; inicio = time.perf_counter(); import main; print((time.perf_counter() - inicio) * 1000)"
+    return float(subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True).stdout)
+
+
+def subida(porta: int, consulta: str, limite: float) -> dict:
+    import httpx
+
+    url = f"http://127.0.0.1:{porta}"
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+    )
+    marcas = {}
+    try:
+        with httpx.Client(base_url=url, timeout=limite) as cliente:
+            for etapa, caminho in (("escutando", "/"), ("pronto", "/pronto")):
+                while True:
+                    if time.perf_counter() - inicio > limite or processo.poll() is not None:
+                        raise RuntimeError(f"A API não chegou a '{etapa}' em {limite:.0f}s")
+                    try:
+                        if cliente.get(caminho).status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass  # ainda não está escutando
+                    time.sleep(0.002)
+                marcas[f"{etapa}_ms"] = (time.perf_counter() - inicio) * 1000
+            comeco = time.perf_counter()
+            resposta = cliente.get("/filmes/search", params={"query": consulta})
+            resposta.raise_for_status()
+            marcas["primeira_busca_ms"] = (time.perf_counter() - comeco) * 1000
+            marcas["ate_primeira_busca_ms"] = (time.perf_counter() - inicio) * 1000
+    finally:
+        processo.terminate()
+        processo.wait()
+    return marcas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filmes", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--porta", type=int, default=8766)
+    parser.add_argument("--consulta", default="aventura segredo")
+    parser.add_argument("--limite", type=float, default=60.0, help="segundos de espera por subida")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--comparar", help="relatório JSON anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=20.0, help="piora máxima aceita (%%)")
+    args = parser.parse_args()
+
+    configurar_ambiente(args.database_url, nome="inicializacao")
+    os.environ.setdefault("RECOMENDACOES_HABILITADA", "false")  # mede a subida da API, não a do modelo
+    popular(args.filmes)
+
+    amostras = {"importacao_ms": []}
+    for _ in range(args.repeticoes):
+        amostras["importacao_ms"].append(importacao_ms())
+        for etapa, valor in subida(args.porta, args.consulta, args.limite).items():
+            amostras.setdefault(etapa, []).append(valor)
+
+    etapas = {
+        etapa: {"mediana_ms": round(statistics.median(valores), 1), "max_ms": round(max(valores), 1)}
+        for etapa, valores in amostras.items()
+    }
+    relatorio = {"config": {"filmes": args.filmes, "repeticoes": args.repeticoes}, "etapas": etapas}
+    raise SystemExit(salvar_e_comparar(
+        relatorio, "etapas", args.saida, args.comparar, args.tolerancia,
+        metricas_menor=("mediana_ms",), metricas_maior=(),
+    ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# Micro-benchmarks das funções quentes: utils/format.py, serialização de schemas.Movie e do detalhe de filme
+# (caminho antigo, Pydantic, orjson, hit do cache de respostas e gzip) e get_current_user.
+# Uso (a partir de backend/):
+#   python -m benchmarks.micro --saida micro.json
+#   python -m benchmarks.micro --comparar micro.json --tolerancia 20   # sai com 1 se regredir
+import argparse
+import asyncio
+import statistics
+import time
+import timeit
+from datetime import datetime
+
+from benchmarks.comum import configurar_ambiente, salvar_e_comparar
+from benchmarks.tmdb_falso import detalhe_filme
+
+
+def resultado(tempos_por_chamada: list) -> dict:
+    return {
+        "min_us": round(min(tempos_por_chamada) * 1e6, 3),
+        "mediana_us": round(statistics.median(tempos_por_chamada) * 1e6, 3),
+    }
+
+
+def medir(funcao, numero: int, repeticoes: int) -> dict:
+    return resultado([total / numero for total in timeit.Timer(funcao).repeat(repeticoes, numero)])
+
+
+async def medir_async(funcao, numero: int, repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(numero):
+            await funcao()
+        tempos.append((time.perf_counter() - inicio) / numero)
+    return resultado(tempos)
+
+
+def bench_format(numero, repeticoes) -> dict:
+    from utils.format import formatar_dados_tmdb, formatar_dinheiro, formatar_duracao
+
+    dados = detalhe_filme(550)
+    return {
+        "formatar_duracao": medir(lambda: formatar_duracao(135), numero, repeticoes),
+        "formatar_dinheiro": medir(lambda: formatar_dinheiro(1_234_567_890), numero, repeticoes),
+        "formatar_dados_tmdb": medir(lambda: formatar_dados_tmdb(dados), numero, repeticoes),
+    }
+
+
+def bench_schemas(numero, repeticoes) -> dict:
+    from fastapi.encoders import jsonable_encoder
+    from models import models, schemas
+    from utils.format import formatar_dados_tmdb
+
+    filmes = [models.Movie(**formatar_dados_tmdb(detalhe_filme(id))) for id in range(1, 51)]
+    filme = filmes[0]
+    pagina = schemas.MoviePage(items=[schemas.Movie.model_validate(f) for f in filmes])
+    numero_pagina = max(numero // 50, 1)
+    return {
+        "movie_from_orm": medir(lambda: schemas.Movie.model_validate(filme), numero, repeticoes),
+        "movie_json": medir(lambda: schemas.Movie.model_validate(filme).model_dump_json(), numero, repeticoes),
+        "movie_jsonable_encoder": medir(lambda: jsonable_encoder(schemas.Movie.model_validate(filme)), numero, repeticoes),
+        "pagina_50_from_orm_json": medir(
+            lambda: schemas.MoviePage(items=[schemas.Movie.model_validate(f) for f in filmes]).model_dump_json(),
+            numero_pagina, repeticoes,
+        ),
+        "pagina_50_jsonable_encoder": medir(lambda: jsonable_encoder(pagina), numero_pagina, repeticoes),
+    }
+
+
+def bench_detalhe(numero, repeticoes) -> dict:
+    import json
+
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from models import models
+    from routers.filmes import _detalhe
+    from services import compressao, respostas
+    from utils.format import formatar_detalhes_tmdb
+
+    dados = formatar_detalhes_tmdb(detalhe_filme(550), max_elenco=20, regioes=["BR"], cargos=["Director"])
+    filme = models.Movie(**dados["filme"])
+    filme.genres = [models.Genre(**genero) for genero in dados["generos"]]
+    filme.cast_entries = [
+        models.MovieCast(person_id=ator["id"], cast_order=ator["order"], character_name=ator["character"],
+                         person=models.Person(id=ator["id"], name=ator["name"]))
+        for ator in dados["elenco"]
+    ]
+    filme.crew, filme.providers = [], []
+    chave = respostas.chave_filme(filme.id)
+    corpo = respostas.guardar(chave, _detalhe(filme))
+    corpo.codificado("gzip")
+    return {
+        # Antes: modelo montado do ORM, jsonable_encoder + json.dumps (response_class padrão sem fast path)
+        "detalhe_jsonable_encoder": medir(lambda: json.dumps(jsonable_encoder(_detalhe(filme))).encode(), numero, repeticoes),
+        "detalhe_model_dump_json": medir(lambda: _detalhe(filme).model_dump_json(), numero, repeticoes),
+        "detalhe_orjson": medir(lambda: orjson.dumps(_detalhe(filme).model_dump(mode="json")), numero, repeticoes),
+        "detalhe_cache_respostas": medir(lambda: respostas.obter(chave), numero, repeticoes),
+        # Compressão a cada resposta (middleware) x versão comprimida guardada no cache de respostas
+        "detalhe_gzip": medir(lambda: compressao.comprimir("gzip", corpo.conteudo), numero, repeticoes),
+        "detalhe_gzip_cache_respostas": medir(lambda: respostas.obter(chave).codificado("gzip"), numero, repeticoes),
+    }
+
+
+async def bench_auth(numero, repeticoes) -> dict:
+    from core import auth
+    from core.security import create_access_token
+    from database import AsyncSessionLocal, async_engine, engine
+    from migracoes import migrar
+    from models import models
+
+    migrar(engine)
+    async with AsyncSessionLocal() as db:
+        db.add(models.User(id=1, name="bench", email="bench@cinebase", password_hash="x", created_at=datetime.now()))
+        await db.commit()
+
+    token = create_access_token({"sub": "1"})
+
+    async def frio():
+        # Sem nada em cache: decodifica o JWT e busca o usuário no banco
+        auth._tokens.limpar()
+        auth._usuarios.limpar()
+        async with AsyncSessionLocal() as db:
+            await auth.get_current_user(token, db)
+
+    async def quente():
+        async with AsyncSessionLocal() as db:
+            await auth.get_current_user(token, db)
+
+    resultados = {
+        "get_current_user_frio": await medir_async(frio, max(numero // 10, 1), repeticoes),
+        "get_current_user_quente": await medir_async(quente, numero, repeticoes),
+    }
+    await async_engine.dispose()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--numero", type=int, default=2_000, help="chamadas por repetição")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--comparar", help="relatório JSON anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=15.0, help="piora máxima aceita (%%) na mediana")
+    args = parser.parse_args()
+
+    configurar_ambiente(nome="micro")
+
+    relatorio = {"config": {"numero": args.numero, "repeticoes": args.repeticoes}, "funcoes": {}}
+    relatorio["funcoes"].update(bench_format(args.numero, args.repeticoes))
+    relatorio["funcoes"].update(bench_schemas(args.numero, args.repeticoes))
+    relatorio["funcoes"].update(bench_detalhe(args.numero, args.repeticoes))
+    relatorio["funcoes"].update(asyncio.run(bench_auth(args.numero, args.repeticoes)))
+    raise SystemExit(salvar_e_comparar(
+        relatorio, "funcoes", args.saida, args.comparar, args.tolerancia,
+        metricas_menor=("mediana_us",), metricas_maior=(),
+    ))
+
+
+if __name__ == "__main__":
+    main()
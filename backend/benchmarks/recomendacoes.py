@@ -0,0 +1,197 @@
+# Modelo de recomendações (services/recomendacoes.py) com dados sintéticos: N avaliações de usuários que
+# preferem dois gêneros cada. Mede a reconstrução completa, gravar/carregar o arquivo, a atualização
+# incremental e a latência das consultas (só o modelo e com o SQL do histórico, como na rota).
+# Uso (a partir de backend/):
+#   python -m benchmarks.recomendacoes --avaliacoes 1000000 --saida rec.json
+#   python -m benchmarks.recomendacoes --comparar rec.json --tolerancia 20   # sai com 1 se regredir
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.comum import configurar_ambiente, resumir, salvar_e_comparar
+
+
+def gerar(rng, usuarios: int, filmes: int, avaliacoes: int, generos: int, pessoas: int) -> dict:
+    import numpy as np
+
+    genero_filme = rng.integers(1, generos + 1, filmes)  # gênero principal (os filmes têm até dois)
+    segundo_genero = rng.integers(1, generos + 1, filmes)
+    elenco = rng.integers(1, pessoas + 1, (filmes, 5))
+    favoritos = np.stack([rng.integers(1, generos + 1, usuarios), rng.integers(1, generos + 1, usuarios)], axis=1)
+
+    # 80% das avaliações em filmes dos gêneros favoritos, com notas altas; o resto aleatório, com notas baixas
+    ids_filmes = np.arange(1, filmes + 1)
+    por_genero = [ids_filmes[genero_filme == g] for g in range(generos + 1)]
+    autor = rng.integers(1, usuarios + 1, avaliacoes)
+    gosta = rng.random(avaliacoes) < 0.8
+    filme = rng.integers(1, filmes + 1, avaliacoes)
+    for g in range(1, generos + 1):
+        escolhidos = gosta & (favoritos[autor - 1, rng.integers(0, 2, avaliacoes)] == g)
+        if len(por_genero[g]):
+            filme[escolhidos] = rng.choice(por_genero[g], escolhidos.sum())
+    curtiu = (genero_filme[filme - 1] == favoritos[autor - 1, 0]) | (genero_filme[filme - 1] == favoritos[autor - 1, 1])
+    nota = np.where(curtiu, rng.integers(7, 11, avaliacoes), rng.integers(1, 7, avaliacoes))
+    return {
+        "genero_filme": genero_filme, "segundo_genero": segundo_genero, "elenco": elenco, "favoritos": favoritos,
+        "autor": autor, "filme": filme, "nota": nota,
+    }
+
+
+def popular(dados: dict, lote: int = 50_000) -> None:
+    from database import engine
+    from migracoes import migrar
+    from models import models
+
+    migrar(engine)
+    filmes = len(dados["genero_filme"])
+    generos = int(dados["favoritos"].max())
+    pessoas = int(dados["elenco"].max())
+    usuarios = len(dados["favoritos"])
+    with engine.begin() as conexao:
+        conexao.execute(models.Genre.__table__.insert(), [{"id": g, "name": f"Gênero {g}"} for g in range(1, generos + 1)])
+        conexao.execute(models.Person.__table__.insert(), [{"id": p, "name": f"Pessoa {p}"} for p in range(1, pessoas + 1)])
+        conexao.execute(models.User.__table__.insert(), [
+            {"id": u, "name": f"u{u}", "email": f"u{u}@bench", "password_hash": "x"} for u in range(1, usuarios + 1)
+        ])
+        conexao.execute(models.Movie.__table__.insert(), [{"id": f, "title": f"Filme {f}"} for f in range(1, filmes + 1)])
+        conexao.execute(models.MovieGenre.__table__.insert(), [
+            {"movie_id": f + 1, "genre_id": int(g)}
+            for f, (g, h) in enumerate(zip(dados["genero_filme"], dados["segundo_genero"]))
+            for g in {g, h}
+        ])
+        conexao.execute(models.MovieCast.__table__.insert(), [
+            {"movie_id": f + 1, "person_id": int(p), "cast_order": ordem}
+            for f, atores in enumerate(dados["elenco"])
+            for ordem, p in enumerate(dict.fromkeys(atores))
+        ])
+        conexao.execute(models.UserFavoriteGenre.__table__.insert(), [
+            {"user_id": u + 1, "genre_id": int(g)} for u, par in enumerate(dados["favoritos"]) for g in set(par)
+        ])
+        autor, filme, nota = dados["autor"], dados["filme"], dados["nota"]
+        for inicio in range(0, len(autor), lote):
+            fim = min(inicio + lote, len(autor))
+            conexao.execute(models.Review.__table__.insert(), [
+                {"id": i + 1, "user_id": int(autor[i]), "movie_id": int(filme[i]), "rating": int(nota[i])}
+                for i in range(inicio, fim)
+            ])
+
+
+def medir(funcao, vezes: int) -> dict:
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(vezes):
+        comeco = time.perf_counter()
+        funcao(i)
+        latencias.append((time.perf_counter() - comeco) * 1000)
+    return resumir(latencias, time.perf_counter() - inicio)
+
+
+async def medir_async(funcao, vezes: int) -> dict:
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(vezes):
+        comeco = time.perf_counter()
+        await funcao(i)
+        latencias.append((time.perf_counter() - comeco) * 1000)
+    return resumir(latencias, time.perf_counter() - inicio)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--avaliacoes", type=int, default=1_000_000)
+    parser.add_argument("--usuarios", type=int, default=50_000)
+    parser.add_argument("--filmes", type=int, default=20_000)
+    parser.add_argument("--generos", type=int, default=20)
+    parser.add_argument("--pessoas", type=int, default=30_000)
+    parser.add_argument("--consultas", type=int, default=2_000)
+    parser.add_argument("--saida", help="grava o relatório JSON neste arquivo")
+    parser.add_argument("--comparar", help="relatório JSON anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=20.0, help="piora máxima aceita (%%)")
+    args = parser.parse_args()
+
+    configurar_ambiente(nome="recomendacoes")
+    import numpy as np
+
+    rng = np.random.default_rng(42)
+    dados = gerar(rng, args.usuarios, args.filmes, args.avaliacoes, args.generos, args.pessoas)
+    inicio = time.perf_counter()
+    popular(dados)
+    print(f"{args.avaliacoes} avaliações geradas em {time.perf_counter() - inicio:.1f}s")
+
+    from database import AsyncSessionLocal, async_engine, engine
+    from services import recomendacoes
+
+    resultados = {}
+    inicio = time.perf_counter()
+    modelo = recomendacoes.construir(engine)
+    resultados["construcao"] = {"segundos": round(time.perf_counter() - inicio, 2)}
+
+    arquivo = os.path.join(tempfile.mkdtemp(), "recomendacoes.npz")
+    inicio = time.perf_counter()
+    modelo.salvar(arquivo)
+    gravar = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    recomendacoes.Modelo.carregar(arquivo)
+    resultados["arquivo"] = {
+        "mb": round(os.path.getsize(arquivo) / 2**20, 1),
+        "gravar_s": round(gravar, 2),
+        "carregar_s": round(time.perf_counter() - inicio, 2),
+    }
+
+    # Incremental: mil avaliações novas de usuários existentes
+    novas = np.column_stack([
+        np.arange(args.avaliacoes + 1, args.avaliacoes + 1001), rng.integers(1, args.usuarios + 1, 1000),
+        rng.integers(1, args.filmes + 1, 1000), rng.integers(1, 11, 1000),
+    ]).astype(np.float64)
+    inicio = time.perf_counter()
+    modelo.aplicar(novas)
+    resultados["incremental_1000"] = {"segundos": round(time.perf_counter() - inicio, 2)}
+
+    # Consultas: histórico montado a partir dos dados gerados (sem banco) e pela rota (com o SQL do histórico)
+    autores = rng.integers(1, args.usuarios + 1, args.consultas)
+    por_usuario = {}
+    for autor, filme, nota in zip(dados["autor"], dados["filme"], dados["nota"]):
+        por_usuario.setdefault(int(autor), []).append((int(filme), float(nota) - 6.0))
+    acertos = []
+
+    def consultar(i):
+        historico = por_usuario.get(int(autores[i]), [])
+        favoritos = [int(g) for g in dados["favoritos"][autores[i] - 1]]
+        lista = modelo.recomendar(historico, favoritos, [], {f for f, _ in historico}, 20)
+        acertos.append(np.isin(dados["genero_filme"][[f - 1 for f, _ in lista]], favoritos).mean() if lista else 0)
+
+    resultados["consulta_modelo"] = medir(consultar, args.consultas)
+    resultados["consulta_modelo"]["nos_generos_favoritos_pct"] = round(float(np.mean(acertos)) * 100, 1)
+
+    recomendacoes._modelo = modelo
+
+    async def rota():
+        async def consultar_rota(i):
+            async with AsyncSessionLocal() as db:
+                await recomendacoes.recomendar(db, int(autores[i]), 20)
+
+        resultado = await medir_async(consultar_rota, args.consultas)
+        await async_engine.dispose()
+        return resultado
+
+    resultados["consulta_com_historico_sql"] = asyncio.run(rota())
+
+    for nome, valores in resultados.items():
+        print(f"{nome}: {valores}")
+    relatorio = {
+        "config": {
+            "avaliacoes": args.avaliacoes, "usuarios": args.usuarios, "filmes": args.filmes,
+            "vizinhos": modelo.vizinhos.shape[1],
+        },
+        "etapas": resultados,
+    }
+    raise SystemExit(salvar_e_comparar(
+        relatorio, "etapas", args.saida, args.comparar, args.tolerancia,
+        metricas_menor=("segundos", "p95_ms"), metricas_maior=(),
+    ))
+
+
+if __name__ == "__main__":
+    main()
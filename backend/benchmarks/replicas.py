@@ -0,0 +1,178 @@
+# Roteamento de leituras para réplicas (database.get_db_leitura) com dois arquivos SQLite: o primário e uma
+# cópia somente leitura dele como réplica. A réplica não recebe as escritas, o que torna o destino de cada
+# leitura visível: o que foi gravado depois da cópia só aparece se a leitura foi ao primário.
+# Verifica e sai com 1 se falhar:
+#   - read-your-writes: logo após avaliar um filme, o autor vê a própria avaliação, tanto pelo cookie que a
+#     resposta do POST deixou quanto reenviando só o cabeçalho do marcador (cliente sem cookies);
+#   - as leituras sem o marcador vão para a réplica (não veem as avaliações novas);
+#   - com a réplica fora do ar, a verificação de saúde a tira do rodízio e as leituras seguem sem erros no
+#     primário; quando ela volta, volta ao rodízio.
+# Também mede a latência da carga mista e mostra as decisões de roteamento de /metrics.
+# Uso (a partir de backend/):
+#   python -m benchmarks.replicas --usuarios 50 --leituras 4000
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import time
+
+from benchmarks.comum import configurar_ambiente, resumir
+
+
+def popular(filmes: int, usuarios: int) -> None:
+    from database import engine
+    from migracoes import migrar
+    from models import models
+
+    migrar(engine)
+    with engine.begin() as conexao:
+        conexao.execute(models.Movie.__table__.insert(), [{"id": i, "title": f"Filme {i}"} for i in range(1, filmes + 1)])
+        conexao.execute(models.User.__table__.insert(), [
+            {"id": u, "name": f"u{u}", "email": f"u{u}@replicas", "password_hash": "x"} for u in range(1, usuarios + 1)
+        ])
+
+
+async def executar(args) -> int:
+    import httpx
+    from core.security import create_access_token
+    from database import CABECALHO_ESCRITA, replicas
+    from main import app
+    from services import replicas as servico_replicas
+
+    falhas = []
+    replica = replicas[0]
+    tokens = {u: {"Authorization": f"Bearer {create_access_token({'sub': str(u)})}"} for u in range(1, args.usuarios + 1)}
+    aleatorio = random.Random(42)
+    latencias = {"leitura": [], "escrita": []}
+    erros = 0
+
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        # `autor` guarda o cookie de escrita; `cliente` (anônimo, sem marcador) nunca grava
+        async with httpx.AsyncClient(transport=transporte, base_url="http://replicas") as cliente, \
+                httpx.AsyncClient(transport=transporte, base_url="http://replicas") as autor:
+
+            async def pedir(tipo, metodo, url, via=cliente, **kwargs):
+                nonlocal erros
+                comeco = time.perf_counter()
+                resposta = await via.request(metodo, url, **kwargs)
+                latencias[tipo].append((time.perf_counter() - comeco) * 1000)
+                if resposta.status_code >= 500:
+                    erros += 1
+                return resposta
+
+            async def ids_avaliacoes(filme, via=cliente, headers=None):
+                resposta = await pedir("leitura", "GET", f"/filmes/{filme}/avaliacoes?limit=200", via, headers=headers)
+                return {item["id"] for item in resposta.json()["items"]}
+
+            # 1. Usuários avaliam e leem em seguida (pelo cookie, pelo cabeçalho e sem o marcador)
+            vistas_pelo_autor = vistas_pelo_cabecalho = vistas_anonimas = 0
+            for u in range(1, args.usuarios + 1):
+                filme = aleatorio.randint(1, args.filmes)
+                comeco = time.perf_counter()
+                resposta = await autor.post(
+                    f"/filmes/{filme}/avaliacoes", json={"rating": 8, "comment": "ok"}, headers=tokens[u]
+                )
+                latencias["escrita"].append((time.perf_counter() - comeco) * 1000)
+                if resposta.status_code != 201:
+                    falhas.append(f"POST da avaliação: {resposta.status_code} {resposta.text[:200]}")
+                    break
+                nova = resposta.json()["id"]
+                marcador = {CABECALHO_ESCRITA: resposta.headers.get(CABECALHO_ESCRITA, "")}
+                vistas_pelo_autor += nova in await ids_avaliacoes(filme, autor)
+                vistas_pelo_cabecalho += nova in await ids_avaliacoes(filme, headers=marcador)
+                vistas_anonimas += nova in await ids_avaliacoes(filme)
+            if vistas_pelo_autor != args.usuarios:
+                falhas.append(f"read-your-writes: {vistas_pelo_autor}/{args.usuarios} autores viram a própria avaliação")
+            if vistas_pelo_cabecalho != args.usuarios:
+                falhas.append(f"read-your-writes pelo cabeçalho: {vistas_pelo_cabecalho}/{args.usuarios}")
+            if vistas_anonimas:
+                falhas.append(f"{vistas_anonimas} leituras anônimas viram avaliações novas (não foram à réplica)")
+
+            # 2. Carga de leitura do catálogo
+            async def trabalhador(quantidade):
+                for _ in range(quantidade):
+                    sorteio = aleatorio.random()
+                    if sorteio < 0.5:
+                        await pedir("leitura", "GET", f"/filmes/{aleatorio.randint(1, args.filmes)}/avaliacoes?limit=20")
+                    elif sorteio < 0.8:
+                        await pedir("leitura", "GET", "/filmes?limit=50")
+                    else:
+                        await pedir("leitura", "GET", "/filmes/ranking?limit=20")
+
+            inicio = time.perf_counter()
+            await asyncio.gather(*(trabalhador(args.leituras // args.concorrencia) for _ in range(args.concorrencia)))
+            duracao_carga = time.perf_counter() - inicio
+            carga = resumir(latencias["leitura"][-(args.leituras // args.concorrencia * args.concorrencia):], duracao_carga)
+
+            # 3. Réplica fora do ar: o arquivo some e o pool é fechado; a verificação de saúde a tira do rodízio
+            arquivo = args.replica
+            shutil.move(arquivo, arquivo + ".fora")
+            await replica.engine.dispose()
+            await servico_replicas.verificar(replica)
+            if replica.saudavel:
+                falhas.append("a réplica fora do ar continuou no rodízio")
+            erros_antes = erros
+            await trabalhador(200)
+            if erros != erros_antes:
+                falhas.append(f"{erros - erros_antes} erros com a réplica fora do ar")
+            shutil.move(arquivo + ".fora", arquivo)
+            await servico_replicas.verificar(replica)
+            if not replica.saudavel:
+                falhas.append("a réplica não voltou ao rodízio")
+
+            metricas = (await cliente.get("/metrics")).text
+
+    roteamento = {
+        f"{destino}/{motivo}": valor
+        for (destino, motivo), valor in sorted(_roteamento_por_rotulos(metricas).items())
+    }
+    relatorio = {
+        "config": {"usuarios": args.usuarios, "filmes": args.filmes, "leituras": args.leituras, "concorrencia": args.concorrencia},
+        "carga_leitura": carga,
+        "escritas": resumir(latencias["escrita"], 0),
+        "erros_5xx": erros,
+        "roteamento": roteamento,
+        "falhas": falhas,
+    }
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    return 1 if falhas else 0
+
+
+def _roteamento_por_rotulos(texto_metricas: str) -> dict:
+    from prometheus_client.parser import text_string_to_metric_families
+
+    resultado = {}
+    for familia in text_string_to_metric_families(texto_metricas):
+        if familia.name == "cinebase_db_roteamento":
+            for amostra in familia.samples:
+                if amostra.name.endswith("_total"):
+                    resultado[amostra.labels["destino"], amostra.labels["motivo"]] = amostra.value
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--filmes", type=int, default=500)
+    parser.add_argument("--leituras", type=int, default=4000)
+    parser.add_argument("--concorrencia", type=int, default=16)
+    args = parser.parse_args()
+
+    configurar_ambiente(nome="replicas")
+    primario = os.environ["DATABASE_URL"].removeprefix("sqlite:///")
+    args.replica = os.path.join(os.path.dirname(primario), "replica.sqlite")
+    os.environ["DB_REPLICAS"] = f"sqlite:///file:{args.replica}?mode=ro&uri=true"
+    os.environ["RECOMENDACOES_HABILITADA"] = "false"
+    os.environ["RESPOSTAS_CACHE_HABILITADO"] = "false"
+
+    popular(args.filmes, args.usuarios)
+    shutil.copy(primario, args.replica)  # a "replicação": uma cópia feita uma vez, antes das escritas
+    sys.exit(asyncio.run(executar(args)))
+
+
+if __name__ == "__main__":
+    main()
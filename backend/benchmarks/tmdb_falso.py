@@ -0,0 +1,169 @@
+# Servidor local que imita os endpoints do TMDB usados pela API e pela ingestão, com latência e taxa de erro configuráveis.
+# Os payloads são gerados de forma determinística a partir do id/consulta (mesma resposta em toda execução).
+# Uso isolado (a partir de backend/): python -m benchmarks.tmdb_falso --porta 8901 --latencia-ms 80
+# e depois TMDB_URL=http://127.0.0.1:8901 USE_BEARER= uvicorn main:app
+import argparse
+import asyncio
+import hashlib
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+PALAVRAS = [
+    "amor", "guerra", "noite", "cidade", "sombra", "ação", "coração", "vingança", "estrela", "mar",
+    "último", "perdido", "segredo", "fogo", "gelo", "rei", "rainha", "missão", "impossível", "tempo",
+]
+GENEROS = [(28, "Ação"), (12, "Aventura"), (35, "Comédia"), (18, "Drama"), (27, "Terror"), (878, "Ficção científica")]
+PROVEDORES = [(8, "Netflix"), (119, "Amazon Prime Video"), (337, "Disney Plus"), (1899, "Max")]
+
+
+def _rng(*semente) -> random.Random:
+    return random.Random(hashlib.sha256(repr(semente).encode()).digest())
+
+
+def titulo(id: int) -> str:
+    rng = _rng("titulo", id)
+    return " ".join(rng.choice(PALAVRAS) for _ in range(rng.randint(1, 3))).capitalize() + f" {id}"
+
+
+def resumo_filme(id: int) -> dict:
+    rng = _rng("resumo", id)
+    return {
+        "id": id,
+        "title": titulo(id),
+        "overview": f"Sinopse do filme {id}. " * rng.randint(2, 6),
+        "poster_path": f"/poster{id}.jpg",
+        "release_date": f"{rng.randint(1970, 2025)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "vote_average": round(rng.uniform(3, 9), 1),
+        "genre_ids": [genero for genero, _ in rng.sample(GENEROS, 2)],
+    }
+
+
+def detalhe_filme(id: int) -> dict:
+    rng = _rng("detalhe", id)
+    filme = resumo_filme(id)
+    filme.pop("genre_ids")
+    filme.update({
+        "budget": rng.randint(1, 300) * 1_000_000,
+        "revenue": rng.randint(0, 1_500) * 1_000_000,
+        "runtime": rng.randint(80, 180),
+        "genres": [{"id": genero, "name": nome} for genero, nome in rng.sample(GENEROS, 2)],
+        "spoken_languages": [{"english_name": "Portuguese"}],
+        "production_countries": [{"name": "Brazil"}],
+        "credits": {
+            "cast": [
+                {
+                    "id": 10_000 + (id * 7 + i) % 5_000,
+                    "name": f"Ator {(id * 7 + i) % 5_000}",
+                    "character": f"Personagem {i}",
+                    "order": i,
+                    "profile_path": None,
+                }
+                for i in range(10)
+            ],
+            "crew": [{"id": 90_000 + id % 500, "name": f"Diretor {id % 500}", "job": "Director"}],
+        },
+        "watch/providers": {
+            "results": {
+                "BR": {"flatrate": [{"provider_id": p, "provider_name": nome} for p, nome in rng.sample(PROVEDORES, 2)]}
+            }
+        },
+    })
+    return filme
+
+
+def criar_app(latencia_ms: float = 50.0, jitter_ms: float = 10.0, taxa_erro: float = 0.0,
+              catalogo: int = 5_000, semente: int = 42, taxa_429: float = 0.0) -> FastAPI:
+    app = FastAPI(title="TMDB falso")
+    sorteio = random.Random(semente)
+    app.state.requisicoes = 0
+
+    @app.middleware("http")
+    async def simular_rede(request: Request, call_next):
+        app.state.requisicoes += 1
+        await asyncio.sleep(max(latencia_ms + sorteio.uniform(-jitter_ms, jitter_ms), 0) / 1000)
+        if sorteio.random() < taxa_erro:
+            return JSONResponse({"status_message": "erro simulado"}, status_code=503)
+        if sorteio.random() < taxa_429:
+            return JSONResponse({"status_message": "cota excedida (simulado)"}, status_code=429, headers={"Retry-After": "1"})
+        return await call_next(request)
+
+    def listagem(nome: str, page: int, total_paginas: int):
+        inicio = (_rng("lista", nome).randint(0, catalogo // 2) + (page - 1) * 20) % catalogo
+        return {
+            "page": page,
+            "total_pages": total_paginas,
+            "total_results": total_paginas * 20,
+            "results": [resumo_filme(inicio + i + 1) for i in range(20)] if page <= total_paginas else [],
+        }
+
+    @app.get("/movie/now_playing")
+    async def em_cartaz(page: int = 1, region: str = "BR"):
+        return listagem(f"cartaz:{region}", page, 5)
+
+    @app.get("/movie/upcoming")
+    async def em_breve(page: int = 1, region: str = "BR"):
+        return listagem(f"em_breve:{region}", page, 3)
+
+    @app.get("/movie/popular")
+    async def populares(page: int = 1):
+        return listagem("popular", page, 50)
+
+    @app.get("/movie/top_rated")
+    async def mais_votados(page: int = 1):
+        return listagem("top_rated", page, 50)
+
+    @app.get("/movie/changes")
+    async def alteracoes(start_date: str, end_date: str, page: int = 1):
+        rng = _rng("alteracoes", start_date, end_date)
+        ids = sorted({rng.randint(1, catalogo) for _ in range(300)})
+        pagina = ids[(page - 1) * 100:page * 100]
+        return {
+            "page": page,
+            "total_pages": (len(ids) + 99) // 100,
+            "total_results": len(ids),
+            "results": [{"id": id, "adult": False} for id in pagina],
+        }
+
+    @app.get("/movie/{id}")
+    async def filme(id: int):
+        if id < 1 or id > catalogo:
+            return JSONResponse({"status_message": "The resource you requested could not be found."}, status_code=404)
+        return detalhe_filme(id)
+
+    @app.get("/search/movie")
+    async def busca(query: str, page: int = 1):
+        termo = query.strip().lower()
+        rng = _rng("busca", termo)
+        ids = sorted({rng.randint(1, catalogo) for _ in range(20)}) if termo else []
+        resultados = []
+        for id in ids:
+            filme = resumo_filme(id)
+            filme["title"] = f"{query.strip().capitalize()} {filme['title']}"
+            resultados.append(filme)
+        return {"page": page, "total_pages": 1, "total_results": len(resultados), "results": resultados}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--porta", type=int, default=8901)
+    parser.add_argument("--latencia-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas 503 (0 a 1)")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="fração de respostas 429 com Retry-After")
+    parser.add_argument("--catalogo", type=int, default=5_000, help="ids válidos vão de 1 a N; acima disso, 404")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(
+        criar_app(args.latencia_ms, args.jitter_ms, args.taxa_erro, args.catalogo, taxa_429=args.taxa_429),
+        port=args.porta, log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,81 @@
+import hashlib
+import time
+from datetime import datetime
 from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordBearer
 from models import models, schemas
 from database import get_db
 from core.config import settings
+from services import metricas
+from services.cache import CacheLRU
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Tokens já verificados (chave = sha256 do token, expiram junto com o "exp" do JWT)
+_tokens = CacheLRU(max_itens=settings.AUTH_CACHE_MAX_TOKENS)
+# Usuários carregados do banco, por id, com TTL curto. A invalidação abaixo (eventos do ORM) só alcança este
+# processo e só flushes de objetos User: UPDATE/DELETE em massa (update(User), delete(User)), SQL direto e
+# alterações feitas por outros workers não a disparam. Nesses casos o usuário antigo vale por até
+# AUTH_CACHE_TTL_USUARIO segundos.
+_usuarios = CacheLRU(max_itens=settings.AUTH_CACHE_MAX_USUARIOS)
+metricas.registrar_cache("auth_tokens", _tokens)
+metricas.registrar_cache("auth_usuarios", _usuarios)
+
+
+def _decodificar_token(token: str) -> dict:
+    chave = hashlib.sha256(token.encode()).hexdigest()
+    payload, _ = _tokens.get(chave)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    exp = payload.get("exp")
+    ttl = exp - time.time() if exp else settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    if ttl > 0:
+        _tokens.set(chave, payload, ttl)
+    return payload
+
+
+# Claims do usuário embutidas no token no login (AUTH_CLAIMS_NO_TOKEN), dispensando a consulta ao banco
+def claims_usuario(user: models.User) -> dict:
+    return {"name": user.name, "email": user.email, "created_at": user.created_at.isoformat()}
+
+
+def _usuario_das_claims(user_id: int, payload: dict) -> schemas.User | None:
+    if not all(claim in payload for claim in ("name", "email", "created_at")):
+        return None
+    return schemas.User(
+        id=user_id,
+        name=payload["name"],
+        email=payload["email"],
+        created_at=datetime.fromisoformat(payload["created_at"]),
+    )
+
+
+def invalidar_usuario(user_id: int):
+    _usuarios.invalidar(user_id)
+
+
+# Alterações pela sessão (user.name = ..., db.delete(user)) neste processo; ver o limite no topo
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidar_usuario_alterado(mapper, connection, target):
+    invalidar_usuario(target.id)
+
+
+# Retorna um snapshot (schemas.User) do usuário autenticado; em rajadas de requisições com o mesmo
+# token o custo é uma decodificação de JWT e nenhuma consulta ao banco
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> schemas.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = _decodificar_token(token)
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -23,7 +83,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.id == int(token_data.sub)).first()
-    if user is None:
+    user_id = int(token_data.sub)
+    user = _usuario_das_claims(user_id, payload)
+    if user is not None:
+        return user
+
+    user, _ = _usuarios.get(user_id)
+    if user is not None:
+        return user
+
+    db_user = await db.get(models.User, user_id)
+    if db_user is None:
         raise credentials_exception
+    user = schemas.User.from_orm(db_user)
+    _usuarios.set(user_id, user, settings.AUTH_CACHE_TTL_USUARIO)
+    return user
+
+
+# Rotas administrativas: usuário autenticado cujo e-mail está em ADMIN_EMAILS
+async def get_current_admin(user: schemas.User = Depends(get_current_user)) -> schemas.User:
+    administradores = {email.strip().lower() for email in settings.ADMIN_EMAILS.split(",") if email.strip()}
+    if user.email.lower() not in administradores:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito a administradores")
     return user
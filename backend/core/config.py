@@ -3,10 +3,34 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str  # Padronizado para maiúsculas
+    ASYNC_DATABASE_URL: str | None = None  # padrão: DATABASE_URL com driver asyncpg/aiosqlite
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    AQUECIMENTO_CONEXOES: int | None = None  # abertas na subida, antes de /pronto responder 200 (padrão: DB_POOL_SIZE)
+
+    # Réplicas de leitura (URLs separadas por vírgula, cada uma com pool próprio de DB_POOL_SIZE): as rotas de
+    # leitura do catálogo usam database.get_db_leitura; escritas e leituras logo após uma escrita ficam no primário
+    DB_REPLICAS: str = ""
+    DB_REPLICA_VERIFICACAO: float = 5.0  # intervalo das verificações de saúde (segundos)
+    DB_REPLICA_TIMEOUT: float = 2.0
+    DB_REPLICA_ATRASO_MAX: float = 5.0  # atraso de replicação aceito (PostgreSQL); acima disso a réplica sai do rodízio
+    DB_LER_DO_PRIMARIO_APOS_ESCRITA: float = 10.0  # read-your-writes: leituras do mesmo cliente vão ao primário
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # E-mails (separados por vírgula) com acesso às rotas /admin
+    ADMIN_EMAILS: str = ""
+
+    # Cache da autenticação: tokens verificados e usuários carregados do banco
+    AUTH_CACHE_MAX_TOKENS: int = 10_000
+    AUTH_CACHE_MAX_USUARIOS: int = 10_000
+    # Teto de quanto um usuário alterado ou apagado continua valendo nos processos que não fizeram a alteração
+    # (ver core/auth.py): mantenha curto
+    AUTH_CACHE_TTL_USUARIO: float = 5.0
+    # Embute nome/e-mail no JWT; o usuário autenticado passa a vir do token (alterações só valem no próximo login)
+    AUTH_CLAIMS_NO_TOKEN: bool = False
+
     # Caso você queira usar outras variáveis do .env (MANTENHA, POIS PARECEM ÚTEIS)
     TMDB_API_KEY_V3: str
     TMDB_URL: str
@@ -16,6 +40,122 @@ class Settings(BaseSettings):
     USE_BEARER: str
     BEARER_TOKEN: str
 
+    # Cliente HTTP do TMDB (pool de conexões compartilhado)
+    TMDB_POOL_SIZE: int = 20
+    TMDB_CONNECT_TIMEOUT: float = 3.0
+    TMDB_READ_TIMEOUT: float = 10.0
+    TMDB_POOL_TIMEOUT: float = 5.0
+    TMDB_KEEPALIVE_EXPIRY: float = 30.0
+    TMDB_HTTP2: bool = False
+
+    # Cota de chamadas ao TMDB por processo (token bucket; 0 desliga) e retentativas de 429/5xx/erros de rede
+    TMDB_LIMITE_POR_SEGUNDO: float = 40.0
+    TMDB_LIMITE_RAJADA: int = 20
+    TMDB_TENTATIVAS: int = 3  # total de tentativas por chamada, incluindo a primeira
+    TMDB_BACKOFF_BASE: float = 0.5  # segundos; dobra a cada tentativa, com jitter
+    TMDB_BACKOFF_MAX: float = 8.0
+    TMDB_RETRY_AFTER_MAX: float = 30.0  # Retry-After maior que isso é encurtado
+
+    # Cache das respostas do TMDB (TTL em segundos por endpoint)
+    TMDB_CACHE_MAX_ITENS: int = 2048
+    TMDB_CACHE_MAX_BYTES: int | None = 64 * 1024 * 1024
+    TMDB_CACHE_TTL_FILME: float = 6 * 60 * 60
+    TMDB_CACHE_TTL_EM_CARTAZ: float = 60 * 60
+    TMDB_CACHE_TTL_BUSCA: float = 10 * 60
+    TMDB_CACHE_JANELA_OBSOLETA: float = 60 * 60
+    TMDB_CACHE_TTL_NEGATIVO: float = 5 * 60  # filme inexistente (404) e busca sem resultados
+
+    # Circuit breaker do TMDB: abre após N falhas seguidas e testa de novo depois do tempo aberto
+    TMDB_CIRCUITO_LIMIAR_FALHAS: int = 5
+    TMDB_CIRCUITO_TEMPO_ABERTO: float = 30.0
+
+    # /em_cartaz/completo: todas as páginas de now_playing, buscadas em paralelo
+    EM_CARTAZ_MAX_PAGINAS: int = 10  # por região
+    EM_CARTAZ_MAX_REGIOES: int = 5
+    EM_CARTAZ_CONCORRENCIA: int = 4  # páginas buscadas ao mesmo tempo
+
+    # /filmes/lote: vários detalhes numa requisição
+    LOTE_MAX_IDS: int = 50
+    LOTE_CONCORRENCIA_TMDB: int = 8  # filmes ausentes buscados ao mesmo tempo no TMDB
+
+    # Recomendações (services/recomendacoes.py): vizinhos de cada filme pré-calculados e mantidos em memória
+    # Carrega/constrói o modelo e o atualiza em segundo plano. Desligado por padrão: cada worker da API faria a
+    # sua reconstrução completa e guardaria a sua cópia das matrizes (ver o readme)
+    RECOMENDACOES_HABILITADA: bool = False
+    RECOMENDACOES_ARQUIVO: str = ""  # modelo gerado por `python manage.py recomendacoes`, carregado na subida
+    RECOMENDACOES_VIZINHOS: int = 50  # vizinhos guardados por filme
+    RECOMENDACOES_INTERVALO: float = 60  # avaliações novas incorporadas a cada intervalo
+    RECOMENDACOES_RECONSTRUCAO: float = 24 * 60 * 60  # idade máxima do modelo antes de reconstruir do zero
+    RECOMENDACOES_LOTE: int = 5000  # avaliações por atualização incremental
+    RECOMENDACOES_BLOCO: int = 512  # filmes por bloco da matriz de similaridades
+    RECOMENDACOES_ELENCO: int = 5  # atores (por ordem nos créditos) usados como característica do filme
+    RECOMENDACOES_PESO_CONTEUDO: float = 0.2  # parte da similaridade vinda de gêneros/elenco (o resto, das notas)
+    RECOMENDACOES_PESO_ASSISTIDO: float = 1.0  # nota implícita de um filme assistido e não avaliado
+    RECOMENDACOES_PESO_FAVORITOS: float = 0.5  # gêneros e pessoas favoritos do usuário
+    RECOMENDACOES_PESO_POPULARIDADE: float = 0.05
+
+    # Avaliações em lote (write-behind, services/avaliacoes_em_lote.py): a rota enfileira e um gravador faz um
+    # commit por lote; o 201 só sai depois do commit que contém a avaliação
+    AVALIACOES_EM_LOTE: bool = False
+    AVALIACOES_LOTE_MAX: int = 200  # avaliações por commit
+    AVALIACOES_LOTE_MS: float = 5.0  # espera máxima para o lote encher, contada da primeira avaliação
+    AVALIACOES_FILA_MAX: int = 5000
+    AVALIACOES_FILA_ESPERA: float = 1.0  # com a fila cheia, segundos esperando vaga antes de responder 503
+
+    # Operações em lote na watchlist: filmes por requisição
+    WATCHLIST_LOTE_MAX: int = 500
+
+    # Exportações (/admin/exportar e python manage.py exportar): linhas lidas do cursor por vez
+    EXPORTACAO_LOTE: int = 5000
+
+    # Resultados de /filmes/search vindos do TMDB são gravados depois da resposta
+    BUSCA_PERSISTIR_EM_SEGUNDO_PLANO: bool = True
+
+    # Motor da busca por título: "auto" (PostgreSQL se disponível), "postgres" ou "indice" (em memória)
+    BUSCA_MOTOR: str = "auto"
+    BUSCA_INDICE_TTL: float = 5 * 60  # intervalo para reconstruir o índice em memória a partir do banco
+
+    # Ranking: média bayesiana (nota a priori com peso de N avaliações) para não premiar filmes com 1 voto
+    RANKING_PRIOR_MEDIA: float = 6.0
+    RANKING_PRIOR_PESO: int = 10
+
+    # Ingestão do catálogo a partir das listas do TMDB (services/ingestao.py, python manage.py ingerir)
+    INGESTAO_HABILITADA: bool = False  # roda também como tarefa em segundo plano da aplicação
+    INGESTAO_INTERVALO: float = 6 * 60 * 60
+    INGESTAO_FONTES: str = "now_playing,upcoming,popular,changes"
+    INGESTAO_REGIOES: str = "BR"  # para now_playing/upcoming
+    INGESTAO_MAX_PAGINAS: int = 20  # por lista e por ciclo
+    INGESTAO_CONCORRENCIA: int = 8  # detalhes buscados em paralelo
+    INGESTAO_IDADE_MAXIMA: float = 24 * 60 * 60  # filmes sincronizados há menos tempo que isso não são rebuscados
+
+    # Detalhes completos dos filmes gravados localmente (importação sob demanda e ingestão)
+    DETALHES_MAX_ELENCO: int = 20
+    DETALHES_REGIOES_PROVEDORES: str = "BR"  # regiões dos provedores de streaming guardados
+
+    # Corpos JSON pré-serializados das respostas quentes (detalhe de filme, em cartaz)
+    RESPOSTAS_CACHE_HABILITADO: bool = True
+    RESPOSTAS_CACHE_MAX_ITENS: int = 5000
+    RESPOSTAS_CACHE_MAX_BYTES: int | None = 32 * 1024 * 1024
+    RESPOSTAS_CACHE_TTL: float = 5 * 60  # limita a defasagem entre workers (a invalidação é por processo)
+
+    # Cache HTTP: Cache-Control por rota (todas com ETag e If-None-Match -> 304)
+    CACHE_CONTROL_FILME: str = "public, max-age=300"
+    CACHE_CONTROL_EM_CARTAZ: str = "public, max-age=600"
+    CACHE_CONTROL_AVALIACOES: str = "public, no-cache"  # sempre revalida; o 304 sai sem ler as avaliações
+
+    # Compressão das respostas (gzip; brotli se o pacote estiver instalado)
+    COMPRESSAO_HABILITADA: bool = True
+    COMPRESSAO_TAMANHO_MINIMO: int = 1024  # bytes; corpos menores vão sem compressão
+    COMPRESSAO_NIVEL_GZIP: int = 6
+    COMPRESSAO_NIVEL_BROTLI: int = 5
+
+    # Métricas (/metrics) e diagnóstico de desempenho
+    METRICAS_N_MAIS_UM_LIMIAR: int = 10  # mesma consulta repetida N vezes numa requisição gera um aviso
+    PROFILER_HABILITADO: bool = False  # profiler por amostragem (custo extra de CPU enquanto ativo)
+    PROFILER_LIMIAR_MS: float = 500.0  # requisições mais lentas que isso têm o perfil gravado
+    PROFILER_INTERVALO_MS: float = 5.0
+    PROFILER_DIRETORIO: str = "perfis"
+
     class Config:
         env_file = ".env"
         extra = "allow"  # permite variáveis não listadas
@@ -1,20 +1,188 @@
 # crud/movie.py
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from models.models import Movie as MovieModel  # Modelo SQLAlchemy
+from models.models import (
+    Genre, MovieCast, MovieCrew, MovieGenre, MovieProvider, MovieSync, Person,
+    WatchProvider,
+)
 from models.schemas import MovieCreate
+from core.config import settings
+from utils.format import formatar_detalhes_tmdb
+from crud import search, stats
 
-def get_movie_by_title(db: Session, title: str):
-    return db.query(MovieModel).filter(MovieModel.title.ilike(f"%{title}%")).all()
+# Busca por título usando os índices de texto (ver crud/search.py), já ordenada por relevância
+async def get_movie_by_title(db: AsyncSession, title: str, limit: int = 20):
+    return [filme for filme, _ in await search.search_movies(db, title, limit)]
 
-def get_movie_by_tmdb_id(db: Session, id: int):
-    return db.query(MovieModel).filter(MovieModel.id == id).first()
+async def get_movie_by_tmdb_id(db: AsyncSession, id: int):
+    return await db.get(MovieModel, id)
 
-def create_movie(db: Session, filme: MovieCreate):
-    existente = db.query(MovieModel).filter_by(id=filme.id).first()
+# Filme com gêneros, elenco, equipe e provedores carregados em 5 consultas fixas (1 + 4 selectin),
+# independente do tamanho do elenco. Retorna (filme, synced_at); synced_at None = detalhes nunca importados.
+def _consulta_detalhes():
+    return (
+        select(MovieModel, MovieSync.synced_at)
+        .outerjoin(MovieSync, MovieSync.movie_id == MovieModel.id)
+        .execution_options(populate_existing=True)  # o filme pode já estar na sessão sem os detalhes
+        .options(
+            selectinload(MovieModel.genres),
+            selectinload(MovieModel.cast_entries).joinedload(MovieCast.person),
+            selectinload(MovieModel.crew).joinedload(MovieCrew.person),
+            selectinload(MovieModel.providers).joinedload(MovieProvider.provider),
+        )
+    )
+
+
+async def get_movie_details(db: AsyncSession, id: int):
+    linha = (await db.execute(_consulta_detalhes().where(MovieModel.id == id))).first()
+    return (linha[0], linha[1]) if linha else (None, None)
+
+
+# Vários filmes com os detalhes: um IN para os filmes e uma consulta por relacionamento, qualquer que seja N.
+# Retorna {id: (filme, synced_at)} só com os ids encontrados.
+async def get_movies_details(db: AsyncSession, ids: list[int]) -> dict:
+    if not ids:
+        return {}
+    linhas = await db.execute(_consulta_detalhes().where(MovieModel.id.in_(ids)))
+    return {filme.id: (filme, sincronizado_em) for filme, sincronizado_em in linhas}
+
+# Payload de detalhe do TMDB -> linhas para upsert_movie_details, com os limites configurados
+def normalizar_detalhes(dados: dict) -> dict:
+    return formatar_detalhes_tmdb(
+        dados,
+        max_elenco=settings.DETALHES_MAX_ELENCO,
+        regioes=[regiao.strip() for regiao in settings.DETALHES_REGIOES_PROVEDORES.split(",") if regiao.strip()],
+    )
+
+# Página do catálogo por keyset na chave primária (range scan, sem OFFSET)
+async def list_movies(db: AsyncSession, limit: int, apos_id: Optional[int] = None):
+    consulta = select(MovieModel)
+    if apos_id is not None:
+        consulta = consulta.where(MovieModel.id > apos_id)
+    return (await db.scalars(consulta.order_by(MovieModel.id).limit(limit))).all()
+
+async def create_movie(db: AsyncSession, filme: MovieCreate):
+    existente = await db.get(MovieModel, filme.id)
     if existente:
         return existente  # já existe, retorna direto
     db_movie = MovieModel(**filme.dict())
     db.add(db_movie)
-    db.commit()
-    db.refresh(db_movie)
-    return db_movie
\ No newline at end of file
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Outra requisição inseriu o mesmo filme entre o SELECT e o INSERT
+        await db.rollback()
+        return await db.get(MovieModel, filme.id)
+    await db.refresh(db_movie)
+    search.index_movies([(db_movie.id, db_movie.title)])
+    return db_movie
+
+# Ids de filmes alterados nesta transação; o cache de respostas (services/respostas.py) os descarta após o commit
+def _marcar_alterados(db: AsyncSession, ids):
+    db.info.setdefault("filmes_alterados", set()).update(ids)
+
+# INSERT multi-linha com ON CONFLICT (chave) DO NOTHING/UPDATE; não faz commit
+async def _upsert(db: AsyncSession, modelo, linhas: List[dict], atualizar: bool) -> int:
+    tabela = modelo.__table__
+    chaves = [coluna.name for coluna in tabela.primary_key]
+    dialeto = db.get_bind().dialect.name
+    if dialeto in ("postgresql", "sqlite"):
+        # SQLite >= 3.24 entende a mesma sintaxe do PostgreSQL
+        dialect_insert = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+        stmt = dialect_insert(tabela).values(linhas)
+        colunas = {coluna: stmt.excluded[coluna] for coluna in linhas[0] if coluna not in chaves}
+        if atualizar and colunas:
+            stmt = stmt.on_conflict_do_update(index_elements=chaves, set_=colunas)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=chaves)
+        return (await db.execute(stmt)).rowcount
+
+    # Bancos sem ON CONFLICT: descobre os existentes com um único SELECT ... IN (chave simples)
+    chave = tabela.c[chaves[0]]
+    existentes = set(await db.scalars(select(chave).where(chave.in_([linha[chave.name] for linha in linhas]))))
+    novas = [linha for linha in linhas if linha[chave.name] not in existentes]
+    if novas:
+        await db.execute(insert(tabela), novas)
+    if not atualizar:
+        return len(novas)
+    alteradas = [linha for linha in linhas if linha[chave.name] in existentes]
+    if alteradas:
+        await db.execute(update(modelo), alteradas)  # UPDATE em lote por chave primária
+    return len(linhas)
+
+
+# Insere (ou atualiza) vários filmes com um único INSERT multi-linha e um único COMMIT
+async def upsert_movies(db: AsyncSession, filmes: List[MovieCreate], atualizar: bool = False) -> int:
+    agora = datetime.utcnow()
+    linhas = list({filme.id: {**filme.dict(), "updated_at": agora} for filme in filmes}.values())  # remove ids repetidos
+    if not linhas:
+        return 0
+
+    afetadas = await _upsert(db, MovieModel, linhas, atualizar)
+    if atualizar:
+        _marcar_alterados(db, [linha["id"] for linha in linhas])
+    await db.commit()
+    search.index_movies([(linha["id"], linha["title"]) for linha in linhas], substituir=atualizar)
+    return afetadas
+
+
+# Grava detalhes completos (saída de normalizar_detalhes) de vários filmes numa única transação:
+# filmes, gêneros, pessoas e provedores por upsert; movie_genres/movie_cast/movie_crew/movie_providers
+# substituídos por filme.
+# O commit fica com quem chama, para poder gravar o checkpoint da ingestão na mesma transação.
+async def upsert_movie_details(db: AsyncSession, detalhes: List[dict]) -> int:
+    detalhes = list({d["filme"]["id"]: d for d in detalhes if d["filme"]["title"]}.values())
+    if not detalhes:
+        return 0
+    ids = [d["filme"]["id"] for d in detalhes]
+    _marcar_alterados(db, ids)
+
+    agora = datetime.utcnow()
+    await _upsert(db, MovieModel, [{**d["filme"], "updated_at": agora} for d in detalhes], atualizar=True)
+    generos = {g["id"]: g for d in detalhes for g in d["generos"]}
+    if generos:
+        await _upsert(db, Genre, list(generos.values()), atualizar=True)
+    pessoas = {p["id"]: {"id": p["id"], "name": p["name"], "role_type": "equipe"} for d in detalhes for p in d["equipe"]}
+    pessoas.update({a["id"]: {"id": a["id"], "name": a["name"], "role_type": "ator"} for d in detalhes for a in d["elenco"]})
+    if pessoas:
+        await _upsert(db, Person, list(pessoas.values()), atualizar=False)
+    provedores = {
+        p["id"]: {"id": p["id"], "name": p["name"], "logo_path": p["logo_path"]} for d in detalhes for p in d["provedores"]
+    }
+    if provedores:
+        await _upsert(db, WatchProvider, list(provedores.values()), atualizar=True)
+
+    for modelo in (MovieGenre, MovieCast, MovieCrew, MovieProvider):
+        await db.execute(delete(modelo).where(modelo.movie_id.in_(ids)))
+    associacoes = (
+        (MovieGenre, [{"movie_id": d["filme"]["id"], "genre_id": g["id"]} for d in detalhes for g in d["generos"]]),
+        (MovieCast, [
+            {"movie_id": d["filme"]["id"], "person_id": a["id"], "character_name": a["character"], "cast_order": a["order"]}
+            for d in detalhes for a in d["elenco"]
+        ]),
+        (MovieCrew, [
+            {"movie_id": d["filme"]["id"], "person_id": p["id"], "job": p["job"]} for d in detalhes for p in d["equipe"]
+        ]),
+        (MovieProvider, [
+            {"movie_id": d["filme"]["id"], "provider_id": p["id"], "region": p["region"], "kind": p["kind"],
+             "display_priority": p["display_priority"]}
+            for d in detalhes for p in d["provedores"]
+        ]),
+    )
+    for modelo, linhas in associacoes:
+        if linhas:
+            await db.execute(insert(modelo), linhas)
+
+    await _upsert(db, MovieSync, [{"movie_id": id, "synced_at": agora} for id in ids], atualizar=True)
+
+    # Os gêneros podem ter mudado: o ranking por gênero dos filmes já avaliados acompanha
+    await stats.refresh_movie_leaderboard(db, ids)
+
+    search.index_movies([(d["filme"]["id"], d["filme"]["title"]) for d in detalhes])
+    return len(detalhes)
@@ -0,0 +1,21 @@
+# crud/review.py
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.models import Review as ReviewModel
+
+
+# Página de avaliações de um filme em ordem (created_at, id), usando o índice (movie_id, created_at, id)
+async def get_movie_reviews(db: AsyncSession, movie_id: int, limit: int, apos: Optional[Tuple[datetime, int]] = None):
+    consulta = select(ReviewModel).where(ReviewModel.movie_id == movie_id)
+    if apos is not None:
+        created_at, id = apos
+        consulta = consulta.where(
+            or_(
+                ReviewModel.created_at > created_at,
+                and_(ReviewModel.created_at == created_at, ReviewModel.id > id),
+            )
+        )
+    consulta = consulta.order_by(ReviewModel.created_at, ReviewModel.id).limit(limit)
+    return (await db.scalars(consulta)).all()
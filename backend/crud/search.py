@@ -0,0 +1,196 @@
+# crud/search.py
+import asyncio
+import logging
+import threading
+import time
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from core.config import settings
+from database import AsyncSessionLocal
+from models.models import Movie as MovieModel
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Limiar de similaridade de trigramas (mesmo padrão do pg_trgm)
+LIMIAR_SIMILARIDADE = 0.3
+
+
+def normalizar(texto: str) -> str:
+    # minúsculas, sem acentos e só com letras/dígitos separados por espaço
+    decomposto = unicodedata.normalize("NFKD", texto.lower())
+    sem_acento = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in sem_acento).split())
+
+
+def trigramas(texto: str) -> set:
+    # Mesma regra do pg_trgm: cada palavra recebe dois espaços antes e um depois
+    resultado = set()
+    for palavra in normalizar(texto).split():
+        palavra = f"  {palavra} "
+        resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return resultado
+
+
+# Índice invertido de trigramas em memória, usado quando o banco não é PostgreSQL (SQLite, testes)
+class IndiceTitulos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: dict[str, set] = defaultdict(set)
+        self._titulos: dict[int, str] = {}
+        self._trigramas: dict[int, set] = {}
+        self._pendentes: list | None = None  # escritas que chegam durante uma reconstrução
+        self.construido_em: float | None = None
+
+    # Monta os dicionários novos sem o lock (buscas e escritas seguem no índice atual) e troca as referências
+    # no fim; as escritas feitas durante a montagem são reaplicadas no índice novo
+    def construir(self, linhas: Iterable[Tuple[int, str]]):
+        with self._lock:
+            self._pendentes = []
+        novo = IndiceTitulos()
+        for id, titulo in linhas:
+            novo._adicionar(id, titulo)
+        with self._lock:
+            self._postings, self._titulos, self._trigramas = novo._postings, novo._titulos, novo._trigramas
+            pendentes, self._pendentes = self._pendentes, None
+            for id, titulo, substituir in pendentes:
+                if id in self._titulos and not substituir:
+                    continue
+                self._adicionar(id, titulo)
+            self.construido_em = time.monotonic()
+
+    def adicionar(self, linhas: Iterable[Tuple[int, str]], substituir: bool = True):
+        with self._lock:
+            for id, titulo in linhas:
+                if self._pendentes is not None:
+                    self._pendentes.append((id, titulo, substituir))
+                if id in self._titulos and not substituir:
+                    continue
+                self._adicionar(id, titulo)
+
+    def buscar(self, query: str, limit: int, apos: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float]]:
+        trigramas_query = trigramas(query)
+        query_normalizada = normalizar(query)
+        if not trigramas_query:
+            return []
+
+        with self._lock:
+            compartilhados = Counter()
+            for trigrama in trigramas_query:
+                compartilhados.update(self._postings.get(trigrama, ()))  # contagem feita em C
+
+            ranqueados = []
+            for id, comuns in compartilhados.items():
+                similaridade = comuns / (len(trigramas_query) + len(self._trigramas[id]) - comuns)
+                titulo = self._titulos[id]
+                contem = query_normalizada in titulo
+                if similaridade < LIMIAR_SIMILARIDADE and not contem:
+                    continue
+                # Bônus para títulos que contêm a busca inteira, e mais ainda se começam por ela
+                score = similaridade + (0.5 if contem else 0) + (0.5 if titulo.startswith(query_normalizada) else 0)
+                if apos is not None and (score, -id) >= (apos[0], -apos[1]):
+                    continue  # já entregue em uma página anterior
+                ranqueados.append((id, score))
+
+        ranqueados.sort(key=lambda item: (-item[1], item[0]))
+        return ranqueados[:limit]
+
+    def _adicionar(self, id: int, titulo: str):
+        for trigrama in self._trigramas.pop(id, ()):
+            self._postings[trigrama].discard(id)
+        if not titulo:
+            self._titulos.pop(id, None)
+            return
+        self._titulos[id] = normalizar(titulo)
+        self._trigramas[id] = trigramas(titulo)
+        for trigrama in self._trigramas[id]:
+            self._postings[trigrama].add(id)
+
+
+indice_titulos = IndiceTitulos()
+
+
+def usa_postgres(db: AsyncSession) -> bool:
+    motor = settings.BUSCA_MOTOR
+    if motor == "auto":
+        return db.get_bind().dialect.name == "postgresql"
+    return motor == "postgres"
+
+
+# Mantém o índice em memória em dia com as escritas deste processo
+def index_movies(linhas: Iterable[Tuple[int, str]], substituir: bool = True):
+    if indice_titulos.construido_em is not None:
+        indice_titulos.adicionar(linhas, substituir)
+
+
+async def _search_postgres(db: AsyncSession, query: str, limit: int, apos: Optional[Tuple[float, int]]):
+    titulo_normalizado = func.f_unaccent(func.lower(MovieModel.title))
+    query_normalizada = func.f_unaccent(func.lower(query))
+    # As expressões abaixo são as mesmas dos índices GIN criados em migracoes/0001_esquema_inicial.py
+    vetor = func.to_tsvector(literal_column("'portuguese'::regconfig"), func.f_unaccent(MovieModel.title))
+    tsquery = func.plainto_tsquery(literal_column("'portuguese'::regconfig"), func.f_unaccent(query))
+    rank = func.ts_rank_cd(vetor, tsquery) + func.similarity(titulo_normalizado, query_normalizada)
+
+    consulta = select(MovieModel, rank.label("rank")).where(
+        or_(vetor.op("@@")(tsquery), titulo_normalizado.op("%")(query_normalizada))
+    )
+    if apos is not None:
+        rank_anterior, id_anterior = apos
+        consulta = consulta.where(or_(rank < rank_anterior, and_(rank == rank_anterior, MovieModel.id > id_anterior)))
+    return (await db.execute(consulta.order_by(rank.desc(), MovieModel.id).limit(limit))).all()
+
+
+_voos_indice = SingleFlight()
+
+
+# Sessão própria: a reconstrução é compartilhada e não pode depender da sessão de quem a disparou
+async def _reconstruir():
+    async with AsyncSessionLocal() as db:
+        linhas = (await db.execute(select(MovieModel.id, MovieModel.title))).all()
+    await run_in_threadpool(indice_titulos.construir, linhas)
+
+
+def _falha_reconstrucao(tarefa: asyncio.Task):
+    if not tarefa.cancelled() and tarefa.exception() is not None:
+        logger.warning("Falha ao reconstruir o índice de títulos: %s", tarefa.exception())
+
+
+# (Re)constrói a partir do banco para enxergar escritas de outros processos; a montagem do índice é CPU pura
+# e roda fora do event loop, uma de cada vez (chamadores concorrentes compartilham a mesma). Sem índice, espera;
+# vencido, as buscas seguem no atual enquanto o novo é montado. Também chamada no aquecimento da subida.
+async def atualizar_indice():
+    construido_em = indice_titulos.construido_em
+    if construido_em is None:
+        await _voos_indice.executar("titulos", _reconstruir)
+    elif time.monotonic() - construido_em > settings.BUSCA_INDICE_TTL:
+        tarefa = asyncio.ensure_future(_voos_indice.executar("titulos", _reconstruir))
+        tarefa.add_done_callback(_falha_reconstrucao)
+
+
+async def _search_portable(db: AsyncSession, query: str, limit: int, apos: Optional[Tuple[float, int]]):
+    await atualizar_indice()
+    ranqueados = indice_titulos.buscar(query, limit, apos)
+    if not ranqueados:
+        return []
+    filmes = {
+        filme.id: filme
+        for filme in await db.scalars(select(MovieModel).where(MovieModel.id.in_([id for id, _ in ranqueados])))
+    }
+    return [(filmes[id], score) for id, score in ranqueados if id in filmes]
+
+
+# Busca por título ordenada por (rank desc, id); `apos` é o (rank, id) do último item da página anterior
+async def search_movies(
+    db: AsyncSession, query: str, limit: int = 20, apos: Optional[Tuple[float, int]] = None
+) -> List[Tuple[MovieModel, float]]:
+    if not query.strip():
+        return []
+    if usa_postgres(db):
+        return await _search_postgres(db, query, limit, apos)
+    return await _search_portable(db, query, limit, apos)
@@ -0,0 +1,304 @@
+# crud/stats.py
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import and_, case, delete, exists, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from models.models import (
+    GenreLeaderboard,
+    Movie,
+    MovieGenre,
+    MovieRatingHistogram,
+    MovieStats,
+    PerformanceReview,
+    PersonStats,
+    Review,
+    Watchlist,
+    WatchlistSummary,
+)
+
+
+def _score(rating_sum, review_count):
+    # Média bayesiana: funciona tanto com colunas (SQL) quanto com números (Python)
+    peso = settings.RANKING_PRIOR_PESO
+    return (settings.RANKING_PRIOR_MEDIA * peso + rating_sum) / (peso + review_count)
+
+
+# UPSERT que soma os incrementos ao valor atual (sem ler antes, seguro sob concorrência)
+async def _incrementar(db: AsyncSession, modelo, chaves: dict, incrementos: dict):
+    await _incrementar_lote(db, modelo, list(chaves), [{**chaves, **incrementos}])
+
+
+# O mesmo para várias linhas de uma vez (executemany de um comando fixo: compilado uma vez só, qualquer que seja
+# o número de linhas); as chaves das linhas têm de ser distintas
+async def _incrementar_lote(db: AsyncSession, modelo, chaves: List[str], linhas: List[dict]):
+    tabela = modelo.__table__
+    incrementos = [coluna for coluna in linhas[0] if coluna not in chaves]
+    dialeto = db.get_bind().dialect.name
+    if dialeto in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+        stmt = dialect_insert(tabela)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=chaves,
+            set_={coluna: tabela.c[coluna] + stmt.excluded[coluna] for coluna in incrementos},
+        )
+        await db.execute(stmt, linhas)
+        return
+
+    for linha in linhas:
+        filtro = and_(*[tabela.c[coluna] == linha[coluna] for coluna in chaves])
+        atualizadas = (await db.execute(
+            update(tabela).where(filtro).values({coluna: tabela.c[coluna] + linha[coluna] for coluna in incrementos})
+        )).rowcount
+        if not atualizadas:
+            await db.execute(insert(tabela).values(**linha))
+
+
+# Copia o score dos filmes para as linhas de ranking de cada um dos seus gêneros. Roda tanto na gravação de
+# avaliações quanto na ingestão: as linhas de movie_stats são travadas em ordem de movie_id (o score lido é o
+# atual) e o ranking é gravado por UPSERT, porque um filme ainda sem movie_stats não tem o que travar e as duas
+# transações podem inserir o mesmo (genre_id, movie_id)
+async def refresh_movie_leaderboard(db: AsyncSession, movie_ids: List[int]):
+    movie_ids = sorted(set(movie_ids))
+    await db.execute(
+        select(MovieStats.movie_id).where(MovieStats.movie_id.in_(movie_ids)).order_by(MovieStats.movie_id)
+        .with_for_update()
+    )
+    linhas = (
+        select(MovieGenre.genre_id, MovieGenre.movie_id, MovieStats.score)
+        .join(MovieStats, MovieStats.movie_id == MovieGenre.movie_id)
+        .where(MovieGenre.movie_id.in_(movie_ids))
+        .order_by(MovieGenre.movie_id, MovieGenre.genre_id)
+    )
+    dialeto = db.get_bind().dialect.name
+    if dialeto not in ("postgresql", "sqlite"):
+        await db.execute(delete(GenreLeaderboard).where(GenreLeaderboard.movie_id.in_(movie_ids)))
+        await db.execute(insert(GenreLeaderboard).from_select(["genre_id", "movie_id", "score"], linhas))
+        return
+
+    # Só saem os gêneros que o filme deixou de ter
+    await db.execute(
+        delete(GenreLeaderboard).where(
+            GenreLeaderboard.movie_id.in_(movie_ids),
+            ~exists().where(
+                MovieGenre.movie_id == GenreLeaderboard.movie_id, MovieGenre.genre_id == GenreLeaderboard.genre_id
+            ),
+        )
+    )
+    dialect_insert = postgresql.insert if dialeto == "postgresql" else sqlite.insert
+    stmt = dialect_insert(GenreLeaderboard).from_select(["genre_id", "movie_id", "score"], linhas)
+    await db.execute(
+        stmt.on_conflict_do_update(index_elements=["genre_id", "movie_id"], set_={"score": stmt.excluded.score})
+    )
+
+
+# Atualiza os agregados de uma nova avaliação; roda na mesma transação que grava a avaliação
+async def record_review(db: AsyncSession, movie_id: int, rating: Optional[int], performances: List = ()):
+    await record_reviews(db, [(movie_id, rating, performances)])
+
+
+# Agregados de várias avaliações (movie_id, rating, performances) de uma vez: as diferenças são somadas por
+# filme, nota e pessoa antes, e cada tabela recebe um comando só, qualquer que seja o tamanho do lote (em ordem de
+# chave, para transações concorrentes travarem as linhas na mesma ordem)
+async def record_reviews(db: AsyncSession, avaliacoes: Iterable[Tuple[int, Optional[int], List]]):
+    filmes = defaultdict(lambda: [0, 0])
+    histograma = defaultdict(int)
+    pessoas = defaultdict(lambda: [0, 0])
+    for movie_id, rating, performances in avaliacoes:
+        if rating is not None:
+            filmes[movie_id][0] += 1
+            filmes[movie_id][1] += rating
+            histograma[movie_id, rating] += 1
+        for performance in performances:
+            if performance.performance_rating is not None:
+                pessoas[performance.person_id][0] += 1
+                pessoas[performance.person_id][1] += performance.performance_rating
+
+    if filmes:
+        await _incrementar_lote(db, MovieStats, ["movie_id"], [
+            {"movie_id": movie_id, "review_count": total, "rating_sum": soma}
+            for movie_id, (total, soma) in sorted(filmes.items())
+        ])
+        await db.execute(
+            update(MovieStats)
+            .where(MovieStats.movie_id.in_(list(filmes)))
+            .values(score=_score(MovieStats.rating_sum, MovieStats.review_count))
+        )
+        await _incrementar_lote(db, MovieRatingHistogram, ["movie_id", "rating"], [
+            {"movie_id": movie_id, "rating": rating, "count": total}
+            for (movie_id, rating), total in sorted(histograma.items())
+        ])
+        await refresh_movie_leaderboard(db, list(filmes))
+
+    if pessoas:
+        await _incrementar_lote(db, PersonStats, ["person_id"], [
+            {"person_id": person_id, "review_count": total, "rating_sum": soma}
+            for person_id, (total, soma) in sorted(pessoas.items())
+        ])
+
+
+# Ajusta os totais da watchlist do usuário pela diferença de uma escrita; roda na mesma transação dela
+async def record_watchlist_change(db: AsyncSession, user_id: int, total: int, assistidos: int):
+    if total or assistidos:
+        await _incrementar(db, WatchlistSummary, {"user_id": user_id}, {"total": total, "watched": assistidos})
+
+
+async def get_movie_stats(db: AsyncSession, movie_id: int) -> dict:
+    stats = await db.get(MovieStats, movie_id)
+    histograma = await db.execute(
+        select(MovieRatingHistogram.rating, MovieRatingHistogram.count).where(MovieRatingHistogram.movie_id == movie_id)
+    )
+    review_count = stats.review_count if stats else 0
+    return {
+        "movie_id": movie_id,
+        "review_count": review_count,
+        "average_rating": stats.rating_sum / review_count if review_count else None,
+        "histogram": {rating: count for rating, count in histograma},
+    }
+
+
+async def get_person_stats(db: AsyncSession, person_id: int) -> dict:
+    stats = await db.get(PersonStats, person_id)
+    review_count = stats.review_count if stats else 0
+    return {
+        "person_id": person_id,
+        "review_count": review_count,
+        "average_rating": stats.rating_sum / review_count if review_count else None,
+    }
+
+
+# Top-N por score; com gênero usa o índice (genre_id, score) de genre_leaderboard
+async def get_leaderboard(db: AsyncSession, limit: int, genre_id: Optional[int] = None):
+    if genre_id is not None:
+        consulta = (
+            select(Movie, MovieStats)
+            .join(GenreLeaderboard, GenreLeaderboard.movie_id == Movie.id)
+            .join(MovieStats, MovieStats.movie_id == Movie.id)
+            .where(GenreLeaderboard.genre_id == genre_id)
+            .order_by(GenreLeaderboard.score.desc(), Movie.id)
+        )
+    else:
+        consulta = (
+            select(Movie, MovieStats)
+            .join(MovieStats, MovieStats.movie_id == Movie.id)
+            .order_by(MovieStats.score.desc(), Movie.id)
+        )
+    return [
+        {
+            "movie": filme,
+            "score": stats.score,
+            "review_count": stats.review_count,
+            "average_rating": stats.rating_sum / stats.review_count if stats.review_count else None,
+        }
+        for filme, stats in await db.execute(consulta.limit(limit))
+    ]
+
+
+def _comparar(nome: str, atual: dict, esperado: dict, divergencias: list):
+    for chave in atual.keys() | esperado.keys():
+        if atual.get(chave) != esperado.get(chave):
+            divergencias.append(
+                {"tabela": nome, "chave": chave, "incremental": atual.get(chave), "recalculado": esperado.get(chave)}
+            )
+
+
+# Recalcula todos os agregados a partir de reviews/performance_reviews/watchlist e compara com os incrementais.
+# Com aplicar=False apenas verifica; caso contrário substitui as tabelas numa única transação.
+async def rebuild_stats(db: AsyncSession, aplicar: bool = True) -> dict:
+    filmes = {
+        movie_id: (count, total)
+        for movie_id, count, total in await db.execute(
+            select(Review.movie_id, func.count(Review.rating), func.sum(Review.rating))
+            .where(Review.rating.isnot(None))
+            .group_by(Review.movie_id)
+        )
+    }
+    histograma = {
+        (movie_id, rating): count
+        for movie_id, rating, count in await db.execute(
+            select(Review.movie_id, Review.rating, func.count())
+            .where(Review.rating.isnot(None))
+            .group_by(Review.movie_id, Review.rating)
+        )
+    }
+    pessoas = {
+        person_id: (count, total)
+        for person_id, count, total in await db.execute(
+            select(
+                PerformanceReview.person_id,
+                func.count(PerformanceReview.performance_rating),
+                func.sum(PerformanceReview.performance_rating),
+            )
+            .where(PerformanceReview.performance_rating.isnot(None))
+            .group_by(PerformanceReview.person_id)
+        )
+    }
+    watchlists = {
+        user_id: (total, assistidos)
+        for user_id, total, assistidos in await db.execute(
+            select(Watchlist.user_id, func.count(), func.sum(case((Watchlist.watched.is_(True), 1), else_=0)))
+            .group_by(Watchlist.user_id)
+        )
+    }
+
+    divergencias = []
+    _comparar(
+        "movie_stats",
+        {s.movie_id: (s.review_count, s.rating_sum) for s in await db.scalars(select(MovieStats))},
+        filmes, divergencias,
+    )
+    _comparar(
+        "movie_rating_histogram",
+        {(h.movie_id, h.rating): h.count for h in await db.scalars(select(MovieRatingHistogram))},
+        histograma, divergencias,
+    )
+    _comparar(
+        "person_stats",
+        {s.person_id: (s.review_count, s.rating_sum) for s in await db.scalars(select(PersonStats))},
+        pessoas, divergencias,
+    )
+    _comparar(
+        "watchlist_summary",
+        {s.user_id: (s.total, s.watched) for s in await db.scalars(select(WatchlistSummary)) if s.total or s.watched},
+        watchlists, divergencias,
+    )
+
+    if aplicar:
+        for modelo in (GenreLeaderboard, MovieRatingHistogram, MovieStats, PersonStats, WatchlistSummary):
+            await db.execute(delete(modelo))
+        if filmes:
+            await db.execute(insert(MovieStats), [
+                {"movie_id": movie_id, "review_count": count, "rating_sum": total, "score": _score(total, count)}
+                for movie_id, (count, total) in filmes.items()
+            ])
+        if histograma:
+            await db.execute(insert(MovieRatingHistogram), [
+                {"movie_id": movie_id, "rating": rating, "count": count}
+                for (movie_id, rating), count in histograma.items()
+            ])
+        if pessoas:
+            await db.execute(insert(PersonStats), [
+                {"person_id": person_id, "review_count": count, "rating_sum": total}
+                for person_id, (count, total) in pessoas.items()
+            ])
+        if watchlists:
+            await db.execute(insert(WatchlistSummary), [
+                {"user_id": user_id, "total": total, "watched": assistidos}
+                for user_id, (total, assistidos) in watchlists.items()
+            ])
+        await db.execute(
+            insert(GenreLeaderboard).from_select(
+                ["genre_id", "movie_id", "score"],
+                select(MovieGenre.genre_id, MovieGenre.movie_id, MovieStats.score)
+                .join(MovieStats, MovieStats.movie_id == MovieGenre.movie_id),
+            )
+        )
+        await db.commit()
+
+    return {
+        "filmes": len(filmes),
+        "pessoas": len(pessoas),
+        "watchlists": len(watchlists),
+        "divergencias": divergencias,
+    }
@@ -0,0 +1,103 @@
+# crud/watchlist.py
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from crud import stats
+from models.models import Watchlist, WatchlistSummary
+
+
+# Cada operação em lote é um único comando SQL; o resumo do usuário é ajustado pela diferença na mesma transação
+# (stats.record_watchlist_change)
+
+
+def _returning(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name in ("postgresql", "sqlite")
+
+
+# Adiciona os filmes {movie_id: watched}; os que já estão na watchlist ficam como estão. Retorna quantos entraram.
+async def add_to_watchlist(db: AsyncSession, user_id: int, itens: Dict[int, bool]) -> int:
+    linhas = [
+        {"user_id": user_id, "movie_id": movie_id, "watched": watched, "watched_at": func.now() if watched else None}
+        for movie_id, watched in itens.items()
+    ]
+    if _returning(db):
+        dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        stmt = (
+            dialect_insert(Watchlist)
+            .values(linhas)
+            .on_conflict_do_nothing(index_elements=["user_id", "movie_id"])
+            .returning(Watchlist.watched)
+        )
+        inseridos = (await db.execute(stmt)).scalars().all()
+    else:
+        existentes = set(await db.scalars(
+            select(Watchlist.movie_id).where(Watchlist.user_id == user_id, Watchlist.movie_id.in_(itens))
+        ))
+        linhas = [linha for linha in linhas if linha["movie_id"] not in existentes]
+        if linhas:
+            await db.execute(insert(Watchlist).values(linhas))
+        inseridos = [linha["watched"] for linha in linhas]
+    await stats.record_watchlist_change(db, user_id, len(inseridos), sum(1 for watched in inseridos if watched))
+    return len(inseridos)
+
+
+async def remove_from_watchlist(db: AsyncSession, user_id: int, movie_ids: List[int]) -> int:
+    filtro = and_(Watchlist.user_id == user_id, Watchlist.movie_id.in_(movie_ids))
+    if _returning(db):
+        removidos = (await db.execute(
+            delete(Watchlist).where(filtro).returning(Watchlist.watched),
+            execution_options={"synchronize_session": False},
+        )).scalars().all()
+    else:
+        removidos = (await db.scalars(select(Watchlist.watched).where(filtro))).all()
+        await db.execute(delete(Watchlist).where(filtro), execution_options={"synchronize_session": False})
+    await stats.record_watchlist_change(db, user_id, -len(removidos), -sum(1 for watched in removidos if watched))
+    return len(removidos)
+
+
+# Marca como assistidos (ou não); só as entradas que mudam de estado são alteradas e contadas.
+# watched é anulável: NULL conta como não assistido, como em stats.rebuild_stats
+async def mark_watched(db: AsyncSession, user_id: int, movie_ids: List[int], watched: bool = True) -> int:
+    if watched:
+        muda = or_(Watchlist.watched.is_(False), Watchlist.watched.is_(None))
+    else:
+        muda = Watchlist.watched.is_(True)
+    alteradas = (await db.execute(
+        update(Watchlist)
+        .where(Watchlist.user_id == user_id, Watchlist.movie_id.in_(movie_ids), muda)
+        .values(watched=watched, watched_at=func.now() if watched else None),
+        execution_options={"synchronize_session": False},
+    )).rowcount
+    await stats.record_watchlist_change(db, user_id, 0, alteradas if watched else -alteradas)
+    return alteradas
+
+
+async def get_watchlist_summary(db: AsyncSession, user_id: int) -> dict:
+    resumo = await db.get(WatchlistSummary, user_id, populate_existing=True)
+    total, assistidos = (resumo.total, resumo.watched) if resumo else (0, 0)
+    return {"total": total, "watched": assistidos, "unwatched": total - assistidos}
+
+
+# Página mais recente primeiro, por (added_at, movie_id) decrescentes. Com `watched` usa o índice
+# (user_id, watched, added_at, movie_id), sem ele o (user_id, added_at, movie_id); os filmes vêm num SELECT ... IN só.
+async def get_watchlist(
+    db: AsyncSession, user_id: int, limit: int, watched: Optional[bool] = None,
+    antes: Optional[Tuple[datetime, int]] = None,
+):
+    consulta = select(Watchlist).options(selectinload(Watchlist.movie)).where(Watchlist.user_id == user_id)
+    if watched is not None:
+        consulta = consulta.where(Watchlist.watched == watched)
+    if antes is not None:
+        added_at, movie_id = antes
+        consulta = consulta.where(
+            Watchlist.added_at <= added_at,  # limite da faixa no índice; o OR abaixo desempata
+            or_(
+                Watchlist.added_at < added_at,
+                and_(Watchlist.added_at == added_at, Watchlist.movie_id < movie_id),
+            ),
+        )
+    consulta = consulta.order_by(Watchlist.added_at.desc(), Watchlist.movie_id.desc()).limit(limit)
+    return (await db.scalars(consulta)).all()
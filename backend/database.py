@@ -1,21 +1,166 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import hashlib
+import hmac
+import itertools
+import time
+from collections import Counter
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from core.config import settings  # Importa as configurações do core/config.py
 
 # Obtém a URL do banco de dados das configurações
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
+# Engine síncrona: usada por comandos (manage.py), scripts e criação das tabelas
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-# Função para obter uma sessão do banco de dados
-def get_db():
-    db = SessionLocal()
+
+# Troca o driver da URL pelo equivalente assíncrono (asyncpg / aiosqlite)
+def url_assincrona(url: str) -> str:
+    url = make_url(url)
+    drivers = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+    driver = drivers.get(url.get_backend_name())
+    if driver and url.drivername in ("postgresql", "postgresql+psycopg2", "sqlite", "sqlite+pysqlite"):
+        url = url.set(drivername=driver)
+    return url.render_as_string(hide_password=False)
+
+
+def _opcoes_pool(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW, "pool_pre_ping": True}
+
+
+# Engine assíncrona: usada pelas rotas, para que nenhuma consulta bloqueie o event loop
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or url_assincrona(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_opcoes_pool(ASYNC_DATABASE_URL))
+
+
+# Réplicas de leitura (DB_REPLICAS), cada uma com engine e pool próprios; `saudavel` e `atraso` são mantidos
+# pelas verificações de services/replicas.py e por erros de conexão durante as consultas
+class Replica:
+    def __init__(self, nome: str, url: str):
+        self.nome = nome
+        self.engine = create_async_engine(url, **_opcoes_pool(url))
+        self.saudavel = True
+        self.atraso: float | None = None
+
+        @event.listens_for(self.engine.sync_engine, "handle_error")
+        def _erro(contexto):
+            if contexto.is_disconnect:
+                self.saudavel = False
+
+
+replicas = [
+    Replica(f"replica{i}", url_assincrona(url.strip()))
+    for i, url in enumerate(settings.DB_REPLICAS.split(",")) if url.strip()
+]
+_proxima_replica = itertools.count()
+
+# Decisões de roteamento por (destino, motivo), expostas em /metrics por services/replicas.py
+roteamento = Counter()
+
+
+# Sessão que manda SELECTs para a réplica escolhida em info["replica"] (ver get_db_leitura). Flush, DML e
+# SELECT ... FOR UPDATE vão para o primário, e a partir daí a sessão inteira fica nele: o que a requisição
+# acabou de gravar é lido de volta de onde foi gravado.
+class SessaoRoteada(Session):
+    def get_bind(self, mapper=None, clause=None, **kw):
+        escrita = self._flushing or clause is not None and (
+            not getattr(clause, "is_select", False) or getattr(clause, "_for_update_arg", None) is not None
+        )
+        if escrita and not self.info.get("escreveu"):
+            self.info["escreveu"] = True
+            if self.info.get("replica") is not None:
+                roteamento["primario", "escrita"] += 1
+        replica = self.info.get("replica")
+        if replica is not None and not self.info.get("escreveu"):
+            return replica.engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+# Read-your-writes: a resposta de uma requisição que gravou leva o momento da escrita, assinado, no cookie
+# COOKIE_ESCRITA e no cabeçalho CABECALHO_ESCRITA (ver services/replicas.MiddlewareEscritas); o cliente o devolve
+# (o cookie vai sozinho; sem cookies, reenviando o cabeçalho) e, enquanto for recente, lê do primário. Vale para
+# qualquer processo e também para escritas anônimas.
+COOKIE_ESCRITA = "cinebase_escrita"
+CABECALHO_ESCRITA = "X-Cinebase-Escrita"
+
+
+def _assinatura(momento: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), momento.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def marcador_escrita(momento: float) -> str:
+    valor = f"{momento:.3f}"
+    return f"{valor}.{_assinatura(valor)}"
+
+
+def escrita_recente(marcador: str | None) -> bool:
+    if not marcador:
+        return False
+    valor, _, assinatura = marcador.rpartition(".")
+    if not hmac.compare_digest(assinatura, _assinatura(valor)):
+        return False
     try:
+        momento = float(valor)
+    except ValueError:
+        return False
+    return abs(time.time() - momento) < settings.DB_LER_DO_PRIMARIO_APOS_ESCRITA  # abs: relógios de outros nós
+
+
+# Marca a requisição dona da sessão (info["estado"], o request.state) como tendo gravado agora
+def marcar_escrita(info: dict):
+    estado = info.get("estado")
+    if estado is not None:
+        estado.escrita_em = time.time()
+
+
+@event.listens_for(SessaoRoteada, "after_commit")
+def _apos_commit(sessao):
+    if sessao.info.get("escreveu"):
+        marcar_escrita(sessao.info)
+
+
+def escolher_replica(marcador: str | None) -> Replica | None:
+    if not replicas:
+        return None
+    if escrita_recente(marcador):
+        roteamento["primario", "escrita_recente"] += 1
+        return None
+    saudaveis = [replica for replica in replicas if replica.saudavel]
+    if not saudaveis:
+        roteamento["primario", "replicas_indisponiveis"] += 1
+        return None
+    replica = saudaveis[next(_proxima_replica) % len(saudaveis)]
+    roteamento[replica.nome, "leitura"] += 1
+    return replica
+
+
+# expire_on_commit=False: depois do commit os atributos continuam legíveis sem nova ida ao banco
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, sync_session_class=SessaoRoteada, autoflush=False, expire_on_commit=False
+)
+
+# Função para obter uma sessão (assíncrona) do banco de dados; tudo vai para o primário
+async def get_db(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info["estado"] = request.state
+        yield db
+
+
+# Para as rotas de leitura do catálogo: SELECTs numa réplica saudável (rodízio), a não ser que o cliente
+# tenha gravado há pouco (read-your-writes) ou não haja réplicas; sem DB_REPLICAS é igual a get_db
+async def get_db_leitura(request: Request):
+    async with AsyncSessionLocal() as db:
+        db.info["estado"] = request.state
+        marcador = request.headers.get(CABECALHO_ESCRITA) or request.cookies.get(COOKIE_ESCRITA)
+        db.info["replica"] = escolher_replica(marcador)
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -1,20 +1,67 @@
-from fastapi import FastAPI
-from database import engine
-from models import models  # Importa os modelos do diretório models
-from routers import auth, filmes, users  # Importa os routers do diretório routers
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Response
+from core.config import settings
+from database import CABECALHO_ESCRITA, engine, async_engine, replicas as replicas_leitura
+from routers import admin, auth, filmes, metricas, ranking, users  # Importa os routers do diretório routers
+from services import aquecimento, avaliacoes_em_lote, ingestao, recomendacoes, replicas, tmdb_service
+from services.compressao import MiddlewareCompressao
+from services.metricas import MiddlewareMetricas, instrumentar_engine
 
-models.Base.metadata.create_all(bind=engine)  # Cria as tabelas no banco de dados
+# O esquema (tabelas, índices, busca do PostgreSQL) é criado por `python manage.py migrar`, não na importação
 
-app = FastAPI(title="CineBase", description="API de Catálogo de Filmes")
+# Tempo/contagem de consultas e espera no pool das duas engines, expostos em /metrics
+instrumentar_engine(engine, "sync")
+instrumentar_engine(async_engine.sync_engine, "async")
+for replica in replicas_leitura:
+    instrumentar_engine(replica.engine.sync_engine, replica.nome)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await tmdb_service.iniciar_cliente()  # Abre o pool de conexões com o TMDB
+    if settings.AVALIACOES_EM_LOTE:
+        avaliacoes_em_lote.iniciar()
+    tarefas = [asyncio.create_task(aquecimento.aquecer())]  # pool e caches; /pronto responde 503 até terminar
+    if replicas_leitura:
+        tarefas.append(asyncio.create_task(replicas.laco_replicas()))
+    if settings.INGESTAO_HABILITADA:
+        tarefas.append(asyncio.create_task(ingestao.laco_ingestao()))
+    if settings.RECOMENDACOES_HABILITADA:
+        tarefas.append(asyncio.create_task(recomendacoes.laco_recomendacoes()))
+    yield
+    await avaliacoes_em_lote.encerrar()  # grava o que ainda está na fila antes de fechar a engine
+    for tarefa in tarefas:
+        tarefa.cancel()
+        with suppress(asyncio.CancelledError):
+            await tarefa
+    await tmdb_service.fechar_cliente()
+    await async_engine.dispose()
+    await replicas.fechar()
+
+
+app = FastAPI(title="CineBase", description="API de Catálogo de Filmes", lifespan=lifespan)
 
 app.include_router(auth.router)    # Inclui o router de autenticação
+app.include_router(ranking.router)  # Antes de filmes: /filmes/ranking não pode cair em /filmes/{filme_id}
 app.include_router(filmes.router)  # Inclui o router de filmes
 app.include_router(users.router)   # Inclui o router de usuários
+app.include_router(metricas.router)
+app.include_router(admin.router)
 
 @app.get("/")
 def root():
     return {"mensagem": "CineBase API está online!", "status": "OK"}
 
+# Prontidão para o balanceador/orquestrador (a rota / só diz que o processo está de pé):
+# 503 até o aquecimento terminar ou enquanto houver migrações pendentes
+@app.get("/pronto")
+async def pronto(response: Response):
+    estado = aquecimento.prontidao()
+    if not estado["pronto"]:
+        response.status_code = 503
+    return estado
+
 from fastapi.middleware.cors import CORSMiddleware
 
 origins = [
@@ -27,5 +74,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CABECALHO_ESCRITA],  # read-your-writes (ver database.marcar_escrita)
 )
 
+# Read-your-writes entre processos: marca as respostas de quem gravou (só faz sentido com réplicas)
+if replicas_leitura:
+    app.add_middleware(replicas.MiddlewareEscritas)
+
+# gzip/brotli negociado pelo Accept-Encoding (as rotas com cache de respostas já enviam comprimido)
+app.add_middleware(MiddlewareCompressao)
+
+# Adicionado por último para ser o mais externo e medir a requisição inteira
+app.add_middleware(MiddlewareMetricas)
+
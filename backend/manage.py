@@ -0,0 +1,161 @@
+# Comandos administrativos. Uso (a partir de backend/): python manage.py <comando> [opções]
+import argparse
+import asyncio
+import json
+
+
+def rebuild_stats(args):
+    from database import AsyncSessionLocal, async_engine
+    from crud.stats import rebuild_stats as recalcular
+
+    async def executar():
+        async with AsyncSessionLocal() as db:
+            relatorio = await recalcular(db, aplicar=not args.verificar)
+        await async_engine.dispose()
+        return relatorio
+
+    relatorio = asyncio.run(executar())
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False, default=str))
+    if args.verificar and relatorio["divergencias"]:
+        raise SystemExit(1)
+
+
+def migrar(args):
+    import migracoes
+    from database import engine
+
+    if args.verificar:
+        with engine.connect() as conexao:
+            pendentes = migracoes.pendentes(conexao)
+        print(json.dumps({"pendentes": pendentes}, indent=2, ensure_ascii=False))
+        if pendentes:
+            raise SystemExit(1)
+        return
+    print(json.dumps({"aplicadas": migracoes.migrar(engine)}, indent=2, ensure_ascii=False))
+
+
+def _exigir_esquema(engine):
+    import migracoes
+
+    with engine.connect() as conexao:
+        pendentes = migracoes.pendentes(conexao)
+    if pendentes:
+        raise SystemExit(f"Migrações pendentes: {', '.join(pendentes)} (rode python manage.py migrar)")
+
+
+def ingerir(args):
+    from core.config import settings
+    from database import async_engine, engine
+    from services import ingestao, tmdb_service
+
+    _exigir_esquema(engine)
+    fontes = args.fontes.split(",") if args.fontes else None
+
+    async def executar():
+        try:
+            while True:
+                relatorio = await ingestao.executar_ciclo(fontes, args.max_paginas)
+                print(json.dumps(relatorio, indent=2, ensure_ascii=False, default=str), flush=True)
+                if not args.continuo:
+                    break
+                await asyncio.sleep(settings.INGESTAO_INTERVALO)
+        finally:
+            await tmdb_service.fechar_cliente()
+            await async_engine.dispose()
+
+    asyncio.run(executar())
+
+
+def ingestao_status(args):
+    from database import AsyncSessionLocal, async_engine
+    from services import ingestao
+
+    async def executar():
+        async with AsyncSessionLocal() as db:
+            relatorio = await ingestao.status(db)
+        await async_engine.dispose()
+        return relatorio
+
+    print(json.dumps(asyncio.run(executar()), indent=2, ensure_ascii=False, default=str))
+
+
+def exportar(args):
+    import sys
+    from datetime import datetime
+    from database import engine
+    from services import exportacao
+
+    desde = datetime.fromisoformat(args.desde) if args.desde else None
+    try:
+        exportacao.verificar_formato(args.formato)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if args.saida == "-":
+        linhas = exportacao.exportar(engine, sys.stdout.buffer, args.tabela, args.formato, desde, args.gzip)
+    else:
+        with open(args.saida, "wb") as arquivo:
+            linhas = exportacao.exportar(engine, arquivo, args.tabela, args.formato, desde, args.gzip)
+    print(f"{linhas} linhas exportadas", file=sys.stderr)
+
+
+def recomendacoes(args):
+    import time
+    from core.config import settings
+    from database import engine
+    from services.recomendacoes import construir
+
+    saida = args.saida or settings.RECOMENDACOES_ARQUIVO
+    if not saida:
+        raise SystemExit("Informe --saida ou defina RECOMENDACOES_ARQUIVO")
+    inicio = time.perf_counter()
+    modelo = construir(engine)
+    modelo.salvar(saida)
+    print(json.dumps({
+        "arquivo": saida,
+        "filmes": len(modelo.filmes),
+        "usuarios": len(modelo.usuarios),
+        "notas": int(modelo.notas.nnz),
+        "ultima_avaliacao": modelo.ultima_avaliacao,
+        "segundos": round(time.perf_counter() - inicio, 2),
+    }, indent=2, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comandos administrativos da CineBase API")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    comando = comandos.add_parser("migrar", help="Aplica as migrações pendentes do esquema (tabelas e índices)")
+    comando.add_argument("--verificar", action="store_true", help="Só lista as pendentes; sai com 1 se houver")
+    comando.set_defaults(funcao=migrar)
+
+    comando = comandos.add_parser("rebuild-stats", help="Recalcula estatísticas de avaliações e rankings do zero")
+    comando.add_argument("--verificar", action="store_true", help="Só compara com os valores incrementais, sem gravar")
+    comando.set_defaults(funcao=rebuild_stats)
+
+    comando = comandos.add_parser("ingerir", help="Importa o catálogo das listas do TMDB (retoma do último checkpoint)")
+    comando.add_argument("--fontes", help="ex.: popular,now_playing:BR,changes (padrão: INGESTAO_FONTES)")
+    comando.add_argument("--max-paginas", type=int, help="páginas por lista neste ciclo (padrão: INGESTAO_MAX_PAGINAS)")
+    comando.add_argument("--continuo", action="store_true", help="Repete a cada INGESTAO_INTERVALO segundos")
+    comando.set_defaults(funcao=ingerir)
+
+    comando = comandos.add_parser("ingestao-status", help="Checkpoints da ingestão e frescor do catálogo")
+    comando.set_defaults(funcao=ingestao_status)
+
+    comando = comandos.add_parser("exportar", help="Exporta movies, reviews ou watchlist em NDJSON, CSV ou Parquet")
+    comando.add_argument("tabela", choices=("movies", "reviews", "watchlist"))
+    comando.add_argument("--formato", default="ndjson", help="ndjson, csv ou parquet (requer pyarrow)")
+    comando.add_argument("--saida", default="-", help="arquivo de destino (padrão: saída padrão)")
+    comando.add_argument("--desde", help="só linhas atualizadas a partir desta data/hora ISO (exportação incremental)")
+    comando.add_argument("--gzip", action="store_true", help="compacta com gzip enquanto escreve")
+    comando.set_defaults(funcao=exportar)
+
+    comando = comandos.add_parser("recomendacoes", help="Reconstrói o modelo de recomendações e grava em arquivo")
+    comando.add_argument("--saida", help="arquivo .npz de destino (padrão: RECOMENDACOES_ARQUIVO)")
+    comando.set_defaults(funcao=recomendacoes)
+
+    args = parser.parse_args()
+    args.funcao(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# Esquema que a aplicação criava sozinha na importação do main.py: tabelas e a busca do PostgreSQL.
+# As tabelas estão congeladas aqui como estavam nesta versão (não vêm de models.py): mudanças nos modelos
+# entram em migrações novas. Em bancos criados antes das migrações só cria as tabelas que faltarem.
+from sqlalchemy import (
+    DECIMAL, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text, text,
+)
+from sqlalchemy.engine import Connection
+
+# Busca por título no PostgreSQL: extensões, unaccent imutável (exigido em índices) e índices GIN. Congelada
+# aqui também: crud/search.py consulta com as mesmas expressões, mas mudanças nelas entram em migrações novas.
+DDL_POSTGRES = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+       LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+       AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$""",
+    "CREATE INDEX IF NOT EXISTS ix_movies_title_trgm ON movies USING gin (f_unaccent(lower(title)) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_movies_title_tsv ON movies "
+    "USING gin (to_tsvector('portuguese'::regconfig, f_unaccent(title)))",
+]
+
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), nullable=False),
+    Column("email", String(100), unique=True, index=True, nullable=False),
+    Column("password_hash", String(255), nullable=False),
+    Column("created_at", DateTime),
+)
+Table(
+    "genres", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(50), unique=True, nullable=False),
+)
+Table(
+    "movies", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(200), nullable=False),
+    Column("overview", Text),
+    Column("release_date", Date),
+    Column("budget", DECIMAL(12, 2)),
+    Column("revenue", DECIMAL(12, 2)),
+    Column("poster_url", String(255)),
+)
+Table(
+    "people", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), nullable=False),
+    Column("role_type", String(20)),
+)
+Table(
+    "reviews", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("movie_id", Integer, ForeignKey("movies.id"), nullable=False),
+    Column("rating", Integer),
+    Column("comment", Text),
+    Column("created_at", DateTime),
+)
+Table(
+    "watchlist", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("watched", Boolean),
+    Column("added_at", DateTime),
+    Column("watched_at", DateTime),
+)
+Table(
+    "watchlist_summary", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("total", Integer, nullable=False),
+    Column("watched", Integer, nullable=False),
+)
+Table(
+    "movie_genres", metadata,
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("genre_id", Integer, ForeignKey("genres.id"), primary_key=True),
+)
+# cast_order veio depois, na 0003
+Table(
+    "movie_cast", metadata,
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("person_id", Integer, ForeignKey("people.id"), primary_key=True),
+    Column("character_name", String(100)),
+)
+Table(
+    "movie_crew", metadata,
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("person_id", Integer, ForeignKey("people.id"), primary_key=True),
+    Column("job", String(50), primary_key=True),
+)
+Table(
+    "watch_providers", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("logo_path", String(255)),
+)
+Table(
+    "movie_providers", metadata,
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("region", String(2), primary_key=True),
+    Column("provider_id", Integer, ForeignKey("watch_providers.id"), primary_key=True),
+    Column("kind", String(10), primary_key=True),
+    Column("display_priority", Integer),
+)
+Table(
+    "user_favorite_genres", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("genre_id", Integer, ForeignKey("genres.id"), primary_key=True),
+)
+Table(
+    "user_favorite_people", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("person_id", Integer, ForeignKey("people.id"), primary_key=True),
+)
+Table(
+    "tags", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("text", String(50), unique=True, nullable=False),
+)
+Table(
+    "review_tags", metadata,
+    Column("review_id", Integer, ForeignKey("reviews.id"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id"), primary_key=True),
+)
+Table(
+    "performance_reviews", metadata,
+    Column("review_id", Integer, ForeignKey("reviews.id"), primary_key=True),
+    Column("person_id", Integer, ForeignKey("people.id"), primary_key=True),
+    Column("performance_rating", Integer),
+)
+Table(
+    "movie_stats", metadata,
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("review_count", Integer, nullable=False),
+    Column("rating_sum", Integer, nullable=False),
+    Column("score", Float, nullable=False),
+    Index("ix_movie_stats_score", "score"),
+)
+Table(
+    "movie_rating_histogram", metadata,
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("rating", Integer, primary_key=True),
+    Column("count", Integer, nullable=False),
+)
+Table(
+    "genre_leaderboard", metadata,
+    Column("genre_id", Integer, ForeignKey("genres.id"), primary_key=True),
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("score", Float, nullable=False),
+    Index("ix_genre_leaderboard_genre_score", "genre_id", "score"),
+    Index("ix_genre_leaderboard_movie", "movie_id"),
+)
+Table(
+    "person_stats", metadata,
+    Column("person_id", Integer, ForeignKey("people.id"), primary_key=True),
+    Column("review_count", Integer, nullable=False),
+    Column("rating_sum", Integer, nullable=False),
+)
+Table(
+    "movie_sync", metadata,
+    Column("movie_id", Integer, ForeignKey("movies.id"), primary_key=True),
+    Column("synced_at", DateTime, nullable=False),
+    Index("ix_movie_sync_synced_at", "synced_at"),
+)
+Table(
+    "ingestion_checkpoints", metadata,
+    Column("source", String(50), primary_key=True),
+    Column("next_page", Integer, nullable=False),
+    Column("total_pages", Integer),
+    Column("cycle_started_at", DateTime),
+    Column("last_completed_at", DateTime),
+    Column("window_start", Date),
+)
+
+
+def aplicar(conexao: Connection):
+    metadata.create_all(bind=conexao)  # checkfirst: tabelas que já existem ficam como estão
+    if conexao.dialect.name == "postgresql":
+        for ddl in DDL_POSTGRES:  # trigramas/tsvector da busca por título
+            conexao.execute(text(ddl))
@@ -0,0 +1,19 @@
+# Índices secundários das consultas quentes, para bancos cujas tabelas já existiam antes deles
+# (create_all não adiciona índices a tabelas existentes). reviews.movie_id e reviews.user_id são
+# cobertos pelo prefixo dos índices compostos; movie_cast/movie_genres só tinham a chave (movie_id, ...).
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+INDICES = [
+    ("ix_reviews_movie_created_id", "reviews", "movie_id, created_at, id"),  # avaliações do filme (keyset)
+    ("ix_reviews_user_movie", "reviews", "user_id, movie_id, rating"),  # histórico do usuário
+    ("ix_movie_cast_person", "movie_cast", "person_id, movie_id"),  # filmes da pessoa, estatísticas
+    ("ix_movie_genres_genre", "movie_genres", "genre_id, movie_id"),  # filmes do gênero, leaderboards
+    ("ix_watchlist_user_watched_added", "watchlist", "user_id, watched, added_at, movie_id"),
+    ("ix_watchlist_user_added", "watchlist", "user_id, added_at, movie_id"),
+]
+
+
+def aplicar(conexao: Connection):
+    for nome, tabela, colunas in INDICES:
+        conexao.execute(text(f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({colunas})"))
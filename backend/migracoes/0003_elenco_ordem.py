@@ -0,0 +1,10 @@
+# movie_cast.cast_order: posição nos créditos do TMDB, usada na ordem do elenco do detalhe.
+# Bancos migrados quando a 0001 ainda criava as tabelas a partir dos modelos já têm a coluna.
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def aplicar(conexao: Connection):
+    colunas = {coluna["name"] for coluna in inspect(conexao).get_columns("movie_cast")}
+    if "cast_order" not in colunas:
+        conexao.execute(text("ALTER TABLE movie_cast ADD COLUMN cast_order INTEGER"))
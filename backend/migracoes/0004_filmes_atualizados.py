@@ -0,0 +1,18 @@
+# movies.updated_at: última gravação do filme, usada pela exportação incremental (services/exportacao.py).
+# Filmes que já existiam recebem o synced_at dos detalhes ou, sem ele, o momento da migração: a primeira
+# exportação incremental depois dela os inclui.
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+def aplicar(conexao: Connection):
+    colunas = {coluna["name"] for coluna in inspect(conexao).get_columns("movies")}
+    if "updated_at" not in colunas:
+        tipo = "TIMESTAMP" if conexao.dialect.name == "postgresql" else "DATETIME"
+        conexao.execute(text(f"ALTER TABLE movies ADD COLUMN updated_at {tipo}"))
+    conexao.execute(text(
+        "UPDATE movies SET updated_at = COALESCE("
+        "(SELECT synced_at FROM movie_sync WHERE movie_sync.movie_id = movies.id), CURRENT_TIMESTAMP) "
+        "WHERE updated_at IS NULL"
+    ))
+    conexao.execute(text("CREATE INDEX IF NOT EXISTS ix_movies_updated_at ON movies (updated_at)"))
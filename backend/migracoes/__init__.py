@@ -0,0 +1,54 @@
+# Migrações versionadas do esquema. Cada módulo NNNN_descricao.py deste pacote tem uma função aplicar(conexao),
+# executada numa transação própria; as versões aplicadas ficam na tabela schema_migrations.
+# Rodam só por `python manage.py migrar` (ou migrar(engine) nos scripts), nunca na subida da aplicação.
+# A 0001 tem as tabelas congeladas como estavam na introdução das migrações; mudanças nos modelos entram em
+# migrações novas, que também têm de tolerar bancos em que a mudança já existe (CREATE INDEX IF NOT EXISTS,
+# checagens com inspect etc.).
+import importlib
+import pkgutil
+import re
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("versao", String(100), primary_key=True),
+    Column("aplicada_em", DateTime, server_default=func.now()),
+)
+
+# Chave do advisory lock do PostgreSQL: dois `migrar` ao mesmo tempo (vários pods subindo) se enfileiram
+_CHAVE_TRAVA = 0x43494E45
+
+
+def disponiveis() -> list[str]:
+    return sorted(modulo.name for modulo in pkgutil.iter_modules(__path__) if re.fullmatch(r"\d{4}_\w+", modulo.name))
+
+
+def aplicadas(conexao: Connection) -> set[str]:
+    if not inspect(conexao).has_table(schema_migrations.name):
+        return set()
+    return set(conexao.scalars(select(schema_migrations.c.versao)))
+
+
+def pendentes(conexao: Connection) -> list[str]:
+    feitas = aplicadas(conexao)
+    return [versao for versao in disponiveis() if versao not in feitas]
+
+
+# Aplica as pendentes em ordem e retorna as que foram aplicadas agora
+def migrar(engine: Engine) -> list[str]:
+    with engine.begin() as conexao:
+        schema_migrations.create(conexao, checkfirst=True)
+    aplicadas_agora = []
+    for versao in disponiveis():
+        with engine.begin() as conexao:
+            if conexao.dialect.name == "postgresql":
+                conexao.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {"chave": _CHAVE_TRAVA})
+            if versao in aplicadas(conexao):
+                continue
+            importlib.import_module(f"{__name__}.{versao}").aplicar(conexao)
+            conexao.execute(schema_migrations.insert().values(versao=versao))
+        aplicadas_agora.append(versao)
+    return aplicadas_agora
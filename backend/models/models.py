@@ -1,8 +1,13 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, func, DECIMAL, Text, Date
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, func, DECIMAL, Text, Date, Index, Float
 from sqlalchemy.orm import relationship
 from database import Base  # Importe Base do database.py
 from sqlalchemy.sql import func
 from sqlalchemy.sql.sqltypes import TIMESTAMP
+from sqlalchemy.dialects import sqlite
+
+# No SQLite, func.now() grava "AAAA-MM-DD HH:MM:SS" sem fração; sem truncar os microssegundos dos
+# parâmetros, comparações de keyset (created_at > :cursor) não batem com os valores gravados
+DateTimeKeyset = DateTime().with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
 
 
 class User(Base):
@@ -38,9 +43,15 @@ class Movie(Base):
     budget = Column(DECIMAL(12, 2))
     revenue = Column(DECIMAL(12, 2))
     poster_url = Column(String(255))
+    # Última gravação do filme (criação, upsert da busca/em cartaz ou detalhes); filtro da exportação incremental
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), index=True)
 
     genres = relationship("Genre", secondary="movie_genres", back_populates="movies")
     cast = relationship("Person", secondary="movie_cast", back_populates="movies")
+    # Elenco com personagem e ordem de créditos; equipe e provedores de streaming (ver crud.movie.get_movie_details)
+    cast_entries = relationship("MovieCast", order_by="MovieCast.cast_order", viewonly=True)
+    crew = relationship("MovieCrew", viewonly=True)
+    providers = relationship("MovieProvider", order_by="MovieProvider.display_priority", viewonly=True)
     reviews = relationship("Review", back_populates="movie")
     watchlist_entries = relationship("Watchlist", back_populates="movie")
 
@@ -63,37 +74,94 @@ class Review(Base):
     movie_id = Column(Integer, ForeignKey("movies.id"), nullable=False)
     rating = Column(Integer)
     comment = Column(Text)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTimeKeyset, default=func.now())
 
     user = relationship("User", back_populates="reviews")
     movie = relationship("Movie", back_populates="reviews")
     tags = relationship("Tag", secondary="review_tags", back_populates="reviews")
     performance_reviews = relationship("PerformanceReview", back_populates="review")
 
+    __table_args__ = (
+        Index("ix_reviews_movie_created_id", "movie_id", "created_at", "id"),  # paginação por keyset
+        Index("ix_reviews_user_movie", "user_id", "movie_id", "rating"),  # histórico do usuário (recomendações)
+    )
+
 class Watchlist(Base):
     __tablename__ = "watchlist"
 
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
     movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
     watched = Column(Boolean, default=False)
-    added_at = Column(DateTime, default=func.now())
+    added_at = Column(DateTimeKeyset, default=func.now())
     watched_at = Column(DateTime)
 
     user = relationship("User", back_populates="watchlist_entries")  # Alterado para watchlist_entries
     movie = relationship("Movie", back_populates="watchlist_entries")
 
+    __table_args__ = (
+        # Listagem paginada por (added_at, movie_id): filtrada por watched e completa
+        Index("ix_watchlist_user_watched_added", "user_id", "watched", "added_at", "movie_id"),
+        Index("ix_watchlist_user_added", "user_id", "added_at", "movie_id"),
+    )
+
+# Totais da watchlist de cada usuário, atualizados na mesma transação de cada escrita (ver crud/watchlist.py)
+class WatchlistSummary(Base):
+    __tablename__ = "watchlist_summary"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    watched = Column(Integer, nullable=False, default=0)
+
 class MovieGenre(Base):
     __tablename__ = "movie_genres"
 
     movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
     genre_id = Column(Integer, ForeignKey("genres.id"), primary_key=True)
 
+    __table_args__ = (
+        Index("ix_movie_genres_genre", "genre_id", "movie_id"),  # filmes de um gênero
+    )
+
 class MovieCast(Base):
     __tablename__ = "movie_cast"
 
     movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
     person_id = Column(Integer, ForeignKey("people.id"), primary_key=True)
     character_name = Column(String(100))
+    cast_order = Column(Integer)  # posição nos créditos do TMDB (0 = protagonista)
+
+    person = relationship("Person", viewonly=True)  # as escritas passam por crud.movie.upsert_movie_details
+
+    __table_args__ = (
+        Index("ix_movie_cast_person", "person_id", "movie_id"),  # filmes de uma pessoa
+    )
+
+class MovieCrew(Base):
+    __tablename__ = "movie_crew"
+
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    person_id = Column(Integer, ForeignKey("people.id"), primary_key=True)
+    job = Column(String(50), primary_key=True)  # ex.: "Director"
+
+    person = relationship("Person")
+
+class WatchProvider(Base):
+    __tablename__ = "watch_providers"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    logo_path = Column(String(255))
+
+class MovieProvider(Base):
+    __tablename__ = "movie_providers"
+
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    region = Column(String(2), primary_key=True)
+    provider_id = Column(Integer, ForeignKey("watch_providers.id"), primary_key=True)
+    kind = Column(String(10), primary_key=True)  # flatrate, rent, buy, free, ads
+    display_priority = Column(Integer)
+
+    provider = relationship("WatchProvider")
 
 class UserFavoriteGenre(Base):
     __tablename__ = "user_favorite_genres"
@@ -130,3 +198,63 @@ class PerformanceReview(Base):
 
     review = relationship("Review", back_populates="performance_reviews")
     person = relationship("Person", back_populates="performance_reviews")
+
+# Agregados de avaliações mantidos incrementalmente a cada nova avaliação (ver crud/stats.py)
+class MovieStats(Base):
+    __tablename__ = "movie_stats"
+
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    score = Column(Float, nullable=False, default=0)  # média bayesiana usada nos rankings
+
+    __table_args__ = (
+        Index("ix_movie_stats_score", "score"),
+    )
+
+class MovieRatingHistogram(Base):
+    __tablename__ = "movie_rating_histogram"
+
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    rating = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+class GenreLeaderboard(Base):
+    __tablename__ = "genre_leaderboard"
+
+    genre_id = Column(Integer, ForeignKey("genres.id"), primary_key=True)
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    score = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_genre_leaderboard_genre_score", "genre_id", "score"),  # top-N por gênero via range scan
+        Index("ix_genre_leaderboard_movie", "movie_id"),
+    )
+
+class PersonStats(Base):
+    __tablename__ = "person_stats"
+
+    person_id = Column(Integer, ForeignKey("people.id"), primary_key=True)
+    review_count = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(Integer, nullable=False, default=0)
+
+# Ingestão do catálogo a partir do TMDB (ver services/ingestao.py)
+class MovieSync(Base):
+    __tablename__ = "movie_sync"
+
+    movie_id = Column(Integer, ForeignKey("movies.id"), primary_key=True)
+    synced_at = Column(DateTime, nullable=False)  # última vez que os detalhes vieram do TMDB
+
+    __table_args__ = (
+        Index("ix_movie_sync_synced_at", "synced_at"),
+    )
+
+class IngestionCheckpoint(Base):
+    __tablename__ = "ingestion_checkpoints"
+
+    source = Column(String(50), primary_key=True)  # ex.: "popular", "now_playing:BR", "changes"
+    next_page = Column(Integer, nullable=False, default=1)  # 1 = ciclo novo
+    total_pages = Column(Integer)
+    cycle_started_at = Column(DateTime)
+    last_completed_at = Column(DateTime)
+    window_start = Column(Date)  # só para "changes": início da janela de alterações em andamento
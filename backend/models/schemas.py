@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import date
 
 # Filmes
@@ -26,12 +26,70 @@ class Movie(MovieCreate):
         from_attributes = True  # Para Pydantic v2 usar com SQLAlchemy
 
 
+class Genre(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
+class CastMember(BaseModel):
+    person_id: int
+    name: str
+    character: Optional[str] = None
+    order: Optional[int] = None
+
+class CrewMember(BaseModel):
+    person_id: int
+    name: str
+    job: str
+
+class StreamingProvider(BaseModel):
+    provider_id: int
+    name: str
+    logo_path: Optional[str] = None
+    region: str
+    kind: str  # flatrate, free, ads, rent, buy
+
+class MovieDetail(Movie):
+    revenue: Optional[int] = None
+    profit: Optional[int] = None
+    genres: List[Genre] = []
+    cast: List[CastMember] = []
+    directors: List[CrewMember] = []
+    providers: List[StreamingProvider] = []
+
+
+class MoviePage(BaseModel):
+    items: List[Movie]
+    next_cursor: Optional[str] = None
+
+
+class BatchError(BaseModel):
+    status: int
+    detail: str
+
+class MovieBatchItem(BaseModel):
+    id: int
+    movie: Optional[MovieDetail] = None
+    error: Optional[BatchError] = None
+
+class MovieBatch(BaseModel):
+    items: List[MovieBatchItem]  # na ordem dos ids pedidos
+
+
 class ReviewBase(BaseModel):
     rating: int
     comment: Optional[str] = None
 
+# Notas na escala de 1 a 10 da interface; fora dela viram 422 antes de chegar aos agregados (crud/stats.py)
+class PerformanceRatingCreate(BaseModel):
+    person_id: int
+    performance_rating: int = Field(ge=1, le=10)
+
 class ReviewCreate(ReviewBase):
-    pass
+    rating: int = Field(ge=1, le=10)
+    performances: List[PerformanceRatingCreate] = []  # notas opcionais para atuações do elenco
 
 class Review(ReviewBase):
     id: int
@@ -42,6 +100,31 @@ class Review(ReviewBase):
     class Config:
         from_attributes = True
 
+class ReviewPage(BaseModel):
+    items: List[Review]
+    next_cursor: Optional[str] = None
+
+class MovieStats(BaseModel):
+    movie_id: int
+    review_count: int
+    average_rating: Optional[float] = None
+    histogram: Dict[int, int] = {}
+
+class LeaderboardEntry(BaseModel):
+    movie: Movie
+    score: float
+    review_count: int
+    average_rating: Optional[float] = None
+
+class Recommendation(BaseModel):
+    movie: Movie
+    score: float
+
+class PersonStats(BaseModel):
+    person_id: int
+    review_count: int
+    average_rating: Optional[float] = None
+
 class TokenData(BaseModel):
     sub: Optional[str] = None
 
@@ -81,3 +164,26 @@ class Watchlist(WatchlistBase):
 
     class Config:
         from_attributes = True
+
+class WatchlistItem(Watchlist):
+    movie: Movie
+
+class WatchlistPage(BaseModel):
+    items: List[WatchlistItem]
+    next_cursor: Optional[str] = None
+
+class WatchlistBulkCreate(BaseModel):
+    items: List[WatchlistCreate]
+
+class WatchlistBulkUpdate(BaseModel):
+    movie_ids: List[int]
+    watched: bool = True
+
+class WatchlistSummary(BaseModel):
+    total: int = 0
+    watched: int = 0
+    unwatched: int = 0
+
+class WatchlistBulkResult(BaseModel):
+    affected: int  # entradas inseridas, alteradas ou removidas (as que já estavam no estado pedido não contam)
+    summary: WatchlistSummary
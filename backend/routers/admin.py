@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from core.auth import get_current_admin
+from database import async_engine
+from services import exportacao
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_current_admin)])
+
+
+# Dump completo (ou incremental, com atualizado_desde) de movies, reviews ou watchlist, gerado enquanto é lido
+# do banco. Com gzip=true o arquivo já sai compactado (.gz); sem ele, o middleware ainda pode comprimir o
+# NDJSON/CSV na transferência conforme o Accept-Encoding.
+@router.get("/exportar/{tabela}")
+async def exportar_tabela(
+    tabela: str,
+    formato: str = "ndjson",
+    atualizado_desde: datetime | None = None,
+    gzip: bool = False,
+):
+    if tabela not in exportacao.TABELAS:
+        raise HTTPException(status_code=404, detail=f"Tabela desconhecida; use {', '.join(exportacao.TABELAS)}")
+    try:
+        exportacao.verificar_formato(formato)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    nome = f"{tabela}.{formato}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        exportacao.exportar_async(async_engine, tabela, formato, atualizado_desde, compactar=gzip),
+        media_type=exportacao.tipo_conteudo(formato, gzip),
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
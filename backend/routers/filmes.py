@@ -1,15 +1,27 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query # Importa Depends
-from sqlalchemy.orm import Session
-from database import get_db
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException, Request, Response, status, Depends, Query # Importa Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_db_leitura, marcar_escrita, AsyncSessionLocal
+from core.config import settings
 from crud import movie as movie_crud
+from crud import review as review_crud
+from crud import search as search_crud
+from crud import stats as stats_crud
 from models import models, schemas  # Importa os modelos e schemas do diretório models
 from core.auth import get_current_user # Importa get_current_user de core.auth
-from services.tmdb_service import buscar_filme_por_id, buscar_em_cartaz, buscar_filme_por_nome # Importa do service
+from services.tmdb_service import buscar_filme_por_id, buscar_em_cartaz, buscar_filme_por_nome, paginas_em_cartaz # Importa do service
+from services import avaliacoes_em_lote, respostas
+from services.singleflight import SingleFlight
 from utils.format import formatar_duracao, formatar_dinheiro, formatar_dados_tmdb # Importa do utils
+from utils.cursor import codificar_cursor, decodificar_cursor
 from typing import List
 from datetime import datetime
 
 router = APIRouter(tags=["filmes"])
+logger = logging.getLogger(__name__)
 
 '''@router.get("/filmes/search", response_model=schemas.Movie)
 def buscar_filme(query: str, db: Session = Depends(get_db)):
@@ -41,43 +53,127 @@ def buscar_filme(query: str, db: Session = Depends(get_db)):
     # Retornar o filme recém-criado, convertendo-o para o modelo Pydantic
     return schemas.Movie.from_orm(filme_salvo)
 '''
-@router.get("/filmes/search", response_model=List[schemas.Movie])
-def buscar_filmes(query: str, db: Session = Depends(get_db)):
-    filmes_locais = movie_crud.get_movie_by_title(db, query)  # busca parcial
+# Buscas e importações concorrentes da mesma chave compartilham uma única ida ao TMDB
+voos_busca = SingleFlight()
+voos_filme = SingleFlight()
 
-    if filmes_locais:
-        return [schemas.Movie.from_orm(filme) for filme in filmes_locais]
 
+# Executada em segundo plano, com sessão própria
+async def persistir_filmes(filmes: List[schemas.MovieCreate]):
+    async with AsyncSessionLocal() as db:
+        try:
+            await movie_crud.upsert_movies(db, filmes)
+        except Exception:
+            logger.exception("Falha ao persistir %d filmes da busca", len(filmes))
+
+
+_persistencias: set[asyncio.Task] = set()  # referências das gravações em segundo plano até terminarem
+
+
+# As importações coalescidas (voos_busca, voos_filme) rodam numa task compartilhada por várias requisições:
+# abrem a própria sessão e não usam nada da requisição que as disparou, que pode terminar (ou desconectar)
+# antes delas
+async def _importar_busca(query: str) -> List[schemas.Movie]:
     try:
-        dados_tmdb = buscar_filme_por_nome(query)
+        dados_tmdb = await buscar_filme_por_nome(query)
     except HTTPException as e:
         raise HTTPException(status_code=e.status_code, detail=f"Erro ao buscar filme no TMDB: {e.detail}")
 
     if not dados_tmdb:
         raise HTTPException(status_code=404, detail="Nenhum filme encontrado no TMDB.")
 
-    filmes_formatados = []
+    novos_filmes = []
     for dados_filme in dados_tmdb:
         try:
-            filme_formatado = formatar_dados_tmdb(dados_filme)
-            novo_filme = schemas.MovieCreate(**filme_formatado)
-            filme_salvo = movie_crud.create_movie(db, novo_filme)
-            filmes_formatados.append(schemas.Movie.from_orm(filme_salvo))
+            novo_filme = schemas.MovieCreate(**formatar_dados_tmdb(dados_filme))
         except Exception as e:
             continue  # pula erros em filmes individuais
+        if novo_filme.title:  # title é NOT NULL na tabela movies
+            novos_filmes.append(novo_filme)
+
+    # Grava todos os resultados num único INSERT em lote, em segundo plano ou antes da resposta
+    if settings.BUSCA_PERSISTIR_EM_SEGUNDO_PLANO:
+        tarefa = asyncio.create_task(persistir_filmes(novos_filmes))
+        _persistencias.add(tarefa)
+        tarefa.add_done_callback(_persistencias.discard)
+    else:
+        async with AsyncSessionLocal() as db:
+            await movie_crud.upsert_movies(db, novos_filmes)
+
+    return [schemas.Movie(**filme.dict()) for filme in novos_filmes]
+
+
+@router.get("/filmes/search", response_model=schemas.MoviePage)
+async def buscar_filmes(
+    query: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db_leitura),
+):
+    apos = decodificar_cursor(cursor, float, int) if cursor else None
+
+    # busca ranqueada por relevância, paginada por (rank, id); um item a mais indica que há próxima página
+    resultados = await search_crud.search_movies(db, query, limit + 1, apos)
+    if resultados or cursor:
+        pagina = resultados[:limit]
+        next_cursor = None
+        if len(resultados) > limit:
+            ultimo, rank = pagina[-1]
+            next_cursor = codificar_cursor(rank, ultimo.id)
+        return {"items": [schemas.Movie.from_orm(filme) for filme, _ in pagina], "next_cursor": next_cursor}
+
+    chave = query.strip().lower()
+    filmes = await voos_busca.executar(chave, lambda: _importar_busca(query))
+    return {"items": filmes[:limit], "next_cursor": None}
+
+
+# Catálogo local paginado por id
+@router.get("/filmes", response_model=schemas.MoviePage)
+async def listar_filmes(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db_leitura),
+):
+    apos_id = decodificar_cursor(cursor, int)[0] if cursor else None
+    filmes = await movie_crud.list_movies(db, limit + 1, apos_id)
+    next_cursor = codificar_cursor(filmes[limit - 1].id) if len(filmes) > limit else None
+    return {"items": filmes[:limit], "next_cursor": next_cursor}
+
+
+def _valor(decimal):
+    return int(decimal) if decimal is not None else None
+
+
+# Monta a resposta do detalhe a partir do filme carregado por movie_crud.get_movie_details
+def _detalhe(filme: models.Movie) -> schemas.MovieDetail:
+    orcamento, receita = _valor(filme.budget), _valor(filme.revenue)
+    return schemas.MovieDetail(
+        **schemas.Movie.from_orm(filme).dict(),
+        revenue=receita,
+        profit=receita - orcamento if receita is not None and orcamento is not None else None,
+        genres=[schemas.Genre.from_orm(genero) for genero in filme.genres],
+        cast=[
+            schemas.CastMember(person_id=c.person_id, name=c.person.name, character=c.character_name, order=c.cast_order)
+            for c in filme.cast_entries
+        ],
+        directors=[
+            schemas.CrewMember(person_id=m.person_id, name=m.person.name, job=m.job)
+            for m in filme.crew if m.job == "Director"
+        ],
+        providers=[
+            schemas.StreamingProvider(
+                provider_id=p.provider_id, name=p.provider.name, logo_path=p.provider.logo_path,
+                region=p.region, kind=p.kind,
+            )
+            for p in filme.providers
+        ],
+    )
 
-    return filmes_formatados
-
-@router.get("/filmes/{filme_id}", tags=["Filmes"])
-async def get_filme_por_id(filme_id: int, db: Session = Depends(get_db)):
-    # 1. Buscar no banco de dados local
-    filme_local = movie_crud.get_movie_by_tmdb_id(db, filme_id)
-    if filme_local:
-        return schemas.Movie.from_orm(filme_local)
 
+async def _importar_filme(filme_id: int) -> schemas.MovieDetail:
     # 2. Buscar na API do TMDB se não estiver no banco
     try:
-        dados = buscar_filme_por_id(filme_id)
+        dados = await buscar_filme_por_id(filme_id)
     except HTTPException as e:
         raise HTTPException(status_code=e.status_code, detail=f"Erro ao buscar filme no TMDB: {e.detail}")
     except Exception as e:
@@ -86,18 +182,130 @@ async def get_filme_por_id(filme_id: int, db: Session = Depends(get_db)):
     if not dados:
         raise HTTPException(status_code=404, detail="Filme não encontrado")
 
-    # 3. Tentar formatar os dados recebidos
+    # 3. Tentar normalizar os dados recebidos (filme, gêneros, elenco, diretores, provedores)
     try:
-        filme_formatado = formatar_dados_tmdb(dados)
+        detalhes = movie_crud.normalizar_detalhes(dados)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao formatar dados do TMDB: {e}")
+    if not detalhes["filme"]["title"]:
+        raise HTTPException(status_code=404, detail="Filme não encontrado")
 
-    # 4. Criar e salvar no banco
-    novo_filme = schemas.MovieCreate(**filme_formatado)
-    filme_salvo = movie_crud.create_movie(db, novo_filme)
+    async with AsyncSessionLocal() as db:
+        # 4. Salvar tudo no banco numa única transação
+        await movie_crud.upsert_movie_details(db, [detalhes])
+        await db.commit()
 
-    # 5. Retornar o novo filme formatado
-    return schemas.Movie.from_orm(filme_salvo)
+        # 5. Retornar o detalhe completo, lido do banco como nas próximas requisições
+        filme, _ = await movie_crud.get_movie_details(db, filme_id)
+        return _detalhe(filme)
+
+
+def _item_lote(filme_id: int, conteudo: bytes | None = None, status_code: int = 404, detalhe: str = "") -> bytes:
+    if conteudo is not None:
+        return b'{"id":%d,"movie":%s,"error":null}' % (filme_id, conteudo)
+    return respostas.serializar({"id": filme_id, "movie": None, "error": {"status": status_code, "detail": detalhe}})
+
+
+# Vários detalhes numa requisição (?ids=550,680,13), na ordem pedida e com erro por id. Ordem de resolução:
+# cache de respostas, banco (um IN para todos) e, para o que faltar, TMDB em paralelo com uma gravação em lote.
+# O JSON é montado a partir dos corpos já serializados do detalhe (os mesmos de /filmes/{filme_id}).
+@router.get("/filmes/lote", response_model=schemas.MovieBatch, tags=["Filmes"])
+async def get_filmes_em_lote(
+    ids: str, db: AsyncSession = Depends(get_db_leitura), db_escrita: AsyncSession = Depends(get_db)
+):
+    try:
+        pedidos = [int(valor) for valor in ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids deve ser uma lista de inteiros separados por vírgula")
+    if not pedidos or len(pedidos) > settings.LOTE_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Informe de 1 a {settings.LOTE_MAX_IDS} ids")
+
+    itens: dict[int, bytes] = {}
+    faltando = []
+    for filme_id in dict.fromkeys(pedidos):
+        corpo = respostas.obter(respostas.chave_filme(filme_id))
+        if corpo is not None:
+            itens[filme_id] = _item_lote(filme_id, corpo.conteudo)
+        else:
+            faltando.append(filme_id)
+
+    locais = await movie_crud.get_movies_details(db, faltando)
+    importar = []
+    for filme_id in faltando:
+        filme, sincronizado_em = locais.get(filme_id, (None, None))
+        if filme is not None and sincronizado_em is not None:
+            corpo = respostas.guardar(respostas.chave_filme(filme_id), _detalhe(filme))
+            itens[filme_id] = _item_lote(filme_id, corpo.conteudo)
+        else:
+            importar.append(filme_id)
+
+    if importar:
+        semaforo = asyncio.Semaphore(settings.LOTE_CONCORRENCIA_TMDB)
+
+        async def buscar(filme_id):
+            async with semaforo:
+                try:
+                    return await buscar_filme_por_id(filme_id)
+                except HTTPException as e:
+                    return e
+
+        detalhes = []
+        for filme_id, dados in zip(importar, await asyncio.gather(*(buscar(filme_id) for filme_id in importar))):
+            filme_local = locais.get(filme_id, (None, None))[0]
+            if isinstance(dados, HTTPException):
+                if dados.status_code == 503 and filme_local is not None:
+                    # Mesmo comportamento do detalhe: com o TMDB fora do ar, serve o resumo local
+                    itens[filme_id] = _item_lote(filme_id, respostas.serializar(_detalhe(filme_local)))
+                else:
+                    itens[filme_id] = _item_lote(filme_id, status_code=dados.status_code, detalhe=dados.detail)
+                continue
+            try:
+                normalizado = movie_crud.normalizar_detalhes(dados) if dados else None
+            except Exception as e:
+                itens[filme_id] = _item_lote(filme_id, status_code=500, detalhe=f"Erro ao formatar dados do TMDB: {e}")
+                continue
+            if not normalizado or not normalizado["filme"]["title"]:
+                itens[filme_id] = _item_lote(filme_id, detalhe="Filme não encontrado")
+                continue
+            detalhes.append(normalizado)
+
+        if detalhes:
+            # A importação vai ao primário (db_escrita só abre conexão se chegar aqui)
+            await movie_crud.upsert_movie_details(db_escrita, detalhes)
+            await db_escrita.commit()
+            gravados = await movie_crud.get_movies_details(db_escrita, [d["filme"]["id"] for d in detalhes])
+            for filme_id, (filme, _) in gravados.items():
+                corpo = respostas.guardar(respostas.chave_filme(filme_id), _detalhe(filme))
+                itens[filme_id] = _item_lote(filme_id, corpo.conteudo)
+
+    conteudo = b",".join(itens.get(filme_id) or _item_lote(filme_id, detalhe="Filme não encontrado") for filme_id in pedidos)
+    return Response(content=b'{"items":[' + conteudo + b"]}", media_type="application/json")
+
+
+@router.get("/filmes/{filme_id}", response_model=schemas.MovieDetail, tags=["Filmes"])
+async def get_filme_por_id(filme_id: int, request: Request, db: AsyncSession = Depends(get_db_leitura)):
+    # 0. Corpo já serializado em memória: nem banco nem Pydantic (e 304 se o ETag do cliente bate)
+    chave = respostas.chave_filme(filme_id)
+    corpo = respostas.obter(chave)
+    if corpo is not None:
+        return respostas.responder(request, corpo, settings.CACHE_CONTROL_FILME)
+
+    # 1. Buscar no banco de dados local, com os relacionamentos carregados num número fixo de consultas
+    filme_local, sincronizado_em = await movie_crud.get_movie_details(db, filme_id)
+    if filme_local is not None and sincronizado_em is not None:
+        return respostas.responder(request, respostas.guardar(chave, _detalhe(filme_local)), settings.CACHE_CONTROL_FILME)
+    # Filme ausente, ou gravado só com o resumo de uma busca: importa os detalhes do TMDB
+
+    # Requisições simultâneas pelo mesmo filme aguardam a mesma importação
+    try:
+        detalhe = await voos_filme.executar(filme_id, lambda: _importar_filme(filme_id))
+    except HTTPException as e:
+        if e.status_code != 503 or filme_local is None:
+            raise
+        # TMDB fora do ar (ou circuito aberto): serve o resumo gravado localmente, sem guardar no cache de respostas
+        corpo = respostas.Corpo(respostas.serializar(_detalhe(filme_local)))
+        return respostas.responder(request, corpo, "no-cache")
+    return respostas.responder(request, respostas.guardar(chave, detalhe), settings.CACHE_CONTROL_FILME)
 
 
 '''# esse aqui sobe a rota "/filmes/" aí colocando o id do lado já da pra pegar os dados desse filme
@@ -145,27 +353,66 @@ async def get_filme_por_id(filme_id: int):
         }
     }
 '''
+def _item_em_cartaz(f: dict) -> dict:
+    return {
+        "id": f["id"],
+        "titulo": f["title"],
+        "data": f["release_date"],
+        "nota": f["vote_average"],
+        "poster": f["poster_path"],
+        "overview": f["overview"],
+    }
+
+
 # vai mostrar os filmes que estão em cartaz
 @router.get("/em_cartaz", tags=["Filmes"])
-def listar_em_cartaz_formatado(regiao: str = "BR"):
-    dados = buscar_em_cartaz(regiao=regiao)
+async def listar_em_cartaz_formatado(request: Request, regiao: str = "BR"):
+    dados = await buscar_em_cartaz(regiao=regiao)
 
     if not dados.get("results"):
         raise HTTPException(status_code=404, detail="Nada em cartaz")
 
-    return {
-        "filmes": [
-            {
-                "id": f["id"],
-                "titulo": f["title"],
-                "data": f["release_date"],
-                "nota": f["vote_average"],
-                "poster": f["poster_path"],
-                "overview": f["overview"],
-            }
-            for f in dados["results"]
-        ]
-    }
+    # Os bytes valem enquanto o cache do TMDB devolver o mesmo payload (revalidado => serializa de novo)
+    chave = f"em_cartaz:{regiao}"
+    corpo = respostas.obter(chave, origem=dados)
+    if corpo is None:
+        corpo = respostas.guardar(
+            chave, {"filmes": [_item_em_cartaz(f) for f in dados["results"]]},
+            ttl=settings.TMDB_CACHE_TTL_EM_CARTAZ, origem=dados,
+        )
+    return respostas.responder(request, corpo, settings.CACHE_CONTROL_EM_CARTAZ)
+
+
+# Todas as páginas em cartaz de uma ou mais regiões (?regioes=BR,PT), em NDJSON: um filme por linha, sem
+# repetir ids, enviado assim que a página dele chega (as páginas são buscadas em paralelo)
+@router.get("/em_cartaz/completo", tags=["Filmes"])
+async def listar_em_cartaz_completo(regioes: str = "BR"):
+    lista = list(dict.fromkeys(r.strip().upper() for r in regioes.split(",") if r.strip()))
+    if not lista or len(lista) > settings.EM_CARTAZ_MAX_REGIOES:
+        raise HTTPException(status_code=400, detail=f"Informe de 1 a {settings.EM_CARTAZ_MAX_REGIOES} regiões")
+
+    paginas = paginas_em_cartaz(lista, settings.EM_CARTAZ_MAX_PAGINAS, settings.EM_CARTAZ_CONCORRENCIA)
+    # A primeira página é aguardada aqui: se o TMDB falhar, a resposta ainda pode sair com o status de erro
+    primeira = await anext(paginas)
+
+    async def linhas():
+        vistos = set()
+        pagina = primeira
+        try:
+            while pagina is not None:
+                regiao, dados = pagina
+                bloco = []
+                for f in dados.get("results", []):
+                    if f["id"] not in vistos:
+                        vistos.add(f["id"])
+                        bloco.append(respostas.serializar({**_item_em_cartaz(f), "regiao": regiao}) + b"\n")
+                if bloco:
+                    yield b"".join(bloco)
+                pagina = await anext(paginas, None)
+        finally:
+            await paginas.aclose()
+
+    return StreamingResponse(linhas(), media_type="application/x-ndjson")
 
 
 # Rota para criar uma avaliação de um filme (requer autenticação)
@@ -173,50 +420,73 @@ def listar_em_cartaz_formatado(regiao: str = "BR"):
 async def create_movie_review(
     movie_id_tmdb: int,
     review: schemas.ReviewCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    db_movie = db.query(models.Movie).filter(models.Movie.id == movie_id_tmdb).first()
+    db_movie = await db.get(models.Movie, movie_id_tmdb)
     if not db_movie:
         # Se o filme não existe no nosso banco, podemos tentar buscá-lo da TMDB
         # Por enquanto, vamos apenas levantar uma exceção
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Filme com ID TMDB {movie_id_tmdb} não encontrado")
 
+    pessoas = {p.person_id for p in review.performances}
+    if len(pessoas) != len(review.performances):
+        # (review_id, person_id) é a chave de performance_reviews: uma nota por pessoa
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cada pessoa pode ser avaliada uma vez só")
+    if pessoas:
+        encontradas = set(await db.scalars(select(models.Person.id).where(models.Person.id.in_(pessoas))))
+        if pessoas - encontradas:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Pessoas não encontradas: {sorted(pessoas - encontradas)}")
+
+    if avaliacoes_em_lote.ativo():
+        await db.close()  # devolve a conexão ao pool enquanto espera o lote
+        avaliacao = await avaliacoes_em_lote.gravar(current_user.id, db_movie.id, review)
+        marcar_escrita(db.info)  # o commit foi na sessão do gravador
+        return avaliacao
+
     db_review = models.Review(
         user_id=current_user.id,
         movie_id=db_movie.id,
         rating=review.rating,
         comment=review.comment
     )
+    db_review.performance_reviews = [
+        models.PerformanceReview(person_id=p.person_id, performance_rating=p.performance_rating)
+        for p in review.performances
+    ]
     db.add(db_review)
-    db.commit()
-    db.refresh(db_review)
+    # Agregados (média, histograma, ranking) atualizados na mesma transação da avaliação
+    await stats_crud.record_review(db, db_movie.id, review.rating, review.performances)
+    await db.commit()
+    await db.refresh(db_review)
     return db_review
 
-# Rota para obter as avaliações de um filme
-@router.get("/filmes/{movie_id_tmdb}/avaliacoes", response_model=List[schemas.Review])
+# Rota para obter as avaliações de um filme, paginadas por (created_at, id)
+@router.get("/filmes/{movie_id_tmdb}/avaliacoes", response_model=schemas.ReviewPage)
 async def get_movie_reviews(
     movie_id_tmdb: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db_leitura)
 ):
-    db_movie = db.query(models.Movie).filter(models.Movie.id == movie_id_tmdb).first()
+    db_movie = await db.get(models.Movie, movie_id_tmdb)
     if not db_movie:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Filme com ID {movie_id_tmdb} não encontrado")
 
-    reviews = db.query(models.Review).filter(models.Review.movie_id == db_movie.id).all()
-    return reviews
-
-@router.get("/filmes/{movie_id_tmdb}/avaliacoes", response_model=List[schemas.Review])
-async def get_movie_reviews(
-    movie_id_tmdb: int,
-    db: Session = Depends(get_db)
-):
-    db_movie = db.query(models.Movie).filter(models.Movie.id == movie_id_tmdb).first()
-    if not db_movie:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Filme com ID {movie_id_tmdb} não encontrado")
-
-    reviews = db.query(models.Review).filter(models.Review.movie_id == db_movie.id).all()
-    return reviews
-
-
-
+    apos = decodificar_cursor(cursor, datetime.fromisoformat, int) if cursor else None
+
+    # As avaliações só são inseridas, sempre junto com o contador em movie_stats: a contagem é a versão da página
+    estatisticas = await db.get(models.MovieStats, db_movie.id)
+    etag = respostas.etag_versao("avaliacoes", db_movie.id, estatisticas.review_count if estatisticas else 0, limit, cursor)
+    resposta = respostas.nao_modificado(request, etag, settings.CACHE_CONTROL_AVALIACOES)
+    if resposta is not None:
+        return resposta
+
+    reviews = await review_crud.get_movie_reviews(db, db_movie.id, limit + 1, apos)
+    next_cursor = None
+    if len(reviews) > limit:
+        ultima = reviews[limit - 1]
+        next_cursor = codificar_cursor(ultima.created_at.isoformat(), ultima.id)
+    pagina = schemas.ReviewPage.model_validate({"items": reviews[:limit], "next_cursor": next_cursor}, from_attributes=True)
+    return respostas.responder(request, respostas.Corpo(respostas.serializar(pagina), etag), settings.CACHE_CONTROL_AVALIACOES)
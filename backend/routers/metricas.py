@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from services.metricas import registro
+
+router = APIRouter(tags=["metricas"])
+
+
+# Formato texto do Prometheus; com vários workers cada processo expõe as próprias métricas
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(registro), media_type=CONTENT_TYPE_LATEST)
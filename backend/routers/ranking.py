@@ -0,0 +1,33 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db_leitura
+from crud import stats as stats_crud
+from models import models, schemas
+
+router = APIRouter(tags=["ranking"])
+
+
+# Top-N filmes pelo score (média bayesiana), opcionalmente filtrado por gênero
+@router.get("/filmes/ranking", response_model=List[schemas.LeaderboardEntry])
+async def get_ranking(
+    genero_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db_leitura),
+):
+    return await stats_crud.get_leaderboard(db, limit, genero_id)
+
+
+# Média, total e histograma de notas de um filme, lidos dos agregados (sem varrer reviews)
+@router.get("/filmes/{movie_id_tmdb}/estatisticas", response_model=schemas.MovieStats)
+async def get_movie_stats(movie_id_tmdb: int, db: AsyncSession = Depends(get_db_leitura)):
+    if await db.get(models.Movie, movie_id_tmdb) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Filme com ID {movie_id_tmdb} não encontrado")
+    return await stats_crud.get_movie_stats(db, movie_id_tmdb)
+
+
+@router.get("/pessoas/{person_id}/estatisticas", response_model=schemas.PersonStats)
+async def get_person_stats(person_id: int, db: AsyncSession = Depends(get_db_leitura)):
+    if await db.get(models.Person, person_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Pessoa com ID {person_id} não encontrada")
+    return await stats_crud.get_person_stats(db, person_id)
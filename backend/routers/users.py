@@ -1,26 +1,140 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from database import get_db
 from models import models, schemas  # Importa os modelos e schemas do diretório models
 from core.auth import get_current_user # Importa get_current_user
+from core.config import settings
 from core.security import get_password_hash # Importa função de hash
+from crud import watchlist as watchlist_crud
+from services import recomendacoes
+from utils.cursor import codificar_cursor, decodificar_cursor
 
 router = APIRouter(prefix="/usuarios", tags=["usuarios"])
 
 # Rota para criar um novo usuário
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await db.scalar(select(models.User).where(models.User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email já registrado")
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)  # bcrypt é CPU pesada
     db_user = models.User(name=user.name, email=user.email, password_hash=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 # Rota para obter o usuário logado
 @router.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(get_current_user)):
-    return current_user
\ No newline at end of file
+async def read_users_me(current_user: schemas.User = Depends(get_current_user)):
+    return current_user
+
+
+# Filmes recomendados a partir dos vizinhos pré-calculados dos filmes que o usuário avaliou ou assistiu,
+# dos gêneros/pessoas favoritos e da popularidade; nunca inclui filmes já avaliados ou assistidos
+@router.get("/me/recomendacoes", response_model=List[schemas.Recommendation])
+async def read_my_recommendations(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    recomendados = await recomendacoes.recomendar(db, current_user.id, limit)
+    if recomendados is None:
+        if not settings.RECOMENDACOES_HABILITADA:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Recomendações desabilitadas")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Modelo de recomendações ainda não carregado",
+            headers={"Retry-After": "30"},
+        )
+    filmes = {f.id: f for f in await db.scalars(select(models.Movie).where(models.Movie.id.in_([id for id, _ in recomendados])))}
+    return [
+        schemas.Recommendation(movie=schemas.Movie.model_validate(filmes[id]), score=round(pontuacao, 4))
+        for id, pontuacao in recomendados if id in filmes
+    ]
+
+
+# Watchlist do usuário logado, mais recentes primeiro; `watched` filtra assistidos/não assistidos
+@router.get("/me/watchlist", response_model=schemas.WatchlistPage)
+async def read_my_watchlist(
+    watched: bool | None = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = None,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    antes = decodificar_cursor(cursor, datetime.fromisoformat, int) if cursor else None
+    entradas = await watchlist_crud.get_watchlist(db, current_user.id, limit + 1, watched, antes)
+    next_cursor = None
+    if len(entradas) > limit:
+        ultima = entradas[limit - 1]
+        next_cursor = codificar_cursor(ultima.added_at.isoformat(), ultima.movie_id)
+    return {"items": entradas[:limit], "next_cursor": next_cursor}
+
+
+# Totais da watchlist, lidos do resumo mantido a cada escrita (sem contar as linhas)
+@router.get("/me/watchlist/resumo", response_model=schemas.WatchlistSummary)
+async def read_my_watchlist_summary(
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    return await watchlist_crud.get_watchlist_summary(db, current_user.id)
+
+
+def _verificar_lote(movie_ids: List[int]) -> List[int]:
+    movie_ids = list(dict.fromkeys(movie_ids))
+    if not movie_ids or len(movie_ids) > settings.WATCHLIST_LOTE_MAX:
+        raise HTTPException(status_code=400, detail=f"Informe de 1 a {settings.WATCHLIST_LOTE_MAX} filmes")
+    return movie_ids
+
+
+async def _resultado_lote(db: AsyncSession, user_id: int, afetados: int) -> dict:
+    resumo = await watchlist_crud.get_watchlist_summary(db, user_id)
+    await db.commit()
+    return {"affected": afetados, "summary": resumo}
+
+
+# Adiciona vários filmes numa transação (um INSERT com várias linhas); os que já estão na watchlist são ignorados
+@router.post("/me/watchlist", response_model=schemas.WatchlistBulkResult)
+async def add_to_my_watchlist(
+    lote: schemas.WatchlistBulkCreate,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    itens = {item.movie_id: item.watched for item in lote.items}  # filme repetido: vale o último
+    movie_ids = _verificar_lote(list(itens))
+    encontrados = set(await db.scalars(select(models.Movie.id).where(models.Movie.id.in_(movie_ids))))
+    if len(encontrados) < len(movie_ids):
+        faltando = sorted(set(movie_ids) - encontrados)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Filmes não encontrados: {faltando}")
+    adicionados = await watchlist_crud.add_to_watchlist(db, current_user.id, itens)
+    return await _resultado_lote(db, current_user.id, adicionados)
+
+
+# Marca (ou desmarca, com watched=false) vários filmes como assistidos num único UPDATE
+@router.patch("/me/watchlist", response_model=schemas.WatchlistBulkResult)
+async def mark_my_watchlist(
+    lote: schemas.WatchlistBulkUpdate,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    alteradas = await watchlist_crud.mark_watched(db, current_user.id, _verificar_lote(lote.movie_ids), lote.watched)
+    return await _resultado_lote(db, current_user.id, alteradas)
+
+
+# Remove vários filmes num único DELETE: /usuarios/me/watchlist?movie_ids=550,680
+@router.delete("/me/watchlist", response_model=schemas.WatchlistBulkResult)
+async def remove_from_my_watchlist(
+    movie_ids: str,
+    current_user: schemas.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        ids = [int(valor) for valor in movie_ids.split(",") if valor.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="movie_ids deve ser uma lista de inteiros separados por vírgula")
+    removidas = await watchlist_crud.remove_from_watchlist(db, current_user.id, _verificar_lote(ids))
+    return await _resultado_lote(db, current_user.id, removidas)
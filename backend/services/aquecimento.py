@@ -0,0 +1,88 @@
+# Aquecimento da subida (tarefa em segundo plano do lifespan) e estado de prontidão exposto em /pronto.
+# O esquema não é tocado aqui: só se confere se há migrações pendentes (python manage.py migrar). Só esta tarefa
+# fala com o banco; /pronto apenas lê o estado que ela deixa.
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+
+import migracoes
+from core.config import settings
+from crud.search import atualizar_indice, usa_postgres
+from database import AsyncSessionLocal, async_engine, replicas
+
+logger = logging.getLogger(__name__)
+
+_RETENTATIVA = 5.0  # segundos entre tentativas enquanto o banco não responde
+
+estado = {"pronto": False, "migracoes_pendentes": None, "aquecimento_s": None, "erro": None}
+
+
+async def _pendentes() -> list[str]:
+    async with async_engine.connect() as conexao:
+        return await conexao.run_sync(migracoes.pendentes)
+
+
+# Abre as conexões ao mesmo tempo para o pool já guardá-las: as primeiras requisições não pagam o connect
+async def _abrir_conexoes(engine, quantidade: int):
+    tamanho_pool = getattr(engine.pool, "size", None)
+    if tamanho_pool is not None:
+        quantidade = min(quantidade, tamanho_pool())  # além disso seriam conexões de overflow, fechadas na volta
+
+    async def abrir():
+        conexao = await engine.connect()
+        await conexao.execute(text("SELECT 1"))
+        return conexao
+
+    conexoes = await asyncio.gather(*(abrir() for _ in range(max(quantidade, 1))), return_exceptions=True)
+    for conexao in conexoes:
+        if not isinstance(conexao, BaseException):
+            await conexao.close()
+    for conexao in conexoes:
+        if isinstance(conexao, BaseException):
+            raise conexao
+
+
+async def _aquecer():
+    quantidade = settings.AQUECIMENTO_CONEXOES
+    if quantidade is None:
+        quantidade = settings.DB_POOL_SIZE
+    await _abrir_conexoes(async_engine, quantidade)
+    for replica in replicas:
+        try:
+            await _abrir_conexoes(replica.engine, quantidade)
+        except Exception as e:  # réplica fora do ar não impede a subida: as leituras vão para o primário
+            logger.warning("Falha ao aquecer a réplica %s: %s", replica.nome, e)
+
+    # Com migrações pendentes espera o `migrar` (rodado depois da subida) e então termina o aquecimento
+    while pendentes := await _pendentes():
+        if pendentes != estado["migracoes_pendentes"]:
+            logger.warning("Migrações pendentes: %s (rode python manage.py migrar)", ", ".join(pendentes))
+        estado["migracoes_pendentes"] = pendentes
+        await asyncio.sleep(_RETENTATIVA)
+    estado["migracoes_pendentes"] = []
+
+    async with AsyncSessionLocal() as db:
+        portavel = not usa_postgres(db)
+    if portavel:
+        await atualizar_indice()  # índice de títulos em memória da busca
+
+
+async def aquecer():
+    inicio = time.perf_counter()
+    while True:
+        try:
+            await _aquecer()
+            break
+        except Exception as e:
+            estado["erro"] = str(e)
+            logger.warning("Falha no aquecimento, tentando de novo em %.0fs: %s", _RETENTATIVA, e)
+            await asyncio.sleep(_RETENTATIVA)
+    estado["erro"] = None
+    estado["aquecimento_s"] = round(time.perf_counter() - inicio, 3)
+    estado["pronto"] = True
+
+
+def prontidao() -> dict:
+    return dict(estado)
@@ -0,0 +1,208 @@
+# Gravação de avaliações em lote (write-behind com group commit), ligada por AVALIACOES_EM_LOTE.
+# A rota valida e enfileira; o gravador junta o que chegar em até AVALIACOES_LOTE_MS (ou AVALIACOES_LOTE_MAX
+# avaliações), grava tudo numa transação (um UPSERT por tabela de agregados, qualquer que seja o lote) e só
+# depois do commit entrega a cada requisição a sua avaliação, com id: o 201 continua saindo depois do commit.
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from fastapi import HTTPException, status
+from prometheus_client import Counter as Contador, Histogram
+from prometheus_client.core import GaugeMetricFamily
+
+from core.config import settings
+from crud import stats as stats_crud
+from database import AsyncSessionLocal, async_engine
+from models import models, schemas
+from services.metricas import registro
+
+logger = logging.getLogger(__name__)
+
+LOTE_TAMANHO = Histogram(
+    "cinebase_avaliacoes_lote_tamanho", "Avaliações gravadas por commit no modo em lote",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000), registry=registro,
+)
+LOTE_DURACAO = Histogram(
+    "cinebase_avaliacoes_lote_segundos", "Duração da gravação de cada lote (INSERTs, agregados e commit)",
+    registry=registro,
+)
+REJEITADAS = Contador(
+    "cinebase_avaliacoes_rejeitadas", "Avaliações recusadas com 503 por fila cheia", registry=registro,
+)
+
+
+@dataclass
+class _Pedido:
+    user_id: int
+    movie_id: int
+    review: schemas.ReviewCreate
+    futuro: asyncio.Future
+
+
+_fila: asyncio.Queue | None = None
+_lote_cheio: asyncio.Event | None = None
+_tarefa: asyncio.Task | None = None
+_aceitando = False
+_encerrado = False  # fila já drenada no desligamento: o que entrar depois não seria gravado
+# Conexão própria do gravador, fora da disputa pelo pool: com o pool cheio de requisições esperando pelo lote,
+# o gravador na fila do pool atrás delas só atrasaria todas
+_conexao = None
+
+
+def ativo() -> bool:
+    return _aceitando
+
+
+# Enfileira e espera o commit do lote. Com a fila cheia espera até AVALIACOES_FILA_ESPERA por uma vaga e
+# depois responde 503: a pressão volta para os clientes em vez de acumular memória e latência.
+async def gravar(user_id: int, movie_id: int, review: schemas.ReviewCreate) -> models.Review:
+    pedido = _Pedido(user_id, movie_id, review, asyncio.get_running_loop().create_future())
+    try:
+        await asyncio.wait_for(_fila.put(pedido), settings.AVALIACOES_FILA_ESPERA)
+    except asyncio.TimeoutError:
+        REJEITADAS.inc()
+        raise _indisponivel("Muitas avaliações sendo gravadas, tente de novo")
+    if _encerrado and not pedido.futuro.done():
+        # Ficou esperando vaga na fila cheia e só entrou depois da drenagem do desligamento: não será gravada
+        REJEITADAS.inc()
+        raise _indisponivel("Servidor em desligamento, tente de novo")
+    if _fila.qsize() >= settings.AVALIACOES_LOTE_MAX:
+        _lote_cheio.set()
+    # shield: se o cliente desistir, a avaliação já enfileirada é gravada mesmo assim
+    return await asyncio.shield(pedido.futuro)
+
+
+def _indisponivel(detalhe: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detalhe, headers={"Retry-After": "1"},
+    )
+
+
+def _montar(pedido: _Pedido) -> models.Review:
+    avaliacao = models.Review(
+        user_id=pedido.user_id, movie_id=pedido.movie_id, rating=pedido.review.rating, comment=pedido.review.comment,
+    )
+    avaliacao.performance_reviews = [
+        models.PerformanceReview(person_id=p.person_id, performance_rating=p.performance_rating)
+        for p in pedido.review.performances
+    ]
+    return avaliacao
+
+
+async def _inserir(lote: list[_Pedido]) -> list[models.Review]:
+    global _conexao
+    if _conexao is None:
+        _conexao = await async_engine.connect()
+    async with AsyncSessionLocal(bind=_conexao) as db:
+        avaliacoes = [_montar(pedido) for pedido in lote]
+        db.add_all(avaliacoes)
+        # ids e created_at voltam pelo RETURNING; no PostgreSQL em INSERTs de várias linhas, no SQLite um por
+        # linha (lá o SQLAlchemy não garante a ordem do RETURNING em lote), mas sempre num commit só
+        await db.flush()
+        await stats_crud.record_reviews(db, [
+            (avaliacao.movie_id, avaliacao.rating, pedido.review.performances)
+            for avaliacao, pedido in zip(avaliacoes, lote)
+        ])
+        await db.commit()
+        return avaliacoes
+
+
+async def _gravar(lote: list[_Pedido]):
+    inicio = time.perf_counter()
+    try:
+        avaliacoes = await _inserir(lote)
+    except Exception as e:
+        await _fechar_conexao()  # pode ter caído; a próxima gravação abre outra
+        if len(lote) == 1:
+            if not lote[0].futuro.done():
+                lote[0].futuro.set_exception(e)
+            return
+        # Uma avaliação com problema (ex.: filme apagado depois da validação) não derruba as outras
+        logger.warning("Falha no lote de %d avaliações, gravando uma a uma: %s", len(lote), e)
+        for pedido in lote:
+            await _gravar([pedido])
+        return
+    LOTE_TAMANHO.observe(len(lote))
+    LOTE_DURACAO.observe(time.perf_counter() - inicio)
+    for pedido, avaliacao in zip(lote, avaliacoes):
+        if not pedido.futuro.done():
+            pedido.futuro.set_result(avaliacao)
+
+
+async def _fechar_conexao():
+    global _conexao
+    if _conexao is not None:
+        conexao, _conexao = _conexao, None
+        try:
+            await conexao.close()
+        except Exception:
+            await conexao.invalidate()
+
+
+def _retirar(limite: int) -> list[_Pedido]:
+    lote = []
+    while len(lote) < limite and not _fila.empty():
+        pedido = _fila.get_nowait()
+        if pedido is not None:
+            lote.append(pedido)
+    return lote
+
+
+async def _laco():
+    while True:
+        primeiro = await _fila.get()
+        if primeiro is None:  # acordado pelo encerramento
+            if _fila.empty():
+                return
+            continue
+        # Espera o lote encher ou o prazo contado da primeira avaliação; enquanto um lote grava, o próximo acumula
+        if _aceitando and _fila.qsize() + 1 < settings.AVALIACOES_LOTE_MAX:
+            _lote_cheio.clear()
+            try:
+                await asyncio.wait_for(_lote_cheio.wait(), settings.AVALIACOES_LOTE_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+        try:
+            await _gravar([primeiro] + _retirar(settings.AVALIACOES_LOTE_MAX - 1))
+        except Exception:  # o laço não pode morrer com requisições esperando
+            logger.exception("Falha inesperada no gravador de avaliações")
+        if not _aceitando and _fila.empty():
+            return
+
+
+def iniciar():
+    global _fila, _lote_cheio, _tarefa, _aceitando, _encerrado
+    _fila = asyncio.Queue(maxsize=settings.AVALIACOES_FILA_MAX)
+    _lote_cheio = asyncio.Event()
+    _tarefa = asyncio.create_task(_laco())
+    _aceitando = True
+    _encerrado = False
+
+
+# Encerramento limpo: as requisições novas passam a gravar direto (ver a rota) e tudo o que já está na fila
+# é gravado antes de a engine ser fechada. Quem ainda esperava vaga e entra na fila depois recebe 503 (gravar).
+async def encerrar():
+    global _aceitando, _encerrado
+    if _tarefa is None:
+        return
+    _aceitando = False
+    _lote_cheio.set()
+    if _fila.empty():
+        _fila.put_nowait(None)
+    await _tarefa
+    while lote := _retirar(settings.AVALIACOES_LOTE_MAX):
+        await _gravar(lote)
+    _encerrado = True  # sem await desde o último _retirar vazio
+    await _fechar_conexao()
+
+
+class _ColetorFila:
+    def collect(self):
+        if _fila is not None:
+            yield GaugeMetricFamily(
+                "cinebase_avaliacoes_fila", "Avaliações esperando o próximo lote", value=_fila.qsize(),
+            )
+
+
+registro.register(_ColetorFila())
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable
+
+
+@dataclass
+class _Entrada:
+    valor: Any
+    tamanho: int
+    expira_em: float  # até aqui a entrada é considerada fresca
+    obsoleta_ate: float  # até aqui ainda pode ser servida enquanto é revalidada
+
+
+# Cache em memória com TTL por entrada e despejo LRU por quantidade de itens ou bytes.
+# Entradas expiradas continuam disponíveis por `janela_obsoleta` segundos (stale-while-revalidate):
+# `get` devolve o valor marcado como obsoleto e quem chamou decide se agenda a atualização.
+class CacheLRU:
+    def __init__(self, max_itens: int = 1024, max_bytes: int | None = None, janela_obsoleta: float = 0.0):
+        self.max_itens = max_itens
+        self.max_bytes = max_bytes
+        self.janela_obsoleta = janela_obsoleta
+        self._dados: "OrderedDict[Hashable, _Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.hits_obsoletos = 0
+        self.misses = 0
+        self.despejos = 0
+        self.expirados = 0
+
+    # Retorna (valor, obsoleto); (None, False) em caso de miss
+    def get(self, chave: Hashable) -> tuple[Any, bool]:
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None, False
+            if agora >= entrada.obsoleta_ate:
+                self._remover(chave)
+                self.expirados += 1
+                self.misses += 1
+                return None, False
+            self._dados.move_to_end(chave)
+            if agora >= entrada.expira_em:
+                self.hits_obsoletos += 1
+                return entrada.valor, True
+            self.hits += 1
+            return entrada.valor, False
+
+    def set(self, chave: Hashable, valor: Any, ttl: float, tamanho: int = 1) -> None:
+        expira_em = time.monotonic() + ttl
+        entrada = _Entrada(valor, tamanho, expira_em, expira_em + self.janela_obsoleta)
+        with self._lock:
+            if chave in self._dados:
+                self._remover(chave)
+            self._dados[chave] = entrada
+            self._bytes += tamanho
+            while self._dados and (
+                len(self._dados) > self.max_itens
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                chave_antiga = next(iter(self._dados))
+                self._remover(chave_antiga)
+                self.despejos += 1
+
+    def invalidar(self, chave: Hashable) -> bool:
+        with self._lock:
+            if chave not in self._dados:
+                return False
+            self._remover(chave)
+            return True
+
+    def invalidar_prefixo(self, prefixo: str) -> int:
+        with self._lock:
+            chaves = [c for c in self._dados if isinstance(c, str) and c.startswith(prefixo)]
+            for chave in chaves:
+                self._remover(chave)
+            return len(chaves)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._dados.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "itens": len(self._dados),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "hits_obsoletos": self.hits_obsoletos,
+                "misses": self.misses,
+                "despejos": self.despejos,
+                "expirados": self.expirados,
+            }
+
+    def _remover(self, chave: Hashable) -> None:
+        entrada = self._dados.pop(chave)
+        self._bytes -= entrada.tamanho
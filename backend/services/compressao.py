@@ -0,0 +1,161 @@
+import time
+import zlib
+
+from prometheus_client import Counter as Contador
+from starlette.datastructures import Headers, MutableHeaders
+
+from core.config import settings
+from services.metricas import registro
+
+try:
+    import brotli  # opcional: sem o pacote, só gzip
+except ImportError:
+    brotli = None
+
+# Ordem de preferência do servidor quando o cliente aceita mais de uma com a mesma prioridade
+CODIFICACOES = ("br", "gzip") if brotli is not None else ("gzip",)
+TIPOS_COMPRIMIVEIS = ("application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html")
+
+BYTES_COMPRESSAO = Contador(
+    "cinebase_compressao_bytes", "Bytes dos corpos comprimidos, antes (original) e depois (enviado) da compressão",
+    ["codificacao", "etapa"], registry=registro,
+)
+TEMPO_COMPRESSAO = Contador(
+    "cinebase_compressao_segundos", "Tempo de CPU gasto comprimindo respostas", ["codificacao"], registry=registro,
+)
+
+
+# Codificação escolhida para o Accept-Encoding do cliente (None: enviar sem compressão)
+def escolher_codificacao(accept_encoding: str | None) -> str | None:
+    if not accept_encoding or not settings.COMPRESSAO_HABILITADA:
+        return None
+    aceitas = {}
+    for item in accept_encoding.split(","):
+        nome, _, parametros = item.strip().lower().partition(";")
+        peso = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                peso = float(parametros.strip()[2:])
+            except ValueError:
+                peso = 0.0
+        aceitas[nome.strip()] = peso
+    melhor, melhor_peso = None, 0.0
+    for codificacao in CODIFICACOES:
+        peso = aceitas.get(codificacao, aceitas.get("*", 0.0))
+        if peso > melhor_peso:
+            melhor, melhor_peso = codificacao, peso
+    return melhor
+
+
+class Compressor:
+    def __init__(self, codificacao: str):
+        self.codificacao = codificacao
+        if codificacao == "br":
+            self._brotli = brotli.Compressor(quality=settings.COMPRESSAO_NIVEL_BROTLI)
+        else:
+            self._zlib = zlib.compressobj(settings.COMPRESSAO_NIVEL_GZIP, zlib.DEFLATED, 31)  # 31: formato gzip
+
+    # `descarregar`: devolve já tudo o que foi recebido (respostas em streaming, ex.: NDJSON)
+    def comprimir(self, dados: bytes, descarregar: bool = False) -> bytes:
+        inicio = time.process_time()
+        if self.codificacao == "br":
+            saida = self._brotli.process(dados) + (self._brotli.flush() if descarregar else b"")
+        else:
+            saida = self._zlib.compress(dados) + (self._zlib.flush(zlib.Z_SYNC_FLUSH) if descarregar else b"")
+        self._contabilizar(len(dados), len(saida), inicio)
+        return saida
+
+    def finalizar(self) -> bytes:
+        inicio = time.process_time()
+        saida = self._brotli.finish() if self.codificacao == "br" else self._zlib.flush()
+        self._contabilizar(0, len(saida), inicio)
+        return saida
+
+    def _contabilizar(self, original: int, enviado: int, inicio: float):
+        BYTES_COMPRESSAO.labels(self.codificacao, "original").inc(original)
+        BYTES_COMPRESSAO.labels(self.codificacao, "enviado").inc(enviado)
+        TEMPO_COMPRESSAO.labels(self.codificacao).inc(time.process_time() - inicio)
+
+
+def comprimir(codificacao: str, dados: bytes) -> bytes:
+    compressor = Compressor(codificacao)
+    return compressor.comprimir(dados) + compressor.finalizar()
+
+
+# A representação comprimida é outra: o ETag forte ganha o sufixo da codificação ("abc" -> "abc-gzip")
+def etag_codificado(etag: str, codificacao: str) -> str:
+    return f'{etag[:-1]}-{codificacao}"' if etag.endswith('"') else etag
+
+
+def adicionar_vary(headers: MutableHeaders, valor: str):
+    atuais = [item.strip() for item in headers.get("vary", "").split(",") if item.strip()]
+    if valor.lower() not in (item.lower() for item in atuais):
+        headers["Vary"] = ", ".join(atuais + [valor])
+
+
+def _comprimivel(status: int, headers: MutableHeaders) -> bool:
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return False
+    tipo = headers.get("content-type", "").split(";")[0].strip().lower()
+    return tipo.startswith(TIPOS_COMPRIMIVEIS)
+
+
+# Comprime as respostas das rotas que não negociam a codificação sozinhas (as que já mandam
+# Content-Encoding, como o cache de respostas, passam direto). Corpos menores que
+# COMPRESSAO_TAMANHO_MINIMO vão sem compressão; respostas em streaming são comprimidas pedaço a pedaço.
+class MiddlewareCompressao:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSAO_HABILITADA:
+            await self.app(scope, receive, send)
+            return
+
+        codificacao = escolher_codificacao(Headers(scope=scope).get("accept-encoding"))
+        inicio_resposta = None
+        compressor = None
+        repassar = False
+
+        async def enviar(mensagem):
+            nonlocal inicio_resposta, compressor, repassar
+            if mensagem["type"] == "http.response.start":
+                # Segura o início até ver o primeiro pedaço do corpo (tamanho e se há mais por vir)
+                inicio_resposta = {**mensagem, "headers": list(mensagem.get("headers", []))}
+                return
+            if mensagem["type"] != "http.response.body" or repassar:
+                await send(mensagem)
+                return
+
+            corpo = mensagem.get("body", b"")
+            mais = mensagem.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=inicio_resposta["headers"])
+                comprimivel = _comprimivel(inicio_resposta["status"], headers)
+                if comprimivel:
+                    adicionar_vary(headers, "Accept-Encoding")
+                if not comprimivel or codificacao is None or (not mais and len(corpo) < settings.COMPRESSAO_TAMANHO_MINIMO):
+                    repassar = True
+                    await send(inicio_resposta)
+                    await send(mensagem)
+                    return
+                compressor = Compressor(codificacao)
+                headers["Content-Encoding"] = codificacao
+                if "etag" in headers:
+                    headers["ETag"] = etag_codificado(headers["etag"], codificacao)
+                if mais:
+                    del headers["Content-Length"]
+                else:
+                    corpo = compressor.comprimir(corpo) + compressor.finalizar()
+                    headers["Content-Length"] = str(len(corpo))
+                    await send(inicio_resposta)
+                    await send({"type": "http.response.body", "body": corpo})
+                    return
+                await send(inicio_resposta)
+
+            dados = compressor.comprimir(corpo, descarregar=mais)
+            if not mais:
+                dados += compressor.finalizar()
+            await send({"type": "http.response.body", "body": dados, "more_body": mais})
+
+        await self.app(scope, receive, enviar)
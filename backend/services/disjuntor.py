@@ -0,0 +1,65 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+# Circuit breaker: depois de `limiar_falhas` falhas seguidas o circuito abre e as chamadas falham na hora.
+# Passado `tempo_aberto`, fica meio aberto e deixa passar uma chamada de teste: se der certo fecha,
+# se falhar abre de novo. `ao_mudar(anterior, novo)` é chamado a cada transição.
+class Disjuntor:
+    def __init__(self, nome: str, limiar_falhas: int, tempo_aberto: float, ao_mudar=None):
+        self.nome = nome
+        self.limiar_falhas = limiar_falhas
+        self.tempo_aberto = tempo_aberto
+        self.ao_mudar = ao_mudar
+        self.estado = FECHADO
+        self.falhas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    # True se a chamada pode seguir; no estado meio aberto só a chamada de teste passa
+    def permitir(self) -> bool:
+        with self._lock:
+            if self.estado == FECHADO:
+                return True
+            if self.estado == ABERTO:
+                if time.monotonic() - self._aberto_em < self.tempo_aberto:
+                    return False
+                self._mudar(MEIO_ABERTO)
+            if self._teste_em_andamento:
+                return False
+            self._teste_em_andamento = True
+            return True
+
+    def sucesso(self) -> None:
+        with self._lock:
+            self.falhas = 0
+            self._teste_em_andamento = False
+            if self.estado != FECHADO:
+                self._mudar(FECHADO)
+
+    def falha(self) -> None:
+        with self._lock:
+            self.falhas += 1
+            self._teste_em_andamento = False
+            if self.estado == MEIO_ABERTO or (self.estado == FECHADO and self.falhas >= self.limiar_falhas):
+                self._aberto_em = time.monotonic()
+                self._mudar(ABERTO)
+
+    # Chamada liberada por `permitir` que terminou sem indicar nada sobre a saúde do serviço (ex.: 429)
+    def neutro(self) -> None:
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def _mudar(self, novo: str) -> None:
+        anterior, self.estado = self.estado, novo
+        logger.warning("Circuito %s: %s -> %s (%d falhas seguidas)", self.nome, anterior, novo, self.falhas)
+        if self.ao_mudar is not None:
+            self.ao_mudar(anterior, novo)
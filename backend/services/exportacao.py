@@ -0,0 +1,220 @@
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, or_, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.config import settings
+from models.models import Movie, MovieSync, Review, Watchlist
+from services.compressao import Compressor
+
+FORMATOS = ("ndjson", "csv", "parquet")
+TABELAS = ("movies", "reviews", "watchlist")
+
+
+# Colunas exportadas e filtro de atualizado_desde de cada tabela
+def _consulta(tabela: str, desde: datetime | None):
+    if tabela == "movies":
+        consulta = select(*Movie.__table__.columns, MovieSync.synced_at).outerjoin(
+            MovieSync, MovieSync.movie_id == Movie.id
+        ).order_by(Movie.id)
+        # updated_at muda em toda gravação do filme; synced_at só existe para quem teve os detalhes importados
+        return consulta.where(Movie.updated_at >= desde) if desde else consulta
+    if tabela == "reviews":
+        consulta = select(*Review.__table__.columns).order_by(Review.id)
+        return consulta.where(Review.created_at >= desde) if desde else consulta
+    if tabela == "watchlist":
+        consulta = select(*Watchlist.__table__.columns).order_by(Watchlist.user_id, Watchlist.movie_id)
+        return consulta.where(or_(Watchlist.added_at >= desde, Watchlist.watched_at >= desde)) if desde else consulta
+    raise ValueError(f"Tabela desconhecida: {tabela}")
+
+
+def _json_padrao(valor):
+    if isinstance(valor, Decimal):
+        return int(valor) if valor == valor.to_integral_value() else float(valor)
+    raise TypeError
+
+
+class _NDJSON:
+    tipo = "application/x-ndjson"
+
+    def __init__(self, colunas):
+        self.colunas = [coluna.name for coluna in colunas]
+
+    def inicio(self) -> bytes:
+        return b""
+
+    def lote(self, linhas) -> bytes:
+        return b"".join(
+            orjson.dumps(dict(zip(self.colunas, linha)), default=_json_padrao) + b"\n" for linha in linhas
+        )
+
+    def fim(self) -> bytes:
+        return b""
+
+
+class _CSV:
+    tipo = "text/csv"
+
+    def __init__(self, colunas):
+        self.colunas = [coluna.name for coluna in colunas]
+
+    def _escrever(self, linhas) -> bytes:
+        saida = io.StringIO()
+        csv.writer(saida).writerows(linhas)
+        return saida.getvalue().encode()
+
+    def inicio(self) -> bytes:
+        return self._escrever([self.colunas])
+
+    def lote(self, linhas) -> bytes:
+        return self._escrever(linhas)
+
+    def fim(self) -> bytes:
+        return b""
+
+
+# Destino do ParquetWriter: guarda o que foi escrito até ser esvaziado a cada lote
+class _Saida(io.RawIOBase):
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def esvaziar(self) -> bytes:
+        dados, self._partes = b"".join(self._partes), []
+        return dados
+
+
+# Um row group por lote: a memória fica no tamanho de um lote, não da tabela. Requer o pacote pyarrow.
+class _Parquet:
+    tipo = "application/vnd.apache.parquet"
+
+    def __init__(self, colunas):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._schema = pa.schema([(coluna.name, self._tipo(coluna.type)) for coluna in colunas])
+        self._saida = _Saida()
+        self._escritor = pq.ParquetWriter(self._saida, self._schema, compression="zstd")
+
+    def _tipo(self, tipo):
+        pa = self._pa
+        if isinstance(tipo, Boolean):
+            return pa.bool_()
+        if isinstance(tipo, Integer):
+            return pa.int64()
+        if isinstance(tipo, (Float, Numeric)):
+            return pa.float64()
+        if isinstance(tipo, DateTime):
+            return pa.timestamp("us")
+        if isinstance(tipo, Date):
+            return pa.date32()
+        return pa.string()
+
+    def inicio(self) -> bytes:
+        return b""
+
+    def lote(self, linhas) -> bytes:
+        colunas = list(zip(*linhas))
+        arrays = []
+        for campo, valores in zip(self._schema, colunas):
+            if campo.type == self._pa.float64():
+                valores = [float(valor) if valor is not None else None for valor in valores]
+            arrays.append(self._pa.array(valores, type=campo.type))
+        self._escritor.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+        return self._saida.esvaziar()
+
+    def fim(self) -> bytes:
+        self._escritor.close()
+        return self._saida.esvaziar()
+
+
+_ESCRITORES = {"ndjson": _NDJSON, "csv": _CSV, "parquet": _Parquet}
+
+
+def verificar_formato(formato: str) -> None:
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS)})")
+    if formato == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ValueError("Exportação em Parquet requer o pacote pyarrow")
+
+
+def tipo_conteudo(formato: str, compactar: bool) -> str:
+    if compactar:
+        return "application/gzip"
+    return _ESCRITORES[formato].tipo
+
+
+class _Exportacao:
+    def __init__(self, tabela: str, formato: str, desde: datetime | None, compactar: bool):
+        verificar_formato(formato)
+        self.consulta = _consulta(tabela, desde)
+        self.escritor = _ESCRITORES[formato](self.consulta.selected_columns)
+        self.compressor = Compressor("gzip") if compactar else None
+        self.linhas = 0
+
+    def _saida(self, dados: bytes, final: bool = False) -> bytes:
+        if self.compressor is None:
+            return dados
+        return self.compressor.comprimir(dados) + (self.compressor.finalizar() if final else b"")
+
+    def inicio(self) -> bytes:
+        return self._saida(self.escritor.inicio())
+
+    def lote(self, linhas) -> bytes:
+        self.linhas += len(linhas)
+        return self._saida(self.escritor.lote(linhas))
+
+    def fim(self) -> bytes:
+        return self._saida(self.escritor.fim(), final=True)
+
+
+# As duas versões leem com cursor do lado do servidor (stream_results/yield_per; no PostgreSQL um cursor
+# nomeado) e entregam um pedaço do arquivo por lote de EXPORTACAO_LOTE linhas: a memória não cresce com a tabela.
+
+# Para as rotas (engine assíncrona)
+async def exportar_async(engine: AsyncEngine, tabela: str, formato: str, desde: datetime | None = None,
+                         compactar: bool = False):
+    exportacao = _Exportacao(tabela, formato, desde, compactar)
+    yield exportacao.inicio()
+    async with engine.connect() as conexao:
+        resultado = await conexao.stream(exportacao.consulta.execution_options(yield_per=settings.EXPORTACAO_LOTE))
+        async for linhas in resultado.partitions():
+            pedaco = exportacao.lote(linhas)
+            if pedaco:
+                yield pedaco
+    yield exportacao.fim()
+
+
+# Para o manage.py (engine síncrona); retorna o total de linhas exportadas
+def exportar(engine: Engine, arquivo, tabela: str, formato: str, desde: datetime | None = None,
+             compactar: bool = False) -> int:
+    exportacao = _Exportacao(tabela, formato, desde, compactar)
+    arquivo.write(exportacao.inicio())
+    with engine.connect() as conexao:
+        resultado = conexao.execution_options(stream_results=True, yield_per=settings.EXPORTACAO_LOTE).execute(
+            exportacao.consulta
+        )
+        for linhas in resultado.partitions():
+            arquivo.write(exportacao.lote(linhas))
+    arquivo.write(exportacao.fim())
+    return exportacao.linhas
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+from prometheus_client import Counter as Contador
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from crud import movie as movie_crud
+from database import AsyncSessionLocal, async_engine
+from models.models import IngestionCheckpoint, Movie, MovieSync
+from services import tmdb_service
+from services.metricas import registro
+
+logger = logging.getLogger(__name__)
+
+# Listas percorridas página a página; as por região usam INGESTAO_REGIOES
+LISTAS = {"now_playing": True, "upcoming": True, "popular": False, "top_rated": False}
+JANELA_ALTERACOES = timedelta(days=14)  # limite do /movie/changes do TMDB
+CHAVE_TRAVA = 0x43494E45  # pg_advisory_lock: um único ingestor entre workers/processos
+
+FILMES_INGERIDOS = Contador(
+    "cinebase_ingestao_filmes", "Filmes gravados pela ingestão", ["fonte"], registry=registro,
+)
+ERROS_INGESTAO = Contador(
+    "cinebase_ingestao_erros", "Falhas ao buscar páginas ou detalhes no TMDB durante a ingestão",
+    ["fonte"], registry=registro,
+)
+
+# Estado lido na coleta de /metrics (atualizado pelo ingestor deste processo)
+_ultimo_ciclo: dict[str, float] = {}
+_frescor: dict = {}
+
+
+class _ColetorFrescor:
+    def collect(self):
+        atraso = GaugeMetricFamily(
+            "cinebase_ingestao_atraso_segundos", "Tempo desde o último ciclo completo de cada fonte", labels=["fonte"]
+        )
+        agora = time.time()
+        for fonte, instante in _ultimo_ciclo.items():
+            atraso.add_metric([fonte], agora - instante)
+        yield atraso
+
+        filmes = GaugeMetricFamily(
+            "cinebase_catalogo_filmes", "Filmes do catálogo local por situação da sincronização", labels=["estado"]
+        )
+        for estado in ("total", "nunca_sincronizados", "desatualizados"):
+            if estado in _frescor:
+                filmes.add_metric([estado], _frescor[estado])
+        yield filmes
+        if _frescor.get("idade_mais_antiga_segundos") is not None:
+            yield GaugeMetricFamily(
+                "cinebase_catalogo_idade_maxima_segundos", "Idade da sincronização mais antiga do catálogo",
+                value=_frescor["idade_mais_antiga_segundos"],
+            )
+
+
+registro.register(_ColetorFrescor())
+
+
+def fontes_configuradas() -> list[str]:
+    fontes = []
+    for nome in (fonte.strip() for fonte in settings.INGESTAO_FONTES.split(",")):
+        if LISTAS.get(nome):
+            fontes += [f"{nome}:{regiao.strip()}" for regiao in settings.INGESTAO_REGIOES.split(",")]
+        elif nome:
+            fontes.append(nome)
+    return fontes
+
+
+# Trava de sessão (pg_advisory_lock) numa conexão em autocommit: ela fica parada durante todo o ciclo, inclusive
+# nas chamadas ao TMDB, e numa transação aberta seguraria o vacuum e cairia no idle_in_transaction_session_timeout
+@asynccontextmanager
+async def _trava():
+    if async_engine.dialect.name != "postgresql":
+        yield True
+        return
+    async with async_engine.execution_options(isolation_level="AUTOCOMMIT").connect() as conexao:
+        obtida = await conexao.scalar(text("SELECT pg_try_advisory_lock(:chave)"), {"chave": CHAVE_TRAVA})
+        try:
+            yield obtida
+        finally:
+            if obtida:
+                await conexao.execute(text("SELECT pg_advisory_unlock(:chave)"), {"chave": CHAVE_TRAVA})
+
+
+async def _checkpoint(db: AsyncSession, fonte: str) -> IngestionCheckpoint:
+    checkpoint = await db.get(IngestionCheckpoint, fonte)
+    if checkpoint is None:
+        checkpoint = IngestionCheckpoint(source=fonte, next_page=1)
+        db.add(checkpoint)
+    return checkpoint
+
+
+# Busca os detalhes em paralelo (limitado pelo semáforo) e grava tudo com um upsert em lote, sem commit
+async def _importar(db: AsyncSession, ids: list[int], fonte: str, semaforo: asyncio.Semaphore,
+                    idade_maxima: float | None) -> int:
+    ids = list(dict.fromkeys(ids))
+    if idade_maxima is not None and ids:
+        limite = datetime.utcnow() - timedelta(seconds=idade_maxima)
+        recentes = set(await db.scalars(
+            select(MovieSync.movie_id).where(MovieSync.movie_id.in_(ids), MovieSync.synced_at >= limite)
+        ))
+        ids = [id for id in ids if id not in recentes]
+    if not ids:
+        return 0
+
+    async def buscar(id):
+        async with semaforo:
+            return await tmdb_service.buscar_detalhes_sem_cache(id)
+
+    detalhes = []
+    for dados in await asyncio.gather(*(buscar(id) for id in ids)):
+        if dados is None:
+            ERROS_INGESTAO.labels(fonte).inc()
+            continue
+        detalhes.append(movie_crud.normalizar_detalhes(dados))
+    gravados = await movie_crud.upsert_movie_details(db, detalhes)
+    FILMES_INGERIDOS.labels(fonte).inc(gravados)
+    return gravados
+
+
+# Percorre uma lista do TMDB a partir do checkpoint; cada página é gravada junto com o avanço do checkpoint
+async def _ingerir_lista(fonte: str, semaforo: asyncio.Semaphore, max_paginas: int) -> dict:
+    lista, _, regiao = fonte.partition(":")
+    relatorio = {"paginas": 0, "filmes": 0, "concluido": False}
+    async with AsyncSessionLocal() as db:
+        checkpoint = await _checkpoint(db, fonte)
+        if checkpoint.next_page == 1:
+            checkpoint.cycle_started_at = datetime.utcnow()
+        pagina = checkpoint.next_page
+
+        while True:
+            dados = await tmdb_service.buscar_lista(lista, pagina, regiao or None)
+            if dados is None:
+                ERROS_INGESTAO.labels(fonte).inc()
+                await db.commit()
+                break  # o checkpoint continua na página que falhou
+            total = min(dados.get("total_pages") or 1, max_paginas)
+            ids = [filme["id"] for filme in dados.get("results", [])]
+            relatorio["filmes"] += await _importar(db, ids, fonte, semaforo, settings.INGESTAO_IDADE_MAXIMA)
+            relatorio["paginas"] += 1
+
+            checkpoint.total_pages = total
+            if pagina >= total:
+                checkpoint.next_page = 1
+                checkpoint.last_completed_at = datetime.utcnow()
+                relatorio["concluido"] = True
+            else:
+                checkpoint.next_page = pagina + 1
+            await db.commit()
+            if relatorio["concluido"]:
+                _ultimo_ciclo[fonte] = time.time()
+                break
+            pagina += 1
+    return relatorio
+
+
+# Reimporta os filmes do catálogo local que mudaram no TMDB desde a última execução
+async def _ingerir_alteracoes(fonte: str, semaforo: asyncio.Semaphore) -> dict:
+    relatorio = {"paginas": 0, "filmes": 0, "concluido": False}
+    hoje = datetime.utcnow().date()
+    async with AsyncSessionLocal() as db:
+        checkpoint = await _checkpoint(db, fonte)
+        if checkpoint.window_start is None:
+            ultima = checkpoint.last_completed_at
+            checkpoint.window_start = ultima.date() if ultima else hoje - timedelta(days=1)
+            checkpoint.next_page = 1
+            checkpoint.cycle_started_at = datetime.utcnow()
+
+        while True:
+            inicio = checkpoint.window_start
+            fim = min(inicio + JANELA_ALTERACOES, hoje)
+            dados = await tmdb_service.buscar_alteracoes(inicio, fim, checkpoint.next_page)
+            if dados is None:
+                ERROS_INGESTAO.labels(fonte).inc()
+                await db.commit()
+                break
+            ids = [item["id"] for item in dados.get("results", []) if not item.get("adult")]
+            locais = list(await db.scalars(select(Movie.id).where(Movie.id.in_(ids)))) if ids else []
+            relatorio["filmes"] += await _importar(db, locais, fonte, semaforo, idade_maxima=None)
+            relatorio["paginas"] += 1
+
+            if checkpoint.next_page < (dados.get("total_pages") or 1):
+                checkpoint.next_page += 1
+            elif fim < hoje:
+                checkpoint.window_start, checkpoint.next_page = fim, 1  # janela seguinte
+            else:
+                checkpoint.window_start, checkpoint.next_page = None, 1
+                checkpoint.last_completed_at = datetime.utcnow()
+                relatorio["concluido"] = True
+            await db.commit()
+            if relatorio["concluido"]:
+                _ultimo_ciclo[fonte] = time.time()
+                break
+    return relatorio
+
+
+async def medir_frescor(db: AsyncSession) -> dict:
+    limite = datetime.utcnow() - timedelta(seconds=settings.INGESTAO_IDADE_MAXIMA)
+    total = await db.scalar(select(func.count()).select_from(Movie))
+    sincronizados = await db.scalar(select(func.count()).select_from(MovieSync))
+    desatualizados = await db.scalar(select(func.count()).select_from(MovieSync).where(MovieSync.synced_at < limite))
+    mais_antigo = await db.scalar(select(func.min(MovieSync.synced_at)))
+    # Também a partir dos checkpoints, para o atraso valer logo após um restart ou com ingestão via CLI
+    for fonte, concluido in await db.execute(
+        select(IngestionCheckpoint.source, IngestionCheckpoint.last_completed_at)
+        .where(IngestionCheckpoint.last_completed_at.isnot(None))
+    ):
+        _ultimo_ciclo[fonte] = max(_ultimo_ciclo.get(fonte, 0), concluido.replace(tzinfo=timezone.utc).timestamp())
+    _frescor.update({
+        "total": total,
+        "nunca_sincronizados": total - sincronizados,
+        "desatualizados": desatualizados,
+        "idade_mais_antiga_segundos": (datetime.utcnow() - mais_antigo).total_seconds() if mais_antigo else None,
+    })
+    return dict(_frescor)
+
+
+async def status(db: AsyncSession) -> dict:
+    checkpoints = await db.scalars(select(IngestionCheckpoint).order_by(IngestionCheckpoint.source))
+    return {
+        "fontes": {
+            c.source: {
+                "proxima_pagina": c.next_page,
+                "total_paginas": c.total_pages,
+                "ciclo_iniciado_em": c.cycle_started_at,
+                "ultimo_ciclo_completo": c.last_completed_at,
+                "janela_alteracoes": c.window_start,
+            }
+            for c in checkpoints
+        },
+        "frescor": await medir_frescor(db),
+    }
+
+
+# Um ciclo de ingestão; retoma de onde parou se o anterior foi interrompido
+async def executar_ciclo(fontes: list[str] | None = None, max_paginas: int | None = None) -> dict:
+    fontes = fontes or fontes_configuradas()
+    max_paginas = max_paginas or settings.INGESTAO_MAX_PAGINAS
+    semaforo = asyncio.Semaphore(settings.INGESTAO_CONCORRENCIA)
+    relatorio = {}
+    # As chamadas da ingestão ficam atrás das dos usuários na fila do limitador do TMDB
+    with tmdb_service.prioridade(tmdb_service.PRIORIDADE_INGESTAO):
+        async with _trava() as obtida:
+            if not obtida:
+                logger.info("Ingestão já em andamento em outro processo; ciclo ignorado")
+                return {"ignorado": True}
+            for fonte in fontes:
+                inicio = time.perf_counter()
+                try:
+                    if fonte == "changes":
+                        relatorio[fonte] = await _ingerir_alteracoes(fonte, semaforo)
+                    else:
+                        relatorio[fonte] = await _ingerir_lista(fonte, semaforo, max_paginas)
+                except Exception:
+                    logger.exception("Falha na ingestão da fonte %s", fonte)
+                    ERROS_INGESTAO.labels(fonte).inc()
+                    relatorio[fonte] = {"erro": True}
+                    continue
+                relatorio[fonte]["segundos"] = round(time.perf_counter() - inicio, 2)
+                logger.info("Ingestão de %s: %s", fonte, relatorio[fonte])
+            async with AsyncSessionLocal() as db:
+                relatorio["frescor"] = await medir_frescor(db)
+        return relatorio
+
+
+# Tarefa em segundo plano da aplicação (INGESTAO_HABILITADA): um ciclo a cada INGESTAO_INTERVALO segundos
+async def laco_ingestao():
+    while True:
+        try:
+            await executar_ciclo()
+        except Exception:
+            logger.exception("Falha no ciclo de ingestão")
+        await asyncio.sleep(settings.INGESTAO_INTERVALO)
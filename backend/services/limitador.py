@@ -0,0 +1,69 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+# Token bucket com fila de prioridade: `taxa` liberações por segundo, acumulando até `rajada`.
+# Quem espera é atendido por prioridade (menor número primeiro) e, na mesma prioridade, por ordem de chegada.
+# `pausar` segura todo mundo por um tempo (ex.: Retry-After de um 429, que vale para a cota inteira).
+class Limitador:
+    def __init__(self, taxa: float, rajada: int):
+        self.taxa = taxa
+        self.rajada = max(rajada, 1)
+        self._tokens = float(self.rajada)
+        self._atualizado = time.monotonic()
+        self._pausado_ate = 0.0
+        self._fila: list = []
+        self._sequencia = itertools.count()
+
+    def _espera(self) -> float:
+        agora = time.monotonic()
+        self._tokens = min(self.rajada, self._tokens + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+        falta = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.taxa
+        return max(falta, self._pausado_ate - agora)
+
+    def pausar(self, segundos: float) -> None:
+        self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+
+    def _acordar_primeiro(self) -> None:
+        if self._fila:
+            self._fila[0][2].set()
+
+    # Espera a vez e consome um token; retorna o tempo de espera em segundos
+    async def adquirir(self, prioridade: int = 0) -> float:
+        inicio = time.monotonic()
+        if self.taxa <= 0:
+            return 0.0  # sem limite configurado
+        entrada = (prioridade, next(self._sequencia), asyncio.Event())
+        heapq.heappush(self._fila, entrada)
+        try:
+            while True:
+                evento = entrada[2]
+                evento.clear()
+                if self._fila[0] is not entrada:
+                    await evento.wait()  # acordado quando vira o primeiro da fila
+                    continue
+                espera = self._espera()
+                if espera <= 0:
+                    heapq.heappop(self._fila)
+                    self._tokens -= 1
+                    self._acordar_primeiro()
+                    return time.monotonic() - inicio
+                # Um pedido mais prioritário que chegue agora passa a ser o primeiro e também espera o token
+                try:
+                    await asyncio.wait_for(evento.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if entrada in self._fila:
+                primeiro = self._fila[0] is entrada
+                self._fila.remove(entrada)
+                heapq.heapify(self._fila)
+                if primeiro:
+                    self._acordar_primeiro()
+            raise
+
+    def tamanho_fila(self) -> int:
+        return len(self._fila)
@@ -0,0 +1,291 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from prometheus_client import CollectorRegistry, Counter as Contador, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.config import settings
+from services.profiler import perfilador
+
+logger = logging.getLogger(__name__)
+
+# Registro próprio (e não o global do prometheus_client) para expor só as métricas da aplicação
+registro = CollectorRegistry()
+
+BUCKETS_CONTAGEM = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+LATENCIA = Histogram(
+    "cinebase_requisicao_segundos", "Latência das requisições HTTP",
+    ["metodo", "rota", "status"], registry=registro,
+)
+DB_CONSULTAS_REQUISICAO = Histogram(
+    "cinebase_requisicao_db_consultas", "Consultas SQL emitidas por requisição",
+    ["rota"], buckets=BUCKETS_CONTAGEM, registry=registro,
+)
+DB_TEMPO_REQUISICAO = Histogram(
+    "cinebase_requisicao_db_segundos", "Tempo somado das consultas SQL por requisição",
+    ["rota"], registry=registro,
+)
+TMDB_CHAMADAS_REQUISICAO = Histogram(
+    "cinebase_requisicao_tmdb_chamadas", "Chamadas ao TMDB por requisição",
+    ["rota"], buckets=BUCKETS_CONTAGEM, registry=registro,
+)
+TMDB_TEMPO_REQUISICAO = Histogram(
+    "cinebase_requisicao_tmdb_segundos", "Tempo somado das chamadas ao TMDB por requisição",
+    ["rota"], registry=registro,
+)
+OUTROS_TEMPO_REQUISICAO = Histogram(
+    "cinebase_requisicao_outros_segundos",
+    "Tempo da requisição fora do banco e do TMDB (código Python, validação, serialização)",
+    ["rota"], registry=registro,
+)
+CACHE_TMDB_REQUISICAO = Contador(
+    "cinebase_requisicao_cache_tmdb", "Consultas ao cache do TMDB por rota e resultado",
+    ["rota", "resultado"], registry=registro,
+)
+DB_CONSULTA = Histogram(
+    "cinebase_db_consulta_segundos", "Duração de cada consulta SQL",
+    ["engine", "operacao"], registry=registro,
+)
+DB_POOL_ESPERA = Histogram(
+    "cinebase_db_pool_espera_segundos", "Espera para obter uma conexão do pool (inclui abrir conexões novas)",
+    ["engine"], buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    registry=registro,
+)
+DB_POOL_ABERTAS = Contador(
+    "cinebase_db_pool_conexoes_abertas", "Conexões novas abertas pelo pool (parte da espera acima)",
+    ["engine"], registry=registro,
+)
+TMDB_LATENCIA = Histogram(
+    "cinebase_tmdb_requisicao_segundos", "Latência das chamadas HTTP ao TMDB",
+    ["endpoint", "status"], registry=registro,
+)
+N_MAIS_UM = Contador(
+    "cinebase_n_mais_um", "Requisições que repetiram a mesma consulta SQL além do limiar",
+    ["rota"], registry=registro,
+)
+
+
+# Estado da requisição em andamento; os hooks do SQLAlchemy e do TMDB somam aqui
+class _Requisicao:
+    __slots__ = ("rota", "consultas", "tempo_db", "chamadas_tmdb", "tempo_tmdb", "instrucoes", "cache_tmdb", "encerrada")
+
+    def __init__(self, rota: str):
+        self.rota = rota
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.chamadas_tmdb = 0
+        self.tempo_tmdb = 0.0
+        self.instrucoes = Counter()
+        self.cache_tmdb = Counter()
+        self.encerrada = False
+
+
+_requisicao_atual: ContextVar[_Requisicao | None] = ContextVar("requisicao_atual", default=None)
+
+
+def _requisicao() -> _Requisicao | None:
+    requisicao = _requisicao_atual.get()
+    if requisicao is None or requisicao.encerrada:
+        return None  # fora de uma requisição, ou em uma tarefa de segundo plano já depois da resposta
+    return requisicao
+
+
+# Mesma consulta com listas IN de tamanhos diferentes conta como uma só instrução
+_PARAMETROS = re.compile(r"(\?|%\(\w+\)s|%s|\$\d+|:\w+)(\s*,\s*(\?|%\(\w+\)s|%s|\$\d+|:\w+))+")
+
+
+def _normalizar_instrucao(instrucao: str) -> str:
+    return _PARAMETROS.sub("?", " ".join(instrucao.split()))
+
+
+def _operacao(instrucao: str) -> str:
+    palavra = instrucao.lstrip().split(None, 1)[0].upper() if instrucao.strip() else ""
+    return palavra if palavra in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OUTRA"
+
+
+def instrumentar_engine(engine: Engine, nome: str):
+    # Para a engine assíncrona, passe async_engine.sync_engine: os eventos são os mesmos
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, instrucao, parametros, contexto, executemany):
+        conn.info.setdefault("_inicio_consultas", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, instrucao, parametros, contexto, executemany):
+        inicios = conn.info.get("_inicio_consultas")
+        if not inicios:
+            return
+        duracao = time.perf_counter() - inicios.pop()
+        DB_CONSULTA.labels(nome, _operacao(instrucao)).observe(duracao)
+        requisicao = _requisicao()
+        if requisicao is not None:
+            requisicao.consultas += 1
+            requisicao.tempo_db += duracao
+            requisicao.instrucoes[_normalizar_instrucao(instrucao)] += 1
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        inicios = contexto.connection.info.get("_inicio_consultas") if contexto.connection else None
+        if inicios:
+            inicios.pop()
+
+    # O pool não tem evento "antes do checkout": a espera é medida em volta de engine.connect, por onde passam
+    # Session, AsyncSession e engine.begin (fila do pool, abertura de conexões novas e pre-ping)
+    conectar = engine.connect
+
+    def _conectar_medido():
+        inicio = time.perf_counter()
+        try:
+            return conectar()
+        finally:
+            DB_POOL_ESPERA.labels(nome).observe(time.perf_counter() - inicio)
+
+    engine.connect = _conectar_medido
+
+    @event.listens_for(engine, "connect")
+    def _nova_conexao(conexao_dbapi, registro_conexao):
+        DB_POOL_ABERTAS.labels(nome).inc()
+
+    _pools[nome] = engine.pool
+
+
+def registrar_chamada_tmdb(endpoint: str, status: str, duracao: float):
+    TMDB_LATENCIA.labels(_endpoint_tmdb(endpoint), status).observe(duracao)
+    requisicao = _requisicao()
+    if requisicao is not None:
+        requisicao.chamadas_tmdb += 1
+        requisicao.tempo_tmdb += duracao
+
+
+# Acumulado na requisição: a rota só é conhecida no fim (ver _encerrar)
+def registrar_cache_tmdb(resultado: str):
+    requisicao = _requisicao()
+    if requisicao is not None:
+        requisicao.cache_tmdb[resultado] += 1
+
+
+def _endpoint_tmdb(endpoint: str) -> str:
+    # /movie/550 -> /movie/{id}, para não criar uma série por filme
+    caminho = endpoint.removeprefix(settings.TMDB_URL)
+    return re.sub(r"/\d+", "/{id}", caminho)
+
+
+# Métricas lidas na hora da coleta: ocupação dos pools e contadores dos caches em memória
+_pools = {}
+_caches = {}
+
+
+def registrar_cache(nome: str, cache):
+    _caches[nome] = cache
+
+
+class _ColetorEstado:
+    def collect(self):
+        conexoes = GaugeMetricFamily(
+            "cinebase_db_pool_conexoes", "Conexões do pool por estado", labels=["engine", "estado"]
+        )
+        capacidade = GaugeMetricFamily(
+            "cinebase_db_pool_capacidade", "Conexões que o pool pode abrir (pool_size + max_overflow)", labels=["engine"]
+        )
+        for nome, pool in _pools.items():
+            if not hasattr(pool, "checkedout"):
+                continue  # NullPool/StaticPool não mantêm contagem
+            conexoes.add_metric([nome, "em_uso"], pool.checkedout())
+            conexoes.add_metric([nome, "livres"], pool.checkedin())
+            if hasattr(pool, "_max_overflow"):
+                capacidade.add_metric([nome], pool.size() + max(pool._max_overflow, 0))
+        yield conexoes
+        yield capacidade
+
+        eventos = CounterMetricFamily(
+            "cinebase_cache_eventos", "Eventos dos caches em memória", labels=["cache", "evento"]
+        )
+        ocupacao = GaugeMetricFamily("cinebase_cache_itens", "Itens nos caches em memória", labels=["cache"])
+        for nome, cache in _caches.items():
+            estatisticas = cache.estatisticas()
+            for evento in ("hits", "hits_obsoletos", "misses", "despejos", "expirados"):
+                eventos.add_metric([nome, evento], estatisticas[evento])
+            ocupacao.add_metric([nome], estatisticas["itens"])
+        yield eventos
+        yield ocupacao
+
+
+registro.register(_ColetorEstado())
+
+
+def _rota(scope) -> str:
+    rota = scope.get("route")
+    # Rotas não encontradas ficam agrupadas para não criar uma série por URL
+    return getattr(rota, "path", None) or "nao_encontrada"
+
+
+def _encerrar(requisicao: _Requisicao, metodo: str, status: int, inicio: float):
+    duracao = time.perf_counter() - inicio
+    requisicao.encerrada = True
+    rota = requisicao.rota
+
+    LATENCIA.labels(metodo, rota, str(status)).observe(duracao)
+    DB_CONSULTAS_REQUISICAO.labels(rota).observe(requisicao.consultas)
+    DB_TEMPO_REQUISICAO.labels(rota).observe(requisicao.tempo_db)
+    TMDB_CHAMADAS_REQUISICAO.labels(rota).observe(requisicao.chamadas_tmdb)
+    TMDB_TEMPO_REQUISICAO.labels(rota).observe(requisicao.tempo_tmdb)
+    OUTROS_TEMPO_REQUISICAO.labels(rota).observe(max(duracao - requisicao.tempo_db - requisicao.tempo_tmdb, 0.0))
+    for resultado, quantidade in requisicao.cache_tmdb.items():
+        CACHE_TMDB_REQUISICAO.labels(rota, resultado).inc(quantidade)
+
+    if requisicao.instrucoes:
+        instrucao, repeticoes = requisicao.instrucoes.most_common(1)[0]
+        if repeticoes >= settings.METRICAS_N_MAIS_UM_LIMIAR:
+            N_MAIS_UM.labels(rota).inc()
+            logger.warning(
+                "Possível N+1 em %s %s: a mesma consulta rodou %d vezes (%d no total): %s",
+                metodo, rota, repeticoes, requisicao.consultas, instrucao[:300],
+            )
+    return duracao
+
+
+# Middleware ASGI puro (sem BaseHTTPMiddleware, que cria uma tarefa extra por requisição).
+# A latência é medida até o último pedaço do corpo; tarefas de segundo plano não entram na conta.
+class MiddlewareMetricas:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        requisicao = _Requisicao("nao_encontrada")
+        token = _requisicao_atual.set(requisicao)
+        status = 500
+        metodo = scope["method"]
+        perfil = perfilador.iniciar() if settings.PROFILER_HABILITADO else None
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+            if mensagem["type"] == "http.response.body" and not mensagem.get("more_body") and not requisicao.encerrada:
+                requisicao.rota = _rota(scope)
+                duracao = _encerrar(requisicao, metodo, status, inicio)
+                if perfil is not None:
+                    perfilador.finalizar(perfil, f"{metodo} {requisicao.rota}", duracao)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            if not requisicao.encerrada:  # exceção antes de a resposta terminar
+                requisicao.rota = _rota(scope)
+                duracao = _encerrar(requisicao, metodo, status, inicio)
+                if perfil is not None:
+                    perfilador.finalizar(perfil, f"{metodo} {requisicao.rota}", duracao)
+            elif perfil is not None:
+                perfilador.liberar(perfil)
+            _requisicao_atual.reset(token)
@@ -0,0 +1,97 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Perfil:
+    __slots__ = ("inicio", "ativo")
+
+    def __init__(self):
+        self.inicio = time.monotonic()
+        self.ativo = True
+
+
+# Profiler por amostragem: uma thread lê a pilha de todas as threads a cada PROFILER_INTERVALO_MS
+# enquanto houver requisições em andamento. Requisições acima de PROFILER_LIMIAR_MS geram um arquivo
+# .folded (formato "pilha;pilha;função contagem", aceito por flamegraph.pl e speedscope) com as amostras
+# da sua janela de tempo. Como o event loop é compartilhado, a janela inclui o trabalho de requisições
+# concorrentes; o que aparece na thread do loop é justamente o que o manteve ocupado.
+class PerfiladorAmostragem:
+    def __init__(self, intervalo: float, janela: float = 60.0):
+        self.intervalo = intervalo
+        self._amostras = deque(maxlen=max(int(janela / intervalo), 1))
+        self._lock = threading.Lock()
+        self._ativos = 0
+        self._acordar = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def iniciar(self) -> _Perfil:
+        with self._lock:
+            self._ativos += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._amostrar, name="perfilador", daemon=True)
+                self._thread.start()
+        self._acordar.set()
+        return _Perfil()
+
+    def liberar(self, perfil: _Perfil):
+        with self._lock:
+            if not perfil.ativo:
+                return
+            perfil.ativo = False
+            self._ativos -= 1
+            if not self._ativos:
+                self._acordar.clear()
+
+    def finalizar(self, perfil: _Perfil, rotulo: str, duracao: float):
+        fim = time.monotonic()
+        self.liberar(perfil)
+        if duracao * 1000 < settings.PROFILER_LIMIAR_MS:
+            return
+        pilhas = Counter(pilha for instante, pilha in list(self._amostras) if perfil.inicio <= instante <= fim)
+        if not pilhas:
+            return
+        try:
+            self._gravar(rotulo, duracao, pilhas)
+        except OSError as e:
+            logger.warning("Não foi possível gravar o perfil de %s: %s", rotulo, e)
+
+    def _gravar(self, rotulo: str, duracao: float, pilhas: Counter):
+        os.makedirs(settings.PROFILER_DIRETORIO, exist_ok=True)
+        nome = re.sub(r"[^\w.-]+", "_", rotulo).strip("_")
+        caminho = os.path.join(
+            settings.PROFILER_DIRETORIO, f"{time.strftime('%Y%m%d-%H%M%S')}_{nome}_{int(duracao * 1000)}ms.folded"
+        )
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            for pilha, contagem in pilhas.most_common():
+                arquivo.write(f"{pilha} {contagem}\n")
+        logger.info("Perfil de %s (%.0f ms) gravado em %s", rotulo, duracao * 1000, caminho)
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        while True:
+            self._acordar.wait()
+            nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+            instante = time.monotonic()
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                pilha.append(nomes.get(ident, str(ident)))
+                self._amostras.append((instante, ";".join(reversed(pilha))))
+            time.sleep(self.intervalo)
+
+
+perfilador = PerfiladorAmostragem(intervalo=settings.PROFILER_INTERVALO_MS / 1000)
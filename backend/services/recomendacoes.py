@@ -0,0 +1,466 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+
+import numpy as np
+from prometheus_client.core import GaugeMetricFamily
+from scipy import sparse
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from database import async_engine, engine
+from models.models import Movie, MovieCast, MovieGenre, Review, UserFavoriteGenre, UserFavoritePerson, Watchlist
+from services.metricas import registro
+
+logger = logging.getLogger(__name__)
+
+# Recomendação item a item: cada filme guarda os RECOMENDACOES_VIZINHOS filmes mais parecidos, misturando
+# a similaridade de cosseno das notas (centradas na média de cada usuário) com a de gêneros/elenco.
+# Uma consulta só soma as listas de vizinhos dos filmes que o usuário avaliou: não há SQL pesado por requisição.
+
+_PESO_PRIOR_USUARIO = 3  # avaliações fictícias com nota RANKING_PRIOR_MEDIA na média de cada usuário
+_LOTE_LEITURA = 50_000
+
+
+# Resultado da consulta como matriz float64 (uma coluna por coluna selecionada), lido em lotes.
+# np.fromiter sobre os valores: np.array(linhas) testaria atributos em cada Row e fica dezenas de vezes mais lento.
+def _ler(conexao, consulta) -> np.ndarray:
+    colunas = len(consulta.selected_columns)
+    resultado = conexao.execution_options(stream_results=True, yield_per=_LOTE_LEITURA).execute(consulta)
+    lotes = [
+        np.fromiter(itertools.chain.from_iterable(linhas), dtype=np.float64, count=len(linhas) * colunas).reshape(-1, colunas)
+        for linhas in resultado.partitions()
+    ]
+    if not lotes:
+        return np.empty((0, colunas))
+    return np.concatenate(lotes)
+
+
+# Posição de cada id no array ordenado `ordenados` e máscara dos que existem nele
+def _indices(ordenados: np.ndarray, ids) -> tuple[np.ndarray, np.ndarray]:
+    ids = np.asarray(ids, dtype=np.int64)
+    if not len(ordenados):
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+    posicoes = np.searchsorted(ordenados, ids).clip(max=len(ordenados) - 1)
+    return posicoes, ordenados[posicoes] == ids
+
+
+def _media_usuario(soma, contagem):
+    return (soma + settings.RANKING_PRIOR_MEDIA * _PESO_PRIOR_USUARIO) / (contagem + _PESO_PRIOR_USUARIO)
+
+
+def _normalizar_linhas(matriz: sparse.csr_matrix) -> sparse.csr_matrix:
+    normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=1)).ravel())
+    normas[normas == 0] = 1
+    return sparse.csr_matrix(sparse.diags((1 / normas).astype(np.float32)) @ matriz)
+
+
+# Log do número de usuários que avaliaram/assistiram cada filme, de 0 a 1
+def _popularidade(notas: sparse.csr_matrix) -> np.ndarray:
+    popularidade = np.log1p(np.bincount(notas.indices, minlength=notas.shape[1])).astype(np.float32)
+    if len(popularidade) and popularidade.max() > 0:
+        popularidade /= popularidade.max()
+    return popularidade
+
+
+# Catálogo com menos de k filmes: as posições que sobram ficam com peso 0
+def _top_k(similaridades: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    linhas, n = similaridades.shape
+    vizinhos = np.zeros((linhas, k), dtype=np.int32)
+    pesos = np.zeros((linhas, k), dtype=np.float32)
+    if k < n:
+        melhores = np.argpartition(-similaridades, k - 1, axis=1)[:, :k]
+    else:
+        melhores = np.broadcast_to(np.arange(n), (linhas, n))
+    vizinhos[:, : melhores.shape[1]] = melhores
+    pesos[:, : melhores.shape[1]] = np.maximum(np.take_along_axis(similaridades, melhores, axis=1), 0)
+    return vizinhos, pesos
+
+
+# Leva as similaridades novas dos filmes de `bloco` (s: bloco x filmes) para as listas dos outros filmes:
+# os pesos antigos desses filmes saem e cada lista fica com os k melhores entre os atuais e os do bloco
+def _mesclar(vizinhos: np.ndarray, pesos: np.ndarray, bloco: np.ndarray, s: np.ndarray) -> None:
+    antigos = np.isin(vizinhos, bloco) & (pesos > 0)
+    afetados = (s > 0).any(axis=0) | antigos.any(axis=1)
+    afetados[bloco] = False  # listas do próprio bloco já foram recalculadas
+    linhas = np.flatnonzero(afetados)
+    if not len(linhas):
+        return
+    k = vizinhos.shape[1]
+    candidatos = np.concatenate([vizinhos[linhas], np.broadcast_to(bloco, (len(linhas), len(bloco)))], axis=1)
+    valores = np.concatenate([np.where(antigos[linhas], 0, pesos[linhas]), s[:, linhas].T], axis=1)
+    melhores = np.argpartition(-valores, k - 1, axis=1)[:, :k]
+    vizinhos[linhas] = np.take_along_axis(candidatos, melhores, axis=1)
+    pesos[linhas] = np.maximum(np.take_along_axis(valores, melhores, axis=1), 0)
+
+
+class Modelo:
+    def __init__(self, filmes, usuarios, soma, contagem, notas, generos, pessoas, caracteristicas,
+                 vizinhos, pesos, popularidade, ultima_avaliacao, construido_em):
+        self.filmes = filmes  # ids ordenados; a posição é o índice do filme nas matrizes
+        self.usuarios = usuarios  # id do usuário de cada linha de `notas`
+        self.soma = soma  # soma e quantidade das notas de cada usuário (para centrar as novas)
+        self.contagem = contagem
+        self.notas = notas  # usuários x filmes, nota menos a média do usuário (csr)
+        self.generos = generos  # colunas de `caracteristicas`: gêneros e depois pessoas do elenco
+        self.pessoas = pessoas
+        self.caracteristicas = caracteristicas  # filmes x características, 0/1 (csr)
+        self.vizinhos = vizinhos  # filmes x RECOMENDACOES_VIZINHOS
+        self.pesos = pesos
+        self.popularidade = popularidade  # 0..1, log das interações
+        self.ultima_avaliacao = ultima_avaliacao  # maior Review.id já incorporado
+        self.construido_em = construido_em
+        self._linhas = {int(id): linha for linha, id in enumerate(usuarios)}
+        self._conteudo = _normalizar_linhas(caracteristicas)
+        self._conteudo_t = self._conteudo.T.tocsr()
+        self._colunas_caracteristicas = caracteristicas.tocsc()
+
+    def _similaridades(self, itens, itens_t, bloco: np.ndarray) -> np.ndarray:
+        peso_conteudo = settings.RECOMENDACOES_PESO_CONTEUDO
+        s = (itens[bloco] @ itens_t).toarray() * (1 - peso_conteudo)
+        s += (self._conteudo[bloco] @ self._conteudo_t).toarray() * peso_conteudo
+        s[np.arange(len(bloco)), bloco] = 0  # o próprio filme
+        return s
+
+    def _itens(self):
+        itens = _normalizar_linhas(self.notas.T.tocsr())
+        return itens, itens.T.tocsr()
+
+    def _calcular_vizinhos(self) -> None:
+        itens, itens_t = self._itens()
+        n = len(self.filmes)
+        k = settings.RECOMENDACOES_VIZINHOS
+        self.vizinhos = np.zeros((n, k), dtype=np.int32)
+        self.pesos = np.zeros((n, k), dtype=np.float32)
+        for inicio in range(0, n, settings.RECOMENDACOES_BLOCO):
+            bloco = np.arange(inicio, min(inicio + settings.RECOMENDACOES_BLOCO, n))
+            self.vizinhos[bloco], self.pesos[bloco] = _top_k(self._similaridades(itens, itens_t, bloco), k)
+
+    # Cópia com filmes que ainda não estavam no modelo (as posições dos demais mudam: os ids ficam ordenados).
+    # Gêneros e elenco dos filmes novos só entram na próxima reconstrução.
+    def _com_filmes(self, novos: np.ndarray) -> "Modelo":
+        filmes = np.union1d(self.filmes, novos)
+        posicoes = np.searchsorted(filmes, self.filmes)
+        notas = sparse.csr_matrix(
+            (self.notas.data, posicoes[self.notas.indices], self.notas.indptr), shape=(len(self.usuarios), len(filmes))
+        )
+        notas.sort_indices()
+        caracteristicas = self.caracteristicas.tocoo()
+        caracteristicas = sparse.csr_matrix(
+            (caracteristicas.data, (posicoes[caracteristicas.row], caracteristicas.col)),
+            shape=(len(filmes), caracteristicas.shape[1]),
+        )
+        vizinhos = np.zeros((len(filmes), self.vizinhos.shape[1]), dtype=np.int32)
+        pesos = np.zeros((len(filmes), self.pesos.shape[1]), dtype=np.float32)
+        vizinhos[posicoes] = posicoes[self.vizinhos]
+        pesos[posicoes] = self.pesos
+        return Modelo(
+            filmes, self.usuarios, self.soma, self.contagem, notas, self.generos, self.pessoas, caracteristicas,
+            vizinhos, pesos, _popularidade(notas), self.ultima_avaliacao, self.construido_em,
+        )
+
+    # Incorpora avaliações novas (linhas id, user_id, movie_id, rating) e devolve um modelo novo: o atual
+    # continua atendendo consultas enquanto isso. Refaz os vizinhos dos filmes avaliados e propaga a nova
+    # similaridade para as listas dos demais. As notas antigas do usuário não são recentradas (só na reconstrução).
+    def aplicar(self, novas: np.ndarray) -> "Modelo":
+        if not len(novas):
+            return self
+        novos = np.setdiff1d(novas[:, 2].astype(np.int64), self.filmes)
+        if len(novos):
+            return self._com_filmes(novos).aplicar(novas)
+        filmes = _indices(self.filmes, novas[:, 2])[0]
+        ultima = int(novas[:, 0].max())
+
+        usuarios = list(self.usuarios)
+        linhas_usuarios = dict(self._linhas)
+        for id in novas[:, 1].astype(np.int64):
+            if int(id) not in linhas_usuarios:
+                linhas_usuarios[int(id)] = len(usuarios)
+                usuarios.append(int(id))
+        linhas = np.array([linhas_usuarios[int(id)] for id in novas[:, 1]], dtype=np.int64)
+        n_usuarios = len(usuarios)
+
+        soma = np.zeros(n_usuarios)
+        contagem = np.zeros(n_usuarios)
+        soma[: len(self.soma)] = self.soma
+        contagem[: len(self.contagem)] = self.contagem
+        np.add.at(soma, linhas, novas[:, 3])
+        np.add.at(contagem, linhas, 1)
+
+        # Mesma dupla usuário/filme repetida no lote: vale a avaliação mais recente
+        chaves = linhas * len(self.filmes) + filmes
+        _, ultimas = np.unique(chaves[::-1], return_index=True)
+        ultimas = len(chaves) - 1 - ultimas
+        valores = novas[ultimas, 3] - _media_usuario(soma, contagem)[linhas[ultimas]]
+        formato = (n_usuarios, len(self.filmes))
+        delta = sparse.csr_matrix((valores.astype(np.float32), (linhas[ultimas], filmes[ultimas])), shape=formato)
+        padrao = delta.copy()
+        padrao.data[:] = 1
+        notas = self.notas.copy()
+        notas.resize(formato)
+        notas = sparse.csr_matrix(notas - notas.multiply(padrao) + delta)
+
+        modelo = Modelo(
+            self.filmes, np.array(usuarios, dtype=np.int64), soma, contagem, notas, self.generos, self.pessoas,
+            self.caracteristicas, self.vizinhos.copy(), self.pesos.copy(), _popularidade(notas), ultima, self.construido_em,
+        )
+        itens, itens_t = modelo._itens()
+        k = modelo.vizinhos.shape[1]
+        tocados = np.unique(filmes[ultimas])
+        for inicio in range(0, len(tocados), settings.RECOMENDACOES_BLOCO):
+            bloco = tocados[inicio: inicio + settings.RECOMENDACOES_BLOCO]
+            s = modelo._similaridades(itens, itens_t, bloco)
+            modelo.vizinhos[bloco], modelo.pesos[bloco] = _top_k(s, k)
+            _mesclar(modelo.vizinhos, modelo.pesos, bloco, s)
+        return modelo
+
+    # `historico`: (movie_id, peso) do que o usuário avaliou/assistiu; `excluir`: ids que não podem voltar.
+    # Retorna [(movie_id, pontuação)] em ordem decrescente.
+    def recomendar(self, historico, generos, pessoas, excluir, limite: int) -> list[tuple[int, float]]:
+        n = len(self.filmes)
+        if not n:
+            return []
+        pontuacao = np.zeros(n, dtype=np.float32)
+
+        if historico:
+            ids, valores = zip(*historico)
+            filmes, conhecidos = _indices(self.filmes, ids)
+            filmes, valores = filmes[conhecidos], np.asarray(valores, dtype=np.float32)[conhecidos]
+            colaborativa = np.bincount(
+                self.vizinhos[filmes].ravel(), (self.pesos[filmes] * valores[:, None]).ravel(), minlength=n
+            )
+            maximo = colaborativa.max()
+            if maximo > 0:
+                pontuacao += colaborativa / maximo
+
+        colunas = []
+        if generos:
+            posicoes, existem = _indices(self.generos, generos)
+            colunas += list(posicoes[existem])
+        if pessoas:
+            posicoes, existem = _indices(self.pessoas, pessoas)
+            colunas += list(posicoes[existem] + len(self.generos))
+        if colunas:
+            favoritos = np.asarray(self._colunas_caracteristicas[:, colunas].sum(axis=1)).ravel()
+            favoritos *= 0.5 + self.popularidade  # entre os filmes dos favoritos, os mais vistos primeiro
+            pontuacao += settings.RECOMENDACOES_PESO_FAVORITOS * favoritos / favoritos.max()
+
+        pontuacao += settings.RECOMENDACOES_PESO_POPULARIDADE * self.popularidade  # desempate e usuário sem histórico
+        if excluir:
+            filmes, conhecidos = _indices(self.filmes, list(excluir))
+            pontuacao[filmes[conhecidos]] = -np.inf
+
+        limite = min(limite, n)
+        melhores = np.argpartition(-pontuacao, limite - 1)[:limite]
+        melhores = melhores[np.argsort(-pontuacao[melhores], kind="stable")]
+        return [(int(self.filmes[i]), float(pontuacao[i])) for i in melhores if np.isfinite(pontuacao[i])]
+
+    def salvar(self, caminho: str) -> None:
+        temporario = f"{caminho}.tmp.npz"
+        np.savez(
+            temporario, filmes=self.filmes, usuarios=self.usuarios, soma=self.soma, contagem=self.contagem,
+            notas_dados=self.notas.data, notas_indices=self.notas.indices, notas_ponteiros=self.notas.indptr,
+            generos=self.generos, pessoas=self.pessoas, caracteristicas_indices=self.caracteristicas.indices,
+            caracteristicas_ponteiros=self.caracteristicas.indptr, vizinhos=self.vizinhos, pesos=self.pesos,
+            popularidade=self.popularidade, ultima_avaliacao=self.ultima_avaliacao, construido_em=self.construido_em,
+        )
+        os.replace(temporario, caminho)  # quem carrega o arquivo nunca vê um modelo pela metade
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "Modelo":
+        with np.load(caminho) as arquivo:
+            n_usuarios, n_filmes = len(arquivo["usuarios"]), len(arquivo["filmes"])
+            notas = sparse.csr_matrix(
+                (arquivo["notas_dados"], arquivo["notas_indices"], arquivo["notas_ponteiros"]), shape=(n_usuarios, n_filmes)
+            )
+            indices = arquivo["caracteristicas_indices"]
+            caracteristicas = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.float32), indices, arquivo["caracteristicas_ponteiros"]),
+                shape=(n_filmes, len(arquivo["generos"]) + len(arquivo["pessoas"])),
+            )
+            return cls(
+                arquivo["filmes"], arquivo["usuarios"], arquivo["soma"], arquivo["contagem"], notas,
+                arquivo["generos"], arquivo["pessoas"], caracteristicas, arquivo["vizinhos"], arquivo["pesos"],
+                arquivo["popularidade"], int(arquivo["ultima_avaliacao"]), float(arquivo["construido_em"]),
+            )
+
+
+# Reconstrução completa a partir do banco (engine síncrona; roda numa thread ou no manage.py)
+def construir(engine: Engine) -> Modelo:
+    with engine.connect() as conexao:
+        filmes = _ler(conexao, select(Movie.id).order_by(Movie.id))[:, 0].astype(np.int64)
+        avaliacoes = _ler(
+            conexao, select(Review.id, Review.user_id, Review.movie_id, Review.rating).where(Review.rating.isnot(None))
+        )
+        assistidos = _ler(conexao, select(Watchlist.user_id, Watchlist.movie_id).where(Watchlist.watched.is_(True)))
+        generos_filmes = _ler(conexao, select(MovieGenre.movie_id, MovieGenre.genre_id))
+        elenco = _ler(
+            conexao, select(MovieCast.movie_id, MovieCast.person_id).where(MovieCast.cast_order < settings.RECOMENDACOES_ELENCO)
+        )
+
+    n_filmes = len(filmes)
+    filmes_avaliados, conhecidos = _indices(filmes, avaliacoes[:, 2])
+    avaliacoes, filmes_avaliados = avaliacoes[conhecidos], filmes_avaliados[conhecidos]
+    filmes_assistidos, conhecidos = _indices(filmes, assistidos[:, 1])
+    assistidos, filmes_assistidos = assistidos[conhecidos], filmes_assistidos[conhecidos]
+
+    usuarios = np.unique(np.concatenate([avaliacoes[:, 1], assistidos[:, 0]]).astype(np.int64))
+    formato = (len(usuarios), n_filmes)
+    linhas = np.searchsorted(usuarios, avaliacoes[:, 1].astype(np.int64))
+    notas_brutas = avaliacoes[:, 3]
+    soma = np.bincount(linhas, notas_brutas, minlength=len(usuarios))
+    contagem = np.bincount(linhas, minlength=len(usuarios)).astype(np.float64)
+
+    # Mais de uma avaliação do mesmo filme pelo mesmo usuário: vale a média delas
+    somas = sparse.csr_matrix((notas_brutas, (linhas, filmes_avaliados)), shape=formato)
+    quantidades = sparse.csr_matrix((np.ones(len(linhas)), (linhas, filmes_avaliados)), shape=formato)
+    linha_de_cada = np.repeat(np.arange(len(usuarios)), np.diff(somas.indptr))
+    notas = somas.astype(np.float32)
+    notas.data = (somas.data / quantidades.data - _media_usuario(soma, contagem)[linha_de_cada]).astype(np.float32)
+
+    # Filme marcado como assistido e não avaliado conta como uma nota positiva fixa
+    implicitas = sparse.csr_matrix(
+        (np.full(len(assistidos), settings.RECOMENDACOES_PESO_ASSISTIDO, dtype=np.float32),
+         (np.searchsorted(usuarios, assistidos[:, 0].astype(np.int64)), filmes_assistidos)),
+        shape=formato,
+    )
+    implicitas.data[:] = settings.RECOMENDACOES_PESO_ASSISTIDO  # duplicatas somadas
+    avaliados = notas.copy()
+    avaliados.data[:] = 1
+    notas = sparse.csr_matrix(notas + implicitas - implicitas.multiply(avaliados))
+
+    generos = np.unique(generos_filmes[:, 1]).astype(np.int64)
+    pessoas = np.unique(elenco[:, 1]).astype(np.int64)
+    linhas_caracteristicas = np.concatenate([_indices(filmes, generos_filmes[:, 0])[0], _indices(filmes, elenco[:, 0])[0]])
+    colunas_caracteristicas = np.concatenate([
+        np.searchsorted(generos, generos_filmes[:, 1].astype(np.int64)),
+        np.searchsorted(pessoas, elenco[:, 1].astype(np.int64)) + len(generos),
+    ])
+    caracteristicas = sparse.csr_matrix(
+        (np.ones(len(linhas_caracteristicas), dtype=np.float32), (linhas_caracteristicas, colunas_caracteristicas)),
+        shape=(n_filmes, len(generos) + len(pessoas)),
+    )
+    caracteristicas.data[:] = 1
+
+    modelo = Modelo(
+        filmes, usuarios, soma, contagem, notas, generos, pessoas, caracteristicas, None, None, _popularidade(notas),
+        int(avaliacoes[:, 0].max()) if len(avaliacoes) else 0, time.time(),
+    )
+    modelo._calcular_vizinhos()
+    return modelo
+
+
+_modelo: Modelo | None = None
+
+
+def modelo_atual() -> Modelo | None:
+    return _modelo
+
+
+# Histórico e favoritos do usuário numa consulta só; None se o modelo ainda não foi carregado
+async def recomendar(db: AsyncSession, user_id: int, limite: int) -> list[tuple[int, float]] | None:
+    modelo = _modelo
+    if modelo is None:
+        return None
+    consulta = union_all(
+        select(literal("avaliacao"), Review.movie_id, Review.rating)
+        .where(Review.user_id == user_id, Review.rating.isnot(None)),
+        select(literal("assistido"), Watchlist.movie_id, literal(0)).where(Watchlist.user_id == user_id, Watchlist.watched.is_(True)),
+        select(literal("genero"), UserFavoriteGenre.genre_id, literal(0)).where(UserFavoriteGenre.user_id == user_id),
+        select(literal("pessoa"), UserFavoritePerson.person_id, literal(0)).where(UserFavoritePerson.user_id == user_id),
+    )
+    notas, assistidos, generos, pessoas = {}, set(), [], []
+    for tipo, id, nota in await db.execute(consulta):
+        if tipo == "avaliacao":
+            notas.setdefault(id, []).append(nota)
+        elif tipo == "assistido":
+            assistidos.add(id)
+        elif tipo == "genero":
+            generos.append(id)
+        else:
+            pessoas.append(id)
+
+    todas = [nota for lista in notas.values() for nota in lista]
+    media = _media_usuario(sum(todas), len(todas))
+    historico = [(id, sum(lista) / len(lista) - media) for id, lista in notas.items()]
+    historico += [(id, settings.RECOMENDACOES_PESO_ASSISTIDO) for id in assistidos - notas.keys()]
+    return modelo.recomendar(historico, generos, pessoas, notas.keys() | assistidos, limite)
+
+
+async def atualizar() -> int:
+    global _modelo
+    modelo = _modelo
+    async with async_engine.connect() as conexao:
+        novas = (await conexao.execute(
+            select(Review.id, Review.user_id, Review.movie_id, Review.rating)
+            .where(Review.id > modelo.ultima_avaliacao, Review.rating.isnot(None))
+            .order_by(Review.id)
+            .limit(settings.RECOMENDACOES_LOTE)
+        )).all()
+    if novas:
+        _modelo = await asyncio.to_thread(modelo.aplicar, np.array(novas, dtype=np.float64))
+    return len(novas)
+
+
+def _construido_em(caminho: str) -> float:
+    with np.load(caminho) as arquivo:  # lê só este campo do .npz
+        return float(arquivo["construido_em"])
+
+
+# Com RECOMENDACOES_ARQUIVO a API só carrega o modelo gerado por `python manage.py recomendacoes` (se for mais
+# novo que o atual) e nunca reconstrói: cada worker reconstruindo seria uma leitura completa do banco por processo.
+# Sem o arquivo, reconstrói a partir do banco.
+def _recarregar(atual: Modelo | None) -> Modelo:
+    caminho = settings.RECOMENDACOES_ARQUIVO
+    if caminho:
+        if os.path.exists(caminho) and (atual is None or _construido_em(caminho) > atual.construido_em):
+            return Modelo.carregar(caminho)
+        if atual is None:
+            raise FileNotFoundError(f"{caminho} não existe (rode python manage.py recomendacoes)")
+        logger.warning("%s não foi regerado em RECOMENDACOES_RECONSTRUCAO; mantendo o modelo atual", caminho)
+        return atual
+    inicio = time.perf_counter()
+    modelo = construir(engine)
+    logger.info("Modelo de recomendações reconstruído em %.1fs (%d filmes)", time.perf_counter() - inicio, len(modelo.filmes))
+    return modelo
+
+
+# Tarefa de segundo plano da API: carrega/constrói o modelo e incorpora as avaliações novas a cada
+# RECOMENDACOES_INTERVALO. Avaliações gravadas com id menor que o último já lido (transações concorrentes
+# que terminaram depois) ficam para a próxima reconstrução.
+async def laco_recomendacoes():
+    global _modelo
+    while True:
+        try:
+            if _modelo is None or time.time() - _modelo.construido_em > settings.RECOMENDACOES_RECONSTRUCAO:
+                _modelo = await asyncio.to_thread(_recarregar, _modelo)
+            while await atualizar() == settings.RECOMENDACOES_LOTE:
+                pass
+        except Exception:
+            logger.exception("Falha ao atualizar o modelo de recomendações")
+        await asyncio.sleep(settings.RECOMENDACOES_INTERVALO)
+
+
+class _ColetorModelo:
+    def collect(self):
+        modelo = _modelo
+        if modelo is None:
+            return
+        yield GaugeMetricFamily(
+            "cinebase_recomendacoes_idade_segundos", "Tempo desde a última reconstrução do modelo de recomendações",
+            value=time.time() - modelo.construido_em,
+        )
+        tamanho = GaugeMetricFamily(
+            "cinebase_recomendacoes_modelo", "Tamanho do modelo de recomendações", labels=["dimensao"]
+        )
+        tamanho.add_metric(["filmes"], len(modelo.filmes))
+        tamanho.add_metric(["usuarios"], len(modelo.usuarios))
+        tamanho.add_metric(["notas"], modelo.notas.nnz)
+        yield tamanho
+
+
+registro.register(_ColetorModelo())
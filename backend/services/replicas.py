@@ -0,0 +1,111 @@
+# Verificações de saúde das réplicas de leitura (database.replicas) e métricas do roteamento entre elas.
+# Uma réplica que não responde, ou que está atrasada mais que DB_REPLICA_ATRASO_MAX, sai do rodízio até a
+# próxima verificação bem-sucedida; sem réplicas saudáveis as leituras vão para o primário.
+import asyncio
+import logging
+import math
+
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import text
+from starlette.datastructures import MutableHeaders
+
+from core.config import settings
+from database import CABECALHO_ESCRITA, COOKIE_ESCRITA, Replica, marcador_escrita, replicas, roteamento
+from services.metricas import registro
+
+logger = logging.getLogger(__name__)
+
+# Atraso de replicação: zero se tudo o que chegou já foi aplicado (primário ocioso não conta como atraso);
+# NULL -> 0 num servidor que não é réplica
+_ATRASO_POSTGRES = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+async def _medir_atraso(replica: Replica) -> float:
+    async with replica.engine.connect() as conexao:
+        if conexao.dialect.name == "postgresql":
+            return float(await conexao.scalar(_ATRASO_POSTGRES) or 0)
+        await conexao.execute(text("SELECT 1"))
+        return 0.0
+
+
+async def verificar(replica: Replica):
+    try:
+        replica.atraso = await asyncio.wait_for(_medir_atraso(replica), settings.DB_REPLICA_TIMEOUT)
+        saudavel = replica.atraso <= settings.DB_REPLICA_ATRASO_MAX
+        motivo = f"atraso de {replica.atraso:.1f}s"
+    except Exception as e:
+        replica.atraso = None
+        saudavel = False
+        motivo = repr(e)
+    if saudavel != replica.saudavel:
+        if saudavel:
+            logger.info("Réplica %s de volta ao rodízio", replica.nome)
+        else:
+            logger.warning("Réplica %s fora do rodízio: %s", replica.nome, motivo)
+    replica.saudavel = saudavel
+
+
+async def laco_replicas():
+    while True:
+        await asyncio.gather(*(verificar(replica) for replica in replicas))
+        await asyncio.sleep(settings.DB_REPLICA_VERIFICACAO)
+
+
+async def fechar():
+    for replica in replicas:
+        await replica.engine.dispose()
+
+
+class _ColetorReplicas:
+    def collect(self):
+        decisoes = CounterMetricFamily(
+            "cinebase_db_roteamento", "Sessões de leitura por destino e motivo (e escritas promovidas ao primário)",
+            labels=["destino", "motivo"],
+        )
+        for (destino, motivo), total in list(roteamento.items()):
+            decisoes.add_metric([destino, motivo], total)
+        yield decisoes
+        if not replicas:
+            return
+        saudavel = GaugeMetricFamily("cinebase_db_replica_saudavel", "Réplica no rodízio de leituras", labels=["replica"])
+        atraso = GaugeMetricFamily("cinebase_db_replica_atraso_segundos", "Atraso de replicação medido", labels=["replica"])
+        for replica in replicas:
+            saudavel.add_metric([replica.nome], int(replica.saudavel))
+            if replica.atraso is not None:
+                atraso.add_metric([replica.nome], replica.atraso)
+        yield saudavel
+        yield atraso
+
+
+registro.register(_ColetorReplicas())
+
+
+# Respostas de requisições que gravaram (request.state.escrita_em, ver database.marcar_escrita) levam o marcador
+# assinado da escrita; as leituras seguintes do cliente que o devolver vão ao primário, em qualquer processo
+class MiddlewareEscritas:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                momento = scope.get("state", {}).get("escrita_em")
+                if momento is not None:
+                    marcador = marcador_escrita(momento)
+                    headers = MutableHeaders(scope=mensagem)
+                    headers[CABECALHO_ESCRITA] = marcador
+                    headers.append(
+                        "Set-Cookie",
+                        f"{COOKIE_ESCRITA}={marcador}; Max-Age={math.ceil(settings.DB_LER_DO_PRIMARIO_APOS_ESCRITA)}; "
+                        "Path=/; HttpOnly; SameSite=Lax",
+                    )
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
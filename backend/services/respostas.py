@@ -0,0 +1,152 @@
+import hashlib
+from typing import Any
+
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from core.config import settings
+from models import models
+from services import compressao, metricas
+from services.cache import CacheLRU
+
+
+# Corpos JSON já serializados das respostas mais quentes (detalhe de filme, em cartaz).
+# Um hit devolve os bytes direto, sem ORM, sem validação do Pydantic e sem serializar de novo.
+_cache = CacheLRU(max_itens=settings.RESPOSTAS_CACHE_MAX_ITENS, max_bytes=settings.RESPOSTAS_CACHE_MAX_BYTES)
+metricas.registrar_cache("respostas", _cache)
+
+
+# Corpo serializado com o ETag e as versões comprimidas (cada codificação é comprimida uma vez só)
+class Corpo:
+    __slots__ = ("conteudo", "etag", "variantes")
+
+    def __init__(self, conteudo: bytes, etag: str | None = None):
+        self.conteudo = conteudo
+        self.etag = etag or etag_conteudo(conteudo)
+        self.variantes = {}
+
+    def codificado(self, codificacao: str | None) -> bytes | None:
+        if codificacao is None or len(self.conteudo) < settings.COMPRESSAO_TAMANHO_MINIMO:
+            return None
+        if codificacao not in self.variantes:
+            self.variantes[codificacao] = compressao.comprimir(codificacao, self.conteudo)
+        return self.variantes[codificacao]
+
+
+def etag_conteudo(conteudo: bytes) -> str:
+    return f'"{hashlib.blake2b(conteudo, digest_size=16).hexdigest()}"'
+
+
+# ETag a partir da versão dos dados (ex.: contagem de avaliações), calculado sem montar o corpo
+def etag_versao(*partes) -> str:
+    return f'"v-{hashlib.blake2b(repr(partes).encode(), digest_size=16).hexdigest()}"'
+
+
+def _corresponde(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Comparação fraca (RFC 9110): ignora W/ e o sufixo de codificação de compressao.etag_codificado
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip().removeprefix("W/")
+        for codificacao in compressao.CODIFICACOES:
+            candidato = candidato.replace(f'-{codificacao}"', '"')
+        if candidato == etag:
+            return True
+    return False
+
+
+def _cabecalhos(etag: str, cache_control: str, vary: str | None) -> dict:
+    return {"ETag": etag, "Cache-Control": cache_control, "Vary": ", ".join(filter(None, ("Accept-Encoding", vary)))}
+
+
+# 304 se o cliente já tem essa versão; None se o corpo precisa ser enviado
+def nao_modificado(request: Request, etag: str, cache_control: str, vary: str | None = None) -> Response | None:
+    if _corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=_cabecalhos(etag, cache_control, vary))
+    return None
+
+
+# Resposta com ETag, Cache-Control/Vary da rota e a codificação negociada com o cliente
+def responder(request: Request, corpo: Corpo, cache_control: str, vary: str | None = None) -> Response:
+    resposta = nao_modificado(request, corpo.etag, cache_control, vary)
+    if resposta is not None:
+        return resposta
+    cabecalhos = _cabecalhos(corpo.etag, cache_control, vary)
+    codificacao = compressao.escolher_codificacao(request.headers.get("accept-encoding"))
+    conteudo = corpo.codificado(codificacao)
+    if conteudo is None:
+        conteudo = corpo.conteudo
+    else:
+        cabecalhos["Content-Encoding"] = codificacao
+        cabecalhos["ETag"] = compressao.etag_codificado(corpo.etag, codificacao)
+    return Response(content=conteudo, media_type="application/json", headers=cabecalhos)
+
+
+# `origem`: objeto de onde a resposta foi montada; o hit só vale enquanto for o mesmo objeto
+# (usado com os dicionários do cache do TMDB: quando o TMDB é revalidado, os bytes são refeitos)
+def obter(chave: str, origem: Any = None) -> Corpo | None:
+    if not settings.RESPOSTAS_CACHE_HABILITADO:
+        return None
+    valor, _ = _cache.get(chave)
+    if valor is None:
+        return None
+    origem_cacheada, conteudo = valor
+    if origem is not None and origem_cacheada is not origem:
+        return None
+    return conteudo
+
+
+# Modelos Pydantic saem direto do pydantic-core (o mesmo caminho que o FastAPI usa para rotas com
+# response_model); dicionários soltos vão pelo orjson em vez de jsonable_encoder + json.dumps
+def serializar(modelo: BaseModel | Any) -> bytes:
+    if isinstance(modelo, BaseModel):
+        return modelo.model_dump_json().encode()
+    return orjson.dumps(modelo, option=orjson.OPT_NON_STR_KEYS)
+
+
+# Serializa, guarda e devolve o corpo. O tamanho contabilizado é o do JSON; as versões comprimidas
+# guardadas junto são bem menores e ficam de fora da conta.
+def guardar(chave: str, modelo: BaseModel | Any, ttl: float | None = None, origem: Any = None) -> Corpo:
+    corpo = Corpo(serializar(modelo))
+    if settings.RESPOSTAS_CACHE_HABILITADO:
+        _cache.set(chave, (origem, corpo), ttl or settings.RESPOSTAS_CACHE_TTL, len(corpo.conteudo))
+    return corpo
+
+
+def chave_filme(movie_id: int) -> str:
+    return f"filme:{movie_id}"
+
+
+def invalidar_filmes(ids) -> None:
+    for movie_id in ids:
+        _cache.invalidar(chave_filme(movie_id))
+
+
+def estatisticas() -> dict:
+    return _cache.estatisticas()
+
+
+# Quem altera filmes marca os ids em session.info["filmes_alterados"] (ver crud/movie.py); as entradas
+# só saem do cache depois do commit, para que uma leitura concorrente não guarde de novo o dado antigo.
+# Em vários workers cada processo tem o próprio cache: RESPOSTAS_CACHE_TTL limita a defasagem entre eles.
+@event.listens_for(Session, "after_commit")
+def _invalidar_depois_do_commit(session):
+    invalidar_filmes(session.info.pop("filmes_alterados", ()))
+
+
+@event.listens_for(models.Movie, "after_update")
+@event.listens_for(models.Movie, "after_delete")
+def _filme_alterado(mapper, connection, target):
+    sessao = object_session(target)
+    if sessao is not None:
+        sessao.info.setdefault("filmes_alterados", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_depois_do_rollback(session):
+    session.info.pop("filmes_alterados", None)
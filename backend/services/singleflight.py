@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado: Any = None
+        self.erro: BaseException | None = None
+
+
+# Coalescência de requisições concorrentes: para cada chave só existe uma execução em andamento,
+# e quem chega enquanto ela roda recebe o mesmo resultado (ou a mesma exceção).
+# `executar` atende rotas async; `executar_sync` atende rotas executadas no threadpool.
+class SingleFlight:
+    def __init__(self):
+        self._tarefas: dict[Hashable, asyncio.Task] = {}
+        self._chamadas: dict[Hashable, _Chamada] = {}
+        self._lock = threading.Lock()
+        self.execucoes = 0
+        self.coalescidas = 0
+
+    async def executar(self, chave: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        tarefa = self._tarefas.get(chave)
+        if tarefa is None:
+            # A execução roda numa task própria para não ser cancelada se o cliente líder desconectar
+            tarefa = asyncio.ensure_future(fn())
+            self._tarefas[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._tarefas.pop(chave, None))
+            self._contar(coalescida=False)
+        else:
+            self._contar(coalescida=True)
+        return await asyncio.shield(tarefa)
+
+    def executar_sync(self, chave: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            chamada = self._chamadas.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._chamadas[chave] = _Chamada()
+                self.execucoes += 1
+            else:
+                self.coalescidas += 1
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado
+
+        try:
+            chamada.resultado = fn()
+            return chamada.resultado
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._chamadas.pop(chave, None)
+            chamada.evento.set()
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            return {
+                "execucoes": self.execucoes,
+                "coalescidas": self.coalescidas,
+                "em_andamento": len(self._tarefas) + len(self._chamadas),
+            }
+
+    def _contar(self, coalescida: bool) -> None:
+        with self._lock:
+            if coalescida:
+                self.coalescidas += 1
+            else:
+                self.execucoes += 1
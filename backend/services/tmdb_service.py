@@ -1,71 +1,476 @@
-import requests
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlencode
+
+import httpx
 from fastapi import HTTPException
+from prometheus_client import Counter as Contador, Gauge, Histogram
 from core.config import settings
+from services import metricas
+from services.cache import CacheLRU
+from services.disjuntor import ABERTO, FECHADO, MEIO_ABERTO, Disjuntor
+from services.limitador import Limitador
 
+logger = logging.getLogger(__name__)
 
-# Retorna o objeto Json que foi solicitado           
-def fazer_requisicao(endpoint: str, params: dict = None):
+# Prioridade das chamadas na fila do limitador (menor = atendida antes)
+PRIORIDADE_INTERATIVA = 0  # requisições de usuários
+PRIORIDADE_SEGUNDO_PLANO = 1  # revalidação do cache (stale-while-revalidate)
+PRIORIDADE_INGESTAO = 2
+NOMES_PRIORIDADE = {PRIORIDADE_INTERATIVA: "interativa", PRIORIDADE_SEGUNDO_PLANO: "segundo_plano", PRIORIDADE_INGESTAO: "ingestao"}
 
-    if params is None:
-        params = {}
+_prioridade: ContextVar[int] = ContextVar("prioridade_tmdb", default=PRIORIDADE_INTERATIVA)
+
+# Cota de requisições ao TMDB compartilhada por todas as chamadas deste processo
+_limitador = Limitador(settings.TMDB_LIMITE_POR_SEGUNDO, settings.TMDB_LIMITE_RAJADA)
+
+FILA = Gauge(
+    "cinebase_tmdb_fila", "Chamadas ao TMDB aguardando a vez no limitador", ["prioridade"], registry=metricas.registro,
+)
+ESPERA = Histogram(
+    "cinebase_tmdb_fila_espera_segundos", "Espera no limitador antes de cada chamada ao TMDB", ["prioridade"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30), registry=metricas.registro,
+)
+RETENTATIVAS = Contador(
+    "cinebase_tmdb_retentativas", "Chamadas ao TMDB repetidas após 429, 5xx ou erro de rede", ["motivo"],
+    registry=metricas.registro,
+)
+ESTRANGULAMENTOS = Contador(
+    "cinebase_tmdb_estrangulamentos", "Respostas 429 do TMDB (o limitador pausa todas as chamadas pelo Retry-After)",
+    registry=metricas.registro,
+)
+ESTADO_CIRCUITO = Gauge(
+    "cinebase_tmdb_circuito", "Estado do circuit breaker do TMDB (1 no estado atual)", ["estado"],
+    registry=metricas.registro,
+)
+TRANSICOES_CIRCUITO = Contador(
+    "cinebase_tmdb_circuito_transicoes", "Mudanças de estado do circuit breaker do TMDB", ["de", "para"],
+    registry=metricas.registro,
+)
+BLOQUEADAS = Contador(
+    "cinebase_tmdb_bloqueadas", "Chamadas ao TMDB recusadas na hora com o circuito aberto", registry=metricas.registro,
+)
+
+
+def _exportar_estado(atual: str) -> None:
+    for estado in (FECHADO, MEIO_ABERTO, ABERTO):
+        ESTADO_CIRCUITO.labels(estado).set(1 if estado == atual else 0)
+
+
+def _circuito_mudou(anterior: str, novo: str) -> None:
+    TRANSICOES_CIRCUITO.labels(anterior, novo).inc()
+    _exportar_estado(novo)
+
+
+# Falhas seguidas (rede, timeout, 5xx) abrem o circuito; 429 é cota, não falha, e fica com o limitador
+_disjuntor = Disjuntor(
+    "tmdb", settings.TMDB_CIRCUITO_LIMIAR_FALHAS, settings.TMDB_CIRCUITO_TEMPO_ABERTO, ao_mudar=_circuito_mudou,
+)
+_exportar_estado(FECHADO)
 
-    headers = {"accept": "application/json"}
 
-    # Usando Bearer Token se configurado, senão a chave de API V3
+# Recusa imediata com o circuito aberto. Subclasse de erro de rede: quem chama trata como TMDB indisponível.
+class CircuitoAberto(httpx.TransportError):
+    pass
+
+
+# Marca no cache uma consulta sem resultado (404, busca vazia), guardada por TMDB_CACHE_TTL_NEGATIVO
+_AUSENTE = object()
+
+# Cliente HTTP compartilhado (keep-alive + pool de conexões), criado no lifespan da aplicação
+_cliente: httpx.AsyncClient | None = None
+
+# Cache das respostas do TMDB, chaveado por caminho + parâmetros (idioma/região inclusos)
+_cache = CacheLRU(
+    max_itens=settings.TMDB_CACHE_MAX_ITENS,
+    max_bytes=settings.TMDB_CACHE_MAX_BYTES,
+    janela_obsoleta=settings.TMDB_CACHE_JANELA_OBSOLETA,
+)
+_revalidacoes: dict[str, asyncio.Task] = {}
+metricas.registrar_cache("tmdb", _cache)
+
+
+def _http2_disponivel() -> bool:
+    if not settings.TMDB_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("TMDB_HTTP2 ativado, mas o pacote 'h2' não está instalado; usando HTTP/1.1")
+        return False
+    return True
+
+
+def _criar_cliente() -> httpx.AsyncClient:
+    headers = {"accept": "application/json"}
+    # Usando Bearer Token se configurado, senão a chave de API V3 (adicionada em cada requisição)
     if settings.USE_BEARER:
         headers["Authorization"] = f"Bearer {settings.BEARER_TOKEN}"
-    else:
+
+    return httpx.AsyncClient(
+        headers=headers,
+        http2=_http2_disponivel(),
+        timeout=httpx.Timeout(
+            settings.TMDB_READ_TIMEOUT,
+            connect=settings.TMDB_CONNECT_TIMEOUT,
+            pool=settings.TMDB_POOL_TIMEOUT,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.TMDB_POOL_SIZE,
+            max_keepalive_connections=settings.TMDB_POOL_SIZE,
+            keepalive_expiry=settings.TMDB_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+async def iniciar_cliente() -> None:
+    global _cliente
+    if _cliente is None:
+        _cliente = _criar_cliente()
+
+
+async def fechar_cliente() -> None:
+    global _cliente
+    for tarefa in list(_revalidacoes.values()):
+        tarefa.cancel()
+    _revalidacoes.clear()
+    if _cliente is not None:
+        await _cliente.aclose()
+        _cliente = None
+
+
+def obter_cliente() -> httpx.AsyncClient:
+    # Fora do lifespan (scripts, testes) o cliente é criado sob demanda
+    global _cliente
+    if _cliente is None:
+        _cliente = _criar_cliente()
+    return _cliente
+
+
+# Chamadas feitas dentro do bloco entram na fila do limitador com essa prioridade (inclusive as de tasks criadas nele)
+@contextmanager
+def prioridade(valor: int):
+    token = _prioridade.set(valor)
+    try:
+        yield
+    finally:
+        _prioridade.reset(token)
+
+
+# Segundos pedidos no Retry-After (número ou data HTTP), limitados a TMDB_RETRY_AFTER_MAX
+def _retry_after(resposta: httpx.Response) -> float | None:
+    valor = resposta.headers.get("retry-after")
+    if not valor:
+        return None
+    try:
+        segundos = float(valor)
+    except ValueError:
+        try:
+            segundos = (parsedate_to_datetime(valor) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(segundos, 0.0), settings.TMDB_RETRY_AFTER_MAX)
+
+
+# Backoff exponencial com jitter completo: sorteado entre 0 e base * 2^tentativa (até TMDB_BACKOFF_MAX)
+def _backoff(tentativa: int) -> float:
+    return random.uniform(0, min(settings.TMDB_BACKOFF_MAX, settings.TMDB_BACKOFF_BASE * 2 ** tentativa))
+
+
+async def _chamar(endpoint: str, params: dict) -> httpx.Response:
+    if not _disjuntor.permitir():
+        BLOQUEADAS.inc()
+        raise CircuitoAberto(f"Circuito do TMDB aberto; chamada a {endpoint} recusada")
+    saude = None  # resultado informado ao disjuntor: sucesso, falha ou neutro
+    try:
+        nome = NOMES_PRIORIDADE.get(_prioridade.get(), "interativa")
+        FILA.labels(nome).inc()
+        try:
+            ESPERA.labels(nome).observe(await _limitador.adquirir(_prioridade.get()))
+        finally:
+            FILA.labels(nome).dec()
+        inicio = time.perf_counter()
+        status = "erro"
+        try:
+            resposta = await obter_cliente().get(endpoint, params=params)
+            status = str(resposta.status_code)
+        except httpx.TransportError:
+            saude = _disjuntor.falha
+            raise
+        finally:
+            metricas.registrar_chamada_tmdb(endpoint, status, time.perf_counter() - inicio)
+        if resposta.status_code >= 500:
+            saude = _disjuntor.falha
+        elif resposta.status_code != 429:
+            saude = _disjuntor.sucesso
+        return resposta
+    finally:
+        (saude or _disjuntor.neutro)()
+
+
+# Passa pelo limitador e repete 429, 5xx e erros de rede até TMDB_TENTATIVAS vezes. A última resposta
+# (ou exceção) é devolvida a quem chamou.
+async def _get(endpoint: str, params: dict) -> httpx.Response:
+    if not settings.USE_BEARER:
         params["api_key"] = settings.TMDB_API_KEY_V3
+    for tentativa in range(settings.TMDB_TENTATIVAS):
+        ultima = tentativa == settings.TMDB_TENTATIVAS - 1
+        try:
+            resposta = await _chamar(endpoint, params)
+        except CircuitoAberto:
+            raise
+        except httpx.TransportError:
+            if ultima:
+                raise
+            RETENTATIVAS.labels("rede").inc()
+            await asyncio.sleep(_backoff(tentativa))
+            continue
+        if resposta.status_code != 429 and resposta.status_code < 500 or ultima:
+            return resposta
+
+        espera = _retry_after(resposta)
+        if resposta.status_code == 429:
+            ESTRANGULAMENTOS.inc()
+            RETENTATIVAS.labels("429").inc()
+            # A cota é do processo inteiro: todas as chamadas esperam, não só esta
+            _limitador.pausar(espera if espera is not None else _backoff(tentativa))
+        else:
+            RETENTATIVAS.labels("5xx").inc()
+        await asyncio.sleep(espera if espera is not None else _backoff(tentativa))
 
+
+# `indisponivel_como_erro`: 429/5xx/falha de rede que persistem após as retentativas (ou o circuito aberto)
+# viram HTTPException 503, e não None, que quem chama trata como "não encontrado".
+# `ausente`: valor devolvido num 404 (as funções com cache passam _AUSENTE para guardar a ausência)
+async def _requisitar_json(endpoint: str, params: dict, indisponivel_como_erro: bool = False,
+                           ausente=None) -> tuple[dict | None, int]:
     try:
-        resposta = requests.get(endpoint, params=params, headers=headers)
+        resposta = await _get(endpoint, params)
+        if resposta.status_code == 404:
+            return ausente, 0
         resposta.raise_for_status()  # Lança uma exceção para status de erro (4xx ou 5xx)
-        return resposta.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Erro na requisição para {endpoint}: {e}")
-        return None  # Retorna None em caso de erro, para ser tratado por quem chama
+        return resposta.json(), len(resposta.content)
+    except httpx.HTTPError as e:
+        if isinstance(e, CircuitoAberto):
+            logger.debug("%s", e)
+        else:
+            logger.warning("Erro na requisição para %s: %s", endpoint, e)
+        if indisponivel_como_erro and _indisponivel(e):
+            raise HTTPException(status_code=503, detail="TMDB indisponível no momento, tente novamente")
+        return None, 0  # Retorna None em caso de erro, para ser tratado por quem chama
+
+
+def _indisponivel(erro: httpx.HTTPError) -> bool:
+    if isinstance(erro, httpx.HTTPStatusError):
+        return erro.response.status_code == 429 or erro.response.status_code >= 500
+    return True
+
+
+# Retorna o objeto Json que foi solicitado
+async def fazer_requisicao(endpoint: str, params: dict = None):
+
+    if params is None:
+        params = {}
+
+    dados, _ = await _requisitar_json(endpoint, params)
+    return dados
+
+
+def _chave_cache(caminho: str, params: dict) -> str:
+    return f"{caminho}?{urlencode(sorted(params.items()))}"
+
+
+def _agendar_revalidacao(chave: str, ttl: float, carregar) -> None:
+    if chave in _revalidacoes:
+        return  # já existe uma atualização em andamento para essa chave
+
+    async def revalidar():
+        try:
+            with prioridade(PRIORIDADE_SEGUNDO_PLANO):
+                dados, tamanho = await carregar()
+            if dados is not None:
+                _guardar(chave, dados, ttl, tamanho)
+        except Exception as e:
+            logger.warning("Falha ao revalidar %s no cache: %s", chave, e)
+        finally:
+            _revalidacoes.pop(chave, None)
+
+    _revalidacoes[chave] = asyncio.create_task(revalidar())
+
+
+def _guardar(chave: str, dados, ttl: float, tamanho: int) -> None:
+    if dados is _AUSENTE:
+        _cache.set(chave, _AUSENTE, settings.TMDB_CACHE_TTL_NEGATIVO, 64)
+    else:
+        _cache.set(chave, dados, ttl, tamanho)
+
+
+# Serve do cache quando possível; entradas obsoletas são devolvidas e atualizadas em segundo plano.
+# `carregar` devolve (dados, tamanho); dados None não é guardado, _AUSENTE vira uma entrada negativa.
+async def _com_cache(caminho: str, params: dict, ttl: float, carregar):
+    chave = _chave_cache(caminho, params)
+    valor, obsoleto = _cache.get(chave)
+    if valor is _AUSENTE:
+        # A ausência não é servida obsoleta: vencido o TTL negativo, consulta o TMDB de novo
+        metricas.registrar_cache_tmdb("miss" if obsoleto else "negativo")
+        if not obsoleto:
+            return None
+        valor = None
+    else:
+        metricas.registrar_cache_tmdb("miss" if valor is None else "obsoleto" if obsoleto else "hit")
+    if valor is not None:
+        if obsoleto:
+            _agendar_revalidacao(chave, ttl, carregar)
+        return valor
+
+    dados, tamanho = await carregar()
+    if dados is not None:
+        _guardar(chave, dados, ttl, tamanho)
+    return None if dados is _AUSENTE else dados
+
+
+# Remove do cache todas as chaves que começam com o prefixo (ex.: "/movie/550?" ou "/movie/now_playing")
+def invalidar_cache(prefixo: str = "") -> int:
+    return _cache.invalidar_prefixo(prefixo)
+
+
+def estatisticas_cache() -> dict:
+    return _cache.estatisticas()
+
+
+def estado_circuito() -> dict:
+    return {"estado": _disjuntor.estado, "falhas_seguidas": _disjuntor.falhas}
+
+
+PARAMS_DETALHE = {
+    "language": "pt-BR",
+    "append_to_response": "credits,watch/providers"
+}
+
 
 # Função para buscar um filme específico por ID
-def buscar_filme_por_id(id_filme: int) -> dict:
-    endpoint = f"{settings.TMDB_URL}/movie/{id_filme}"
-    params = {
-        "language": "pt-BR",
-        "append_to_response": "credits,watch/providers"
-    }
-    return fazer_requisicao(endpoint, params)
+async def buscar_filme_por_id(id_filme: int) -> dict:
+    caminho = f"/movie/{id_filme}"
+    params = dict(PARAMS_DETALHE)
+    return await _com_cache(
+        caminho, params, settings.TMDB_CACHE_TTL_FILME,
+        lambda: _requisitar_json(
+            f"{settings.TMDB_URL}{caminho}", dict(params), indisponivel_como_erro=True, ausente=_AUSENTE,
+        ),
+    )
+
+
+# As funções abaixo não passam pelo cache: são usadas pela ingestão (services/ingestao.py), que percorre
+# o catálogo inteiro uma vez por ciclo e despejaria do cache as entradas realmente acessadas pelos usuários
+async def buscar_detalhes_sem_cache(id_filme: int) -> dict | None:
+    dados, _ = await _requisitar_json(f"{settings.TMDB_URL}/movie/{id_filme}", dict(PARAMS_DETALHE))
+    return dados
+
+
+# lista: "now_playing", "popular", "upcoming" ou "top_rated"
+async def buscar_lista(lista: str, pagina: int, regiao: str | None = None) -> dict | None:
+    params = {"page": pagina, "language": "pt-BR"}
+    if regiao:
+        params["region"] = regiao
+    dados, _ = await _requisitar_json(f"{settings.TMDB_URL}/movie/{lista}", params)
+    return dados
+
+
+# Ids de filmes alterados no TMDB entre as datas (janela máxima de 14 dias)
+async def buscar_alteracoes(inicio: date, fim: date, pagina: int) -> dict | None:
+    params = {"start_date": inicio.isoformat(), "end_date": fim.isoformat(), "page": pagina}
+    dados, _ = await _requisitar_json(f"{settings.TMDB_URL}/movie/changes", params)
+    return dados
 
 
 
 # Função para buscar filmes em cartaz
-def buscar_em_cartaz(pagina: int = 1, regiao: str = "BR") -> dict:
+async def buscar_em_cartaz(pagina: int = 1, regiao: str = "BR") -> dict:
 
-    endpoint = f"{settings.TMDB_URL}/movie/now_playing"
+    caminho = "/movie/now_playing"
     params = {
         "region": regiao,
         "page": pagina,
         "language": "pt-BR",
     }
-    resposta = fazer_requisicao(endpoint, params)
+    resposta = await _com_cache(
+        caminho, params, settings.TMDB_CACHE_TTL_EM_CARTAZ,
+        lambda: _requisitar_json(f"{settings.TMDB_URL}{caminho}", dict(params), indisponivel_como_erro=True),
+    )
     return resposta if resposta else {}
 
 
+# Todas as páginas de now_playing das regiões (até max_paginas cada), entregues como (região, página) na ordem
+# em que chegam, com no máximo `concorrencia` chamadas simultâneas e o mesmo cache de buscar_em_cartaz.
+# As primeiras páginas (que trazem o total) são buscadas antes do primeiro item: se todas falharem, o erro
+# sobe já na primeira iteração. Falhas nas demais páginas são registradas e puladas.
+async def paginas_em_cartaz(regioes: list[str], max_paginas: int, concorrencia: int):
+    semaforo = asyncio.Semaphore(concorrencia)
 
-def buscar_filme_por_nome(query: str):
-    url = f"{settings.TMDB_URL}/search/movie?query={query}&language=pt-BR&page=1"
+    async def pagina(regiao, numero):
+        async with semaforo:
+            return regiao, await buscar_em_cartaz(pagina=numero, regiao=regiao)
+
+    primeiras = await asyncio.gather(*(pagina(regiao, 1) for regiao in regioes), return_exceptions=True)
+    erros = [resultado for resultado in primeiras if isinstance(resultado, BaseException)]
+    if len(erros) == len(primeiras):
+        raise erros[0]
+
+    pendentes = [
+        asyncio.ensure_future(pagina(regiao, numero))
+        for regiao, dados in (p for p in primeiras if not isinstance(p, BaseException))
+        for numero in range(2, min(dados.get("total_pages") or 1, max_paginas) + 1)
+    ]
+    try:
+        for resultado in primeiras:
+            if isinstance(resultado, BaseException):
+                logger.warning("Falha na primeira página de now_playing: %s", resultado)
+            else:
+                yield resultado
+        for proxima in asyncio.as_completed(pendentes):
+            try:
+                yield await proxima
+            except HTTPException as e:
+                logger.warning("Página de now_playing ignorada: %s", e.detail)
+    finally:
+        for tarefa in pendentes:
+            tarefa.cancel()
 
-    headers = {
-        "accept": "application/json",
-        "Authorization": f"Bearer {settings.BEARER_TOKEN}"
-    }
 
-    response = requests.get(url, headers=headers)
 
+async def _requisitar_busca(endpoint: str, params: dict) -> tuple[dict | None, int]:
+    try:
+        response = await _get(endpoint, params)
+    except httpx.HTTPError as e:
+        logger.warning("Erro na requisição para %s: %s", endpoint, e)
+        raise HTTPException(status_code=503, detail="TMDB indisponível no momento, tente novamente")
+
+    if response.status_code == 429 or response.status_code >= 500:
+        raise HTTPException(status_code=503, detail="TMDB indisponível no momento, tente novamente")
     if response.status_code != 200:
         raise HTTPException(status_code=500, detail="Erro ao buscar dados no TMDB")
 
     dados = response.json()
+    # Buscas sem resultado ficam no cache negativo (TTL curto)
+    return (dados, len(response.content)) if dados.get("results") else (_AUSENTE, 0)
+
+
+async def buscar_filme_por_nome(query: str):
+    caminho = "/search/movie"
+    params = {"query": query, "language": "pt-BR", "page": 1}
+
+    dados = await _com_cache(
+        caminho, params, settings.TMDB_CACHE_TTL_BUSCA,
+        lambda: _requisitar_busca(f"{settings.TMDB_URL}{caminho}", dict(params)),
+    )
 
-    if not dados.get("results"):
+    if not dados:
         return None
 
     return dados["results"]  # pega o primeiro resultado da lista
@@ -0,0 +1,9 @@
+# Os testes importam a aplicação a partir de backend/ com um SQLite temporário, sem .env nem TMDB real
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.comum import configurar_ambiente  # noqa: E402
+
+configurar_ambiente(nome="testes")
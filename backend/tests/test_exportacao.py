@@ -0,0 +1,61 @@
+# Exportação (services/exportacao.py): filtro incremental de filmes e memória constante com 1M de linhas.
+# Rodar a partir de backend/: python -m pytest tests/test_exportacao.py
+# EXPORTACAO_TESTE_LINHAS muda o volume do teste de memória (padrão: 1 milhão de avaliações).
+import asyncio
+import io
+import os
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+from benchmarks import exportacao as bench
+from crud import movie as movie_crud
+from database import AsyncSessionLocal, engine
+from migracoes import migrar
+from models import models, schemas
+from services import exportacao
+
+LINHAS = int(os.environ.get("EXPORTACAO_TESTE_LINHAS", 1_000_000))
+TETO_MB = 64.0
+
+
+@pytest.fixture(scope="module")
+def banco():
+    migrar(engine)
+    bench.popular(LINHAS)
+    return os.environ["DATABASE_URL"]
+
+
+def _ids_exportados(desde: datetime | None) -> set[int]:
+    saida = io.BytesIO()
+    exportacao.exportar(engine, saida, "movies", "ndjson", desde)
+    return {orjson.loads(linha)["id"] for linha in saida.getvalue().splitlines()}
+
+
+# Filmes que só chegaram pela busca ou pelo "em cartaz" não têm movie_sync e também entram no incremental
+def test_incremental_inclui_filmes_sem_detalhes(banco):
+    with engine.begin() as conexao:
+        conexao.execute(models.Movie.__table__.insert(), [
+            {"id": 900_001, "title": "Antigo", "updated_at": datetime(2000, 1, 1)},
+        ])
+
+    async def gravar():
+        async with AsyncSessionLocal() as db:
+            await movie_crud.upsert_movies(db, [schemas.MovieCreate(id=900_002, title="Da busca")])
+
+    desde = datetime.utcnow() - timedelta(seconds=1)
+    asyncio.run(gravar())
+    assert _ids_exportados(desde) == {900_002}
+    assert {900_001, 900_002} <= _ids_exportados(None)
+
+
+@pytest.mark.parametrize("formato", exportacao.FORMATOS)
+def test_memoria_limitada(banco, formato):
+    try:
+        exportacao.verificar_formato(formato)
+    except ValueError as e:
+        pytest.skip(str(e))
+    resultado = bench.medir(banco, formato, compactar=False)
+    assert resultado["linhas"] == LINHAS
+    assert resultado["pico_acima_da_base_mb"] <= TETO_MB, resultado
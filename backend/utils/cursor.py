@@ -0,0 +1,22 @@
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+# Cursores opacos para paginação por keyset: os valores da última linha da página em JSON/base64
+def codificar_cursor(*valores) -> str:
+    dados = json.dumps(valores, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(dados).decode().rstrip("=")
+
+
+# Cada conversor é aplicado ao valor na mesma posição (ex.: decodificar_cursor(c, float, int))
+def decodificar_cursor(cursor: str, *conversores) -> tuple:
+    try:
+        dados = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(dados)
+        if not isinstance(valores, list) or len(valores) != len(conversores):
+            raise ValueError(cursor)
+        return tuple(converter(valor) for converter, valor in zip(conversores, valores))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
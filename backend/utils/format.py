@@ -1,3 +1,5 @@
+from datetime import date
+
 def formatar_duracao(minutos: int) -> str:
     if not minutos:
         return "N/A"
@@ -14,12 +16,79 @@ def formatar_dinheiro(valor: int) -> str:
         return f"${valor/1_000_000:.1f}M"
     return f"${valor:,}"
 
+# Textos do TMDB cortados no tamanho da coluna: no PostgreSQL um valor longo demais derruba o INSERT em lote inteiro
+def _cortar(texto, tamanho: int):
+    return texto[:tamanho] if texto else texto
+
 def formatar_dados_tmdb(dados):
     return {
         "id": dados.get("id"),
-        "title": dados.get("title"),
+        "title": _cortar(dados.get("title"), 200),
         "overview": dados.get("overview"),
         "poster_url": dados.get("poster_path"),
         "release_date": dados.get("release_date"),
         "budget": dados.get("budget")
-    }
\ No newline at end of file
+    }
+
+def _data(texto):
+    try:
+        return date.fromisoformat(texto) if texto else None
+    except ValueError:
+        return None
+
+TIPOS_PROVEDOR = ("flatrate", "free", "ads", "rent", "buy")
+
+# Detalhe do TMDB (/movie/{id} com append_to_response=credits,watch/providers) normalizado nas linhas das tabelas locais
+def formatar_detalhes_tmdb(dados, max_elenco: int = 20, regioes=("BR",), cargos=("Director",)):
+    creditos = dados.get("credits") or {}
+    elenco = []
+    vistos = set()
+    for ator in sorted(creditos.get("cast", []), key=lambda a: a.get("order", 0)):
+        if ator["id"] in vistos:
+            continue  # mesma pessoa com dois personagens: fica o primeiro (chave (filme, pessoa))
+        vistos.add(ator["id"])
+        elenco.append({
+            "id": ator["id"],
+            "name": _cortar(ator.get("name") or "", 100),
+            "character": _cortar(ator.get("character") or "", 100),
+            "order": ator.get("order"),
+        })
+        if len(elenco) >= max_elenco:
+            break
+
+    equipe = {}
+    for membro in creditos.get("crew", []):
+        if membro.get("job") in cargos:
+            equipe[(membro["id"], membro["job"])] = {
+                "id": membro["id"], "name": _cortar(membro.get("name") or "", 100), "job": membro["job"][:50],
+            }
+
+    provedores = []
+    por_regiao = (dados.get("watch/providers") or {}).get("results", {})
+    for regiao in regioes:
+        for tipo in TIPOS_PROVEDOR:
+            for provedor in por_regiao.get(regiao, {}).get(tipo, []):
+                provedores.append({
+                    "id": provedor["provider_id"],
+                    "name": _cortar(provedor.get("provider_name") or "", 100),
+                    "logo_path": provedor.get("logo_path"),
+                    "region": regiao,
+                    "kind": tipo,
+                    "display_priority": provedor.get("display_priority"),
+                })
+
+    return {
+        "filme": {
+            "id": dados["id"],
+            "title": _cortar(dados.get("title"), 200),
+            "overview": dados.get("overview"),
+            "poster_url": dados.get("poster_path"),
+            "release_date": _data(dados.get("release_date")),
+            "budget": dados.get("budget") or None,
+            "revenue": dados.get("revenue") or None,
+        },
+        "generos": [{"id": g["id"], "name": _cortar(g["name"], 50)} for g in dados.get("genres", [])],
+        "elenco": elenco,
+        "equipe": list(equipe.values()),
+        "provedores": provedores,
+    }
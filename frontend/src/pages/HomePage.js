@@ -43,7 +43,7 @@ function HomePage() {
         try {
             // Endpoint do backend: GET /filmes/search?q={query}
             const response = await api.get(`/filmes/search?query=${searchTerm}`);
-            setMovies(response.data); // Assumindo que retorna uma lista de filmes
+            setMovies(response.data.items); // resposta paginada: { items, next_cursor }
         } catch (err) {
             console.error('Erro ao buscar filmes:', err);
             setError(err.response?.data?.detail || 'Erro ao buscar filmes.');
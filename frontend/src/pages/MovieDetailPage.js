@@ -22,7 +22,7 @@ function MovieDetailPage() {
             setMovie(movieResponse.data);
 
             const reviewsResponse = await api.get(`/filmes/${id}/avaliacoes`);
-            setReviews(reviewsResponse.data);
+            setReviews(reviewsResponse.data.items); // resposta paginada: { items, next_cursor }
 
         } catch (err) {
             console.error('Erro ao buscar detalhes do filme ou avaliações:', err);